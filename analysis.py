@@ -0,0 +1,270 @@
+"""
+Timeline Analysis of the Episode Results
+This module turns the exported output/episode_data.csv into timeline statistics: the chronological order of the
+episodes, which episodes overlap in time, how the episodes spread over centuries and regions, and which periods
+of history no episode covers yet.
+
+The CSV is loaded once and the '+/-YYYY' year strings are parsed into integer columns with vectorized string
+operations. All statistics are NumPy/pandas column operations (sorting, searchsorted, cumulative maxima), so they
+stay fast for catalogs far bigger than the current archive; analysis_benchmark.py compares them with plain loops.
+
+Usage:
+    episodes = load_episodes("output/episode_data.csv")
+    chronological_order(episodes)
+    overlap_counts(episodes)
+    century_histogram(episodes)
+    find_gaps(episodes, min_years=100)
+
+    python analysis.py [--csv output/episode_data.csv] [--min-gap 100]
+
+Dependencies:
+    - pandas, numpy
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from results_store import EPISODE_TITLE_PATTERN
+
+_COLUMNS = ["title", "url", "location", "latitude", "longitude", "year_from", "year_until"]
+_EPISODE_NUM_PATTERN = r'(\d+)/?$'
+
+
+def parse_signed_years(values: pd.Series) -> pd.Series:
+    """
+    Parses a column of '+/-YYYY' year strings ("+1532" -> 1532, "-0053" -> -53).
+
+    Returns:
+        pd.Series: Nullable Int64 years, <NA> for missing or malformed values
+    """
+    # to_numeric parses in C and is several times faster than matching the '+/-YYYY' pattern row by row
+    years = pd.to_numeric(values.astype("string"), errors="coerce").astype("Float64")
+    return years.where((years % 1 == 0) & (years.abs() <= 9999)).astype("Int64")
+
+
+def load_episodes(filename: str = "output/episode_data.csv") -> pd.DataFrame:
+    """
+    Loads an exported episode_data.csv (semicolon separated, utf-8-sig) and adds the parsed columns.
+
+    Added columns:
+        - 'episode_num': Episode number from the URL or the title (Int64)
+        - 'start', 'end': Parsed year_from and year_until (Int64); a single known year is used for both and
+                          swapped years are put in order, like in the episode catalog (catalog.py)
+        - 'latitude', 'longitude': Coordinates as floats, NaN if unknown
+        - 'region': Last part of the location, usually the country ("Vienna, Austria" -> "Austria")
+    """
+    # Only the needed columns are parsed; locations repeat a lot, so they are read as categories
+    episodes = pd.read_csv(filename, sep=";", encoding="utf-8-sig", usecols=lambda column: column in _COLUMNS,
+                           dtype={"title": "string", "url": "string", "location": "category",
+                                  "year_from": "string", "year_until": "string"})
+    for column in _COLUMNS:
+        if column not in episodes:
+            episodes[column] = pd.Series(pd.NA, index=episodes.index, dtype="string")
+
+    episode_num = episodes["url"].str.extract(_EPISODE_NUM_PATTERN, expand=False)
+    without_url = episode_num.isna()
+    if without_url.any():
+        episode_num[without_url] = episodes.loc[without_url, "title"].str.extract(
+            EPISODE_TITLE_PATTERN.pattern, flags=EPISODE_TITLE_PATTERN.flags)["num"]
+    episodes["episode_num"] = pd.to_numeric(episode_num).astype("Int64")
+
+    start = parse_signed_years(episodes["year_from"])
+    end = parse_signed_years(episodes["year_until"])
+    start, end = start.fillna(end), end.fillna(start)
+    episodes["start"] = start.where(start <= end, end)
+    episodes["end"] = end.where(start <= end, start)
+
+    episodes["latitude"] = pd.to_numeric(episodes["latitude"], errors="coerce").astype(float)
+    episodes["longitude"] = pd.to_numeric(episodes["longitude"], errors="coerce").astype(float)
+    locations = episodes["location"].astype("category")
+    regions = locations.cat.categories.to_series().astype("string").str.rsplit(",", n=1).str[-1].str.strip()
+    regions = regions.where((regions != "Unknown") & (regions != ""))
+    episodes["region"] = locations.map(dict(zip(locations.cat.categories, regions))).astype("string")
+    return episodes
+
+
+def _dated(episodes: pd.DataFrame) -> pd.DataFrame:
+    return episodes[episodes["start"].notna()]
+
+
+def chronological_order(episodes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the dated episodes ordered by start year, end year and episode number.
+    """
+    dated = _dated(episodes)
+    order = np.lexsort((dated["episode_num"].fillna(np.iinfo(np.int64).max).to_numpy(np.int64),
+                        dated["end"].to_numpy(np.int64), dated["start"].to_numpy(np.int64)))
+    return dated.iloc[order]
+
+
+def overlap_counts(episodes: pd.DataFrame) -> pd.Series:
+    """
+    Counts for every dated episode how many other episodes share at least one year with it.
+
+    An episode overlaps all episodes that start before its end, except those that already ended before its
+    start; both counts are binary searches in the sorted start and end years.
+
+    Returns:
+        pd.Series: Number of overlapping episodes, indexed like the dated episodes
+    """
+    dated = _dated(episodes)
+    starts = dated["start"].to_numpy(np.int64)
+    ends = dated["end"].to_numpy(np.int64)
+    sorted_starts = np.sort(starts)
+    sorted_ends = np.sort(ends)
+    started_before_end = np.searchsorted(sorted_starts, ends, side="right")
+    ended_before_start = np.searchsorted(sorted_ends, starts, side="left")
+    return pd.Series(started_before_end - ended_before_start - 1, index=dated.index, name="overlaps")
+
+
+def overlap_pairs(episodes: pd.DataFrame, min_overlap_years: int = 1) -> pd.DataFrame:
+    """
+    Lists all pairs of episodes whose periods share at least min_overlap_years years.
+
+    The pairs are generated without a Python loop: in start order, episode i overlaps exactly the following
+    episodes that start before it ends, so a searchsorted per episode gives a contiguous block of partners.
+    Note that the result grows with the number of pairs, which is quadratic for catalogs full of long periods.
+
+    Returns:
+        pd.DataFrame: Columns 'first' and 'second' (index labels of the episodes) and 'overlap_years',
+                      ordered by overlap length, longest first
+    """
+    dated = _dated(episodes)
+    order = np.argsort(dated["start"].to_numpy(np.int64), kind="stable")
+    starts = dated["start"].to_numpy(np.int64)[order]
+    ends = dated["end"].to_numpy(np.int64)[order]
+
+    partner_end = np.searchsorted(starts, ends, side="right")
+    counts = np.maximum(partner_end - np.arange(len(starts)) - 1, 0)
+    first = np.repeat(np.arange(len(starts)), counts)
+    # Position within each block of partners: 0, 1, ... counts[i] - 1
+    block_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + block_offsets
+
+    overlap_years = np.minimum(ends[first], ends[second]) - starts[second] + 1
+    keep = overlap_years >= min_overlap_years
+    labels = dated.index.to_numpy()
+    pairs = pd.DataFrame({"first": labels[order[first[keep]]], "second": labels[order[second[keep]]],
+                          "overlap_years": overlap_years[keep]})
+    return pairs.sort_values("overlap_years", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def centuries(years) -> np.ndarray:
+    """
+    Converts years to centuries: 1532 -> 16, 1700 -> 18, -53 -> -1 (1st century BC). AD centuries are the
+    hundreds of their years ("the 1700s"), like the centuries read by date_parser.py.
+    """
+    years = np.asarray(years, dtype=np.int64)
+    return np.where(years > 0, years // 100 + 1, -((-years - 1) // 100 + 1))
+
+
+def century_histogram(episodes: pd.DataFrame, spanning: bool = False) -> pd.Series:
+    """
+    Counts the episodes per century.
+
+    Args:
+        episodes (pd.DataFrame): Episodes as returned by load_episodes
+        spanning (bool): Count an episode in every century its period touches instead of only its first one
+
+    Returns:
+        pd.Series: Number of episodes per century (negative centuries are BC), ordered chronologically
+    """
+    dated = _dated(episodes)
+    first = centuries(dated["start"].to_numpy(np.int64))
+    if spanning:
+        # There is no century 0, so BC centuries are shifted by one to count the centuries without a hole
+        first = np.where(first < 0, first + 1, first)
+        last = centuries(dated["end"].to_numpy(np.int64))
+        last = np.where(last < 0, last + 1, last)
+        widths = last - first + 1
+        offsets = np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths)
+        first = np.repeat(first, widths) + offsets
+        first = np.where(first <= 0, first - 1, first)
+    histogram = pd.Series(first, name="century").value_counts().sort_index()
+    histogram.name = "episodes"
+    return histogram
+
+
+def region_histogram(episodes: pd.DataFrame) -> pd.Series:
+    """
+    Counts the episodes per region, most frequent first.
+    """
+    histogram = episodes["region"].dropna().value_counts()
+    histogram.name = "episodes"
+    return histogram
+
+
+def century_region_table(episodes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cross-tabulates the first century of every dated episode against its region.
+    """
+    dated = _dated(episodes)
+    dated = dated[dated["region"].notna()]
+    return pd.crosstab(pd.Series(centuries(dated["start"].to_numpy(np.int64)), index=dated.index, name="century"),
+                       dated["region"])
+
+
+def find_gaps(episodes: pd.DataFrame, min_years: int = 1) -> pd.DataFrame:
+    """
+    Finds the periods between the earliest and the latest episode that no episode covers.
+
+    In start order, a gap opens wherever an episode starts after the latest end of all episodes before it
+    (a cumulative maximum).
+
+    Args:
+        episodes (pd.DataFrame): Episodes as returned by load_episodes
+        min_years (int): Minimum length of the reported gaps in years
+
+    Returns:
+        pd.DataFrame: Columns 'gap_from', 'gap_until' and 'years', plus the titles of the episodes right
+                      before ('before') and after ('after') each gap, longest gaps first
+    """
+    chronological = chronological_order(episodes)
+    starts = chronological["start"].to_numpy(np.int64)
+    ends = chronological["end"].to_numpy(np.int64)
+    if len(starts) < 2:
+        return pd.DataFrame(columns=["gap_from", "gap_until", "years", "before", "after"])
+
+    covered_until = np.maximum.accumulate(ends)[:-1]
+    latest_episode = np.maximum.accumulate(np.where(ends == np.maximum.accumulate(ends), np.arange(len(ends)), 0))
+    gap_years = starts[1:] - covered_until - 1
+    positions = np.flatnonzero(gap_years >= max(min_years, 1))
+
+    titles = chronological["title"].to_numpy(dtype=object)
+    gaps = pd.DataFrame({
+        "gap_from": covered_until[positions] + 1,
+        "gap_until": starts[positions + 1] - 1,
+        "years": gap_years[positions],
+        "before": titles[latest_episode[positions]],
+        "after": titles[positions + 1],
+    })
+    return gaps.sort_values("years", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def _print_section(title: str, table):
+    print(f"\n{title}")
+    print(table.to_string() if len(table) else "  (none)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Timeline statistics of the exported episode results")
+    parser.add_argument("--csv", default="output/episode_data.csv", help="location of the exported episode_data.csv")
+    parser.add_argument("--min-gap", type=int, default=100, help="minimum length of reported gaps in years")
+    parser.add_argument("--top", type=int, default=10, help="number of rows shown per table")
+    args = parser.parse_args()
+
+    episode_table = load_episodes(args.csv)
+    dated_count = int(episode_table["start"].notna().sum())
+    print(f"{len(episode_table)} episodes, {dated_count} dated")
+
+    columns = ["episode_num", "start", "end", "title"]
+    _print_section("Earliest episodes", chronological_order(episode_table)[columns].head(args.top))
+    counts = overlap_counts(episode_table)
+    most_overlapping = episode_table.loc[counts.sort_values(ascending=False).index[:args.top], columns]
+    _print_section("Episodes sharing their period with the most others",
+                   most_overlapping.assign(overlaps=counts.loc[most_overlapping.index]))
+    _print_section("Episodes per century", century_histogram(episode_table))
+    _print_section("Episodes per region", region_histogram(episode_table).head(args.top))
+    _print_section(f"Uncovered periods of at least {args.min_gap} years", find_gaps(episode_table, args.min_gap))
@@ -0,0 +1,156 @@
+"""
+Timeline Analysis Benchmark
+This script checks that the vectorized timeline statistics of analysis.py give the same results as straightforward
+per-row loops, and compares their speed on synthetic catalogs of growing size.
+
+The loops read the CSV with the csv module and parse the years with catalog.parse_signed_year. The pairwise
+overlap loop is quadratic, so it only runs up to --naive-limit episodes.
+
+Usage:
+    python analysis_benchmark.py [--sizes 1000 10000 100000] [--naive-limit 5000]
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, List
+
+import analysis
+from catalog import parse_signed_year
+from fake_providers import PLACES
+
+_HEADER = ["title", "location", "latitude", "longitude", "year_from", "year_until", "url"]
+
+
+def write_synthetic_csv(filename: str, size: int, seed: int = 0):
+    """
+    Writes a synthetic episode_data.csv with periods of a year up to a few centuries between 3000 BC and today.
+    """
+    rng = random.Random(seed)
+    with open(filename, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(_HEADER)
+        for episode_num in range(1, size + 1):
+            start = int(rng.triangular(-3000, 2020, 1700)) or 1
+            end = min(start + int(rng.expovariate(1 / 15)), 2020)
+            location, (latitude, longitude) = rng.choice(PLACES)
+            if rng.random() < 0.05:
+                start_text, end_text = "", ""
+            else:
+                start_text, end_text = f"{start:+05d}", f"{end:+05d}"
+            writer.writerow([f"GAG{episode_num}: Episode {episode_num}", location, latitude, longitude,
+                             start_text, end_text, f"https://www.geschichte.fm/archiv/gag{episode_num}/"])
+
+
+def naive_load(filename: str) -> List[dict]:
+    with open(filename, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    episodes = []
+    for row in rows:
+        start = parse_signed_year(row["year_from"] or None)
+        end = parse_signed_year(row["year_until"] or None)
+        if start is None:
+            start, end = end, None
+        if end is None:
+            end = start
+        if start is not None and end < start:
+            start, end = end, start
+        region = row["location"].rsplit(",", 1)[-1].strip() if row["location"] else None
+        episodes.append({"title": row["title"], "start": start, "end": end, "region": region})
+    return episodes
+
+
+def naive_overlap_counts(episodes: List[dict]) -> List[int]:
+    dated = [episode for episode in episodes if episode["start"] is not None]
+    counts = []
+    for episode in dated:
+        count = 0
+        for other in dated:
+            if other is not episode and other["start"] <= episode["end"] and other["end"] >= episode["start"]:
+                count += 1
+        counts.append(count)
+    return counts
+
+
+def naive_century_histogram(episodes: List[dict]) -> dict:
+    histogram = Counter()
+    for episode in episodes:
+        year = episode["start"]
+        if year is None:
+            continue
+        histogram[year // 100 + 1 if year > 0 else -((-year - 1) // 100 + 1)] += 1
+    return dict(sorted(histogram.items()))
+
+
+def naive_gaps(episodes: List[dict]) -> List[tuple]:
+    dated = sorted((episode for episode in episodes if episode["start"] is not None),
+                   key=lambda episode: (episode["start"], episode["end"]))
+    gaps = []
+    covered_until = None
+    for episode in dated:
+        if covered_until is not None and episode["start"] > covered_until + 1:
+            gaps.append((covered_until + 1, episode["start"] - 1))
+        covered_until = episode["end"] if covered_until is None else max(covered_until, episode["end"])
+    return sorted(gaps)
+
+
+def _timed(function: Callable, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def run_benchmark(sizes: List[int], naive_limit: int) -> bool:
+    """
+    Compares the vectorized and the naive statistics for every catalog size and prints their timings.
+
+    Returns:
+        bool: True if both gave identical results for every size
+    """
+    identical = True
+    print(f"{'size':>8}  {'step':<16}{'naive ms':>12}{'vectorized ms':>15}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            filename = os.path.join(directory, f"episodes_{size}.csv")
+            write_synthetic_csv(filename, size)
+
+            naive_episodes, naive_seconds = _timed(naive_load, filename)
+            episodes, seconds = _timed(analysis.load_episodes, filename)
+            steps = [("load", naive_seconds, seconds, True)]
+
+            naive_histogram, naive_seconds = _timed(naive_century_histogram, naive_episodes)
+            histogram, seconds = _timed(analysis.century_histogram, episodes)
+            steps.append(("centuries", naive_seconds, seconds, naive_histogram == histogram.to_dict()))
+
+            naive_gap_list, naive_seconds = _timed(naive_gaps, naive_episodes)
+            gaps, seconds = _timed(analysis.find_gaps, episodes)
+            gap_list = sorted(zip(gaps["gap_from"].tolist(), gaps["gap_until"].tolist()))
+            steps.append(("gaps", naive_seconds, seconds, naive_gap_list == gap_list))
+
+            counts, seconds = _timed(analysis.overlap_counts, episodes)
+            if size <= naive_limit:
+                naive_counts, naive_seconds = _timed(naive_overlap_counts, naive_episodes)
+                steps.append(("overlap counts", naive_seconds, seconds, naive_counts == counts.tolist()))
+            else:
+                steps.append(("overlap counts", None, seconds, True))
+
+            for step, naive_seconds, seconds, matches in steps:
+                identical = identical and matches
+                naive = f"{naive_seconds * 1000:12.1f}" if naive_seconds is not None else f"{'-':>12}"
+                speedup = f"{naive_seconds / seconds:9.1f}x" if naive_seconds is not None and seconds else f"{'-':>10}"
+                print(f"{size:>8}  {step:<16}{naive}{seconds * 1000:15.1f}{speedup}{'' if matches else '  MISMATCH'}")
+    return identical
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the vectorized timeline statistics with plain loops")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="catalog sizes to benchmark")
+    parser.add_argument("--naive-limit", type=int, default=5000,
+                        help="largest catalog the quadratic overlap loop runs on")
+    args = parser.parse_args()
+    raise SystemExit(0 if run_benchmark(args.sizes, args.naive_limit) else 1)
@@ -0,0 +1,293 @@
+"""
+Replay Benchmark for the Episode Pipeline
+This script measures the throughput of the episode pipeline without touching any live service. geschichte.fm is
+replaced by a local HTTP server that serves synthetic (or recorded) episode pages; Wikipedia, Gemini and Google
+Maps are replaced by local stand-ins that replay deterministic answers. Every stand-in has a configurable latency
+and error rate.
+
+For every catalog size the script reports per-stage latency percentiles and the end-to-end throughput in
+episodes per second. With --cold-start it instead measures how long the CLI takes to start.
+
+Usage:
+    python benchmark.py [--sizes 30 500 5000] [--pages DIR] [--llm-latency 0.02] [--error-rate 0.01]
+    python benchmark.py --cold-start
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import main
+import providers
+from fake_providers import PLACES, SEARCH_TERMS, synthetic_episode_page
+from http_cache import HttpCache
+from results_store import BufferedResultsWriter, ResultsStore
+
+
+class ServiceProfile:
+    """
+    Simulated latency and error behaviour of one service.
+    """
+
+    def __init__(self, latency: float, error_rate: float, seed: int = 0):
+        """
+        Args:
+            latency (float): Mean latency in seconds; actual latencies are spread +/-50% around it
+            error_rate (float): Probability (0.0 to 1.0) that a request fails
+            seed (int): Seed of the random generator, so runs are reproducible
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self) -> bool:
+        """
+        Sleeps for the simulated latency.
+
+        Returns:
+            bool: True if the simulated request failed
+        """
+        with self._lock:
+            latency = self.latency * self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < self.error_rate
+        time.sleep(latency)
+        return failed
+
+
+def _start_page_server(profile: ServiceProfile, recorded_pages: List[str]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if profile.wait():
+                self.send_error(503)
+                return
+            digits = "".join(char for char in self.path if char.isdigit())
+            episode_num = int(digits) if digits else 0
+            if recorded_pages:
+                page = recorded_pages[episode_num % len(recorded_pages)]
+            else:
+                page = synthetic_episode_page(episode_num)
+            body = page.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _StageTimer:
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage_name: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.durations.setdefault(stage_name, []).append(time.perf_counter() - start)
+        return timed
+
+
+def _install_stand_ins(profiles: Dict[str, ServiceProfile], timer: _StageTimer):
+    """
+    Replaces the Wikipedia, Gemini and Google Maps calls used by main with local stand-ins.
+    """
+    def search_term(text):
+        if profiles["llm"].wait():
+            return None
+        return SEARCH_TERMS[len(text) % len(SEARCH_TERMS)]
+
+    def wikipedia_summary(term):
+        if profiles["wikipedia"].wait():
+            return None, None
+        return term, f"{term} ist ein Thema der Geschichte. " * 20
+
+    def geolocation(text):
+        if profiles["llm"].wait():
+            raise ValueError("Simulated safety filter")
+        return PLACES[len(text) % len(PLACES)][0]
+
+    def combined(text):
+        if profiles["llm"].wait():
+            return {"search_term": None, "location": "Unknown", "start_date": None, "end_date": None}
+        place = PLACES[len(text) % len(PLACES)][0]
+        return {"search_term": SEARCH_TERMS[len(text) % len(SEARCH_TERMS)], "location": place,
+                "start_date": "+1532", "end_date": "+1532"}
+
+    def coordinates(address):
+        if profiles["geocode"].wait():
+            raise ConnectionError("Simulated geocoding failure")
+        return dict(PLACES).get(address)
+
+    main.get_wikipedia_search_term_from_episode_information = search_term
+    main.get_wikipedia_summary = wikipedia_summary
+    main.get_goelocation_from_episode_information = geolocation
+    main.get_combined_information_from_episode_information = combined
+    main.get_coordinates_google = coordinates
+    for stage_name in ("_fetch_stage", "_wikipedia_stage", "_llm_stage", "_combined_llm_stage", "_geocode_stage"):
+        timer_name = stage_name.strip("_")[:-len("_stage")]
+        setattr(main, stage_name, timer.wrap(timer_name, getattr(main, stage_name)))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of the values (fraction between 0.0 and 1.0).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(size: int, profiles: Dict[str, ServiceProfile], recorded_pages: List[str],
+                  combined_extraction: bool = False, workers: Optional[Dict[str, int]] = None) -> dict:
+    """
+    Runs the pipeline over a synthetic catalog of episodes against the local stand-ins.
+
+    Args:
+        size (int): Number of episodes
+        profiles (Dict[str, ServiceProfile]): Profiles of 'pages', 'wikipedia', 'llm' and 'geocode'
+        recorded_pages (List[str]): Recorded episode pages to replay, synthetic pages are used if empty
+        combined_extraction (bool): Use the combined LLM extraction
+        workers (Dict[str, int], optional): Worker threads per pipeline stage
+
+    Returns:
+        dict: 'episodes', 'seconds', 'throughput', 'failed' and per-stage 'stages' latency lists
+    """
+    timer = _StageTimer()
+    original_attributes = dict(vars(main))
+    work_dir = tempfile.mkdtemp(prefix="gag_benchmark_")
+    server = _start_page_server(profiles["pages"], recorded_pages)
+
+    try:
+        _install_stand_ins(profiles, timer)
+        providers.set_provider(providers.FETCHER, HttpCache(os.path.join(work_dir, "http_cache")))
+        store = ResultsStore(os.path.join(work_dir, "results.sqlite"))
+        host, port = server.server_address
+        urls = [f"http://{host}:{port}/archiv/gag{episode_num}/" for episode_num in range(1, size + 1)]
+
+        start = time.perf_counter()
+        # The pipeline reports every episode on stdout, which would dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            main._crawl_gag_episodes_pipelined(urls, combined_extraction=combined_extraction,
+                                               writer=BufferedResultsWriter(store), **(workers or {}))
+        seconds = time.perf_counter() - start
+
+        return {
+            "episodes": size,
+            "seconds": seconds,
+            "throughput": size / seconds if seconds else 0.0,
+            # Only failed episodes get the fallback row without a location
+            "failed": sum(1 for row in store.iter_results() if "location" not in row),
+            "stages": timer.durations,
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+        vars(main).update(original_attributes)
+        providers.set_provider(providers.FETCHER, None)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(report: dict):
+    """
+    Prints the per-stage latency percentiles and the throughput of a benchmark run.
+    """
+    print(f"\n=== {report['episodes']} episodes: {report['seconds']:.2f} s, "
+          f"{report['throughput']:.1f} episodes/s, {report['failed']} failed ===")
+    print(f"{'stage':<18}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage_name, durations in report["stages"].items():
+        print(f"{stage_name:<18}{len(durations):>8}"
+              f"{percentile(durations, 0.5) * 1000:>10.1f}{percentile(durations, 0.9) * 1000:>10.1f}"
+              f"{percentile(durations, 0.99) * 1000:>10.1f}{max(durations) * 1000:>10.1f}")
+
+
+def measure_cold_start(repeat: int = 5) -> Dict[str, float]:
+    """
+    Measures the start-up time of the CLI in fresh interpreter processes.
+
+    Args:
+        repeat (int): Number of runs per command, the median is reported
+
+    Returns:
+        Dict[str, float]: Median seconds of 'python -c "import main"' and 'python main.py --help'
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    commands = {
+        "import main": [sys.executable, "-c", "import main"],
+        "main.py --help": [sys.executable, "main.py", "--help"],
+    }
+    medians = {}
+    for name, command in commands.items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=script_dir, check=True, stdout=subprocess.DEVNULL)
+            durations.append(time.perf_counter() - start)
+        medians[name] = percentile(durations, 0.5)
+    return medians
+
+
+def _load_recorded_pages(pages_dir: Optional[str]) -> List[str]:
+    if not pages_dir:
+        return []
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the episode pipeline against local service stand-ins")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 500, 5000], help="catalog sizes to run")
+    parser.add_argument("--pages", help="directory with recorded .html episode pages to replay")
+    parser.add_argument("--page-latency", type=float, default=0.005, help="mean page latency in seconds")
+    parser.add_argument("--wikipedia-latency", type=float, default=0.01, help="mean Wikipedia latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="mean Gemini latency in seconds")
+    parser.add_argument("--geocode-latency", type=float, default=0.005, help="mean geocoding latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="error rate of every service (0.0 to 1.0)")
+    parser.add_argument("--combined", action="store_true", help="use the combined LLM extraction")
+    parser.add_argument("--llm-workers", type=int, default=4, help="worker threads of the LLM stage")
+    parser.add_argument("--cold-start", action="store_true", help="only measure the start-up time of the CLI")
+    args = parser.parse_args()
+
+    if args.cold_start:
+        for command_name, seconds in measure_cold_start().items():
+            print(f"{command_name:<18}{seconds * 1000:>10.1f} ms")
+        sys.exit(0)
+
+    service_profiles = {
+        "pages": ServiceProfile(args.page_latency, args.error_rate, seed=1),
+        "wikipedia": ServiceProfile(args.wikipedia_latency, args.error_rate, seed=2),
+        "llm": ServiceProfile(args.llm_latency, args.error_rate, seed=3),
+        "geocode": ServiceProfile(args.geocode_latency, args.error_rate, seed=4),
+    }
+    pages = _load_recorded_pages(args.pages)
+    for catalog_size in args.sizes:
+        print_report(run_benchmark(catalog_size, service_profiles, pages, args.combined,
+                                   workers={"llm_workers": args.llm_workers}))
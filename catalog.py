@@ -0,0 +1,378 @@
+"""
+In-Memory Episode Catalog
+This module loads the crawl results into compact, array-backed columns and indexes them for the two questions the
+project is about: when an episode takes place and where. An interval tree over the (year_from, year_until) ranges
+answers overlap and "next episode" queries, a grid of latitude/longitude cells answers radius queries.
+
+Usage:
+    catalog = EpisodeCatalog.from_store("output/episode_data.sqlite")
+    catalog.overlapping(1500, 1600)
+    catalog.next_chronological(271)
+    catalog.within_radius(48.2082, 16.3738, 300)
+
+    python catalog.py overlap 1500 1600
+    python catalog.py next 271 --count 3
+    python catalog.py near 48.2082 16.3738 300
+
+Dependencies:
+    - Standard library only
+"""
+
+import argparse
+import csv
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from results_store import ResultsStore, episode_num_from_url_or_title
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Stored in the integer columns for unknown values
+MISSING = -(2 ** 31)
+
+_SIGNED_YEAR_PATTERN = re.compile(r'^[+-]?\d{1,4}$')
+
+
+def parse_signed_year(value) -> Optional[int]:
+    """
+    Parses a year in the '+/-YYYY' format of the LLM answers ("+1532" -> 1532, "-0053" -> -53).
+
+    Returns:
+        int: The year, None for missing or malformed values
+    """
+    if isinstance(value, int):
+        return value
+    if value is None:
+        return None
+    value = str(value).strip()
+    return int(value) if _SIGNED_YEAR_PATTERN.match(value) else None
+
+
+def _parse_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    Returns the great-circle distance between two points in kilometers.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over closed integer intervals [start, end].
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, int]]):
+        """
+        Args:
+            intervals (Iterable[Tuple[int, int, int]]): (start, end, id) triples with start <= end
+        """
+        self._root = self._build(list(intervals))
+
+    def _build(self, intervals: list):
+        if not intervals:
+            return None
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        center = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        # Intervals containing the center, once sorted by start and once by end, so a query can bisect them
+        by_start = sorted(here)
+        by_end = sorted(here, key=lambda interval: (interval[1], interval[0], interval[2]))
+        return (center,
+                array('l', [interval[0] for interval in by_start]), array('l', [interval[2] for interval in by_start]),
+                array('l', [interval[1] for interval in by_end]), array('l', [interval[2] for interval in by_end]),
+                self._build(left), self._build(right))
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """
+        Returns the ids of all intervals sharing at least one year with [start, end].
+        """
+        ids = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, starts, start_ids, ends, end_ids, left, right = node
+            if end < center:
+                # Every interval here ends after the query, it overlaps if it starts early enough
+                ids.extend(start_ids[:bisect_right(starts, end)])
+                stack.append(left)
+            elif start > center:
+                ids.extend(end_ids[bisect_left(ends, start):])
+                stack.append(right)
+            else:
+                ids.extend(start_ids)
+                stack.append(left)
+                stack.append(right)
+        return ids
+
+
+class SpatialGrid:
+    """
+    Grid of latitude/longitude cells for radius queries on the sphere.
+    """
+
+    def __init__(self, points: Iterable[Tuple[float, float, int]], cell_degrees: float = 1.0):
+        """
+        Args:
+            points (Iterable[Tuple[float, float, int]]): (latitude, longitude, id) triples
+            cell_degrees (float): Edge length of a grid cell in degrees
+        """
+        self.cell_degrees = cell_degrees
+        self._longitude_cells = math.ceil(360 / cell_degrees)
+        self._cells: Dict[Tuple[int, int], array] = {}
+        self._points: Dict[int, Tuple[float, float]] = {}
+        for latitude, longitude, point_id in points:
+            self._cells.setdefault(self._cell(latitude, longitude), array('l')).append(point_id)
+            self._points[point_id] = (latitude, longitude)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor((latitude + 90) / self.cell_degrees),
+                math.floor(((longitude + 180) % 360) / self.cell_degrees))
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, int]]:
+        """
+        Returns the points within the radius around a location.
+
+        Returns:
+            List[Tuple[float, int]]: (distance in km, id) pairs, nearest first
+        """
+        delta_latitude = radius_km / _KM_PER_DEGREE
+        min_latitude = max(-90.0, latitude - delta_latitude)
+        max_latitude = min(90.0, latitude + delta_latitude)
+
+        # Meridians converge towards the poles, so the longitude window widens with the highest latitude covered
+        widest_cos = math.cos(math.radians(max(abs(min_latitude), abs(max_latitude))))
+        if widest_cos <= 0 or delta_latitude / widest_cos >= 180:
+            longitude_cells = range(self._longitude_cells)
+        else:
+            # Wrap the window in degrees, not in cells: the last cell is narrower if cell_degrees does not divide 360
+            delta_longitude = delta_latitude / widest_cos
+            west = (longitude - delta_longitude + 180) % 360
+            east = west + 2 * delta_longitude
+            longitude_cells = set(range(math.floor(west / self.cell_degrees),
+                                        math.floor(min(east, 360 - 1e-9) / self.cell_degrees) + 1))
+            if east >= 360:
+                longitude_cells.update(range(math.floor((east - 360) / self.cell_degrees) + 1))
+
+        matches = []
+        for latitude_cell in range(math.floor((min_latitude + 90) / self.cell_degrees),
+                                   math.floor((max_latitude + 90) / self.cell_degrees) + 1):
+            for longitude_cell in longitude_cells:
+                for point_id in self._cells.get((latitude_cell, longitude_cell), ()):
+                    point_latitude, point_longitude = self._points[point_id]
+                    distance = haversine_km(latitude, longitude, point_latitude, point_longitude)
+                    if distance <= radius_km:
+                        matches.append((distance, point_id))
+        matches.sort()
+        return matches
+
+
+class EpisodeCatalog:
+    """
+    Column store of the episode results with a chronological and a spatial index.
+    """
+
+    def __init__(self, items: Iterable[Tuple[Optional[str], dict]], cell_degrees: float = 1.0):
+        """
+        Args:
+            items (Iterable[Tuple[str, dict]]): (episode URL, result row) pairs; the URL may be None
+            cell_degrees (float): Edge length of the spatial grid cells in degrees
+        """
+        self.urls: List[Optional[str]] = []
+        self.titles: List[Optional[str]] = []
+        self.locations: List[Optional[str]] = []
+        self.episode_nums = array('l')
+        self.years_from = array('l')
+        self.years_until = array('l')
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+
+        for url, row in items:
+            url = url or row.get("url")
+            title = row.get("title")
+            self.urls.append(url)
+            self.titles.append(title)
+            self.locations.append(row.get("location"))
+            self.episode_nums.append(self._episode_num(url, title))
+
+            year_from = parse_signed_year(row.get("year_from"))
+            year_until = parse_signed_year(row.get("year_until"))
+            if year_from is None:
+                year_from, year_until = year_until, None
+            if year_until is None:
+                year_until = year_from
+            if year_from is not None and year_until < year_from:
+                year_from, year_until = year_until, year_from
+            self.years_from.append(MISSING if year_from is None else year_from)
+            self.years_until.append(MISSING if year_until is None else year_until)
+
+            self.latitudes.append(_parse_float(row.get("latitude")))
+            self.longitudes.append(_parse_float(row.get("longitude")))
+
+        dated = [index for index in range(len(self.urls)) if self.years_from[index] != MISSING]
+        self._intervals = IntervalTree((self.years_from[index], self.years_until[index], index) for index in dated)
+
+        # Chronological order of all dated episodes, and the position of every episode in it
+        self._chronological = array('l', sorted(dated, key=self._chronological_key))
+        self._positions = {index: position for position, index in enumerate(self._chronological)}
+        self._by_episode_num = {num: index for index, num in enumerate(self.episode_nums) if num != MISSING}
+
+        self._grid = SpatialGrid(((self.latitudes[index], self.longitudes[index], index)
+                                  for index in range(len(self.urls))
+                                  if not math.isnan(self.latitudes[index]) and not math.isnan(self.longitudes[index])),
+                                 cell_degrees)
+
+    @classmethod
+    def from_store(cls, path: str = "output/episode_data.sqlite") -> "EpisodeCatalog":
+        """
+        Loads the successful episodes of a results store.
+        """
+        return cls(ResultsStore(path).iter_items(failed=False))
+
+    @classmethod
+    def from_csv(cls, filename: str = "output/episode_data.csv") -> "EpisodeCatalog":
+        """
+        Loads an exported episode_data.csv (semicolon separated, utf-8-sig).
+        """
+        with open(filename, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f, delimiter=";"))
+        return cls((row.get("url") or None, {key: value or None for key, value in row.items()}) for row in rows)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def episode(self, index: int) -> dict:
+        """
+        Returns the episode at a column index as a dict with parsed years and coordinates.
+        """
+        episode_num, year_from, year_until = self.episode_nums[index], self.years_from[index], self.years_until[index]
+        latitude, longitude = self.latitudes[index], self.longitudes[index]
+        return {
+            "episode_num": None if episode_num == MISSING else episode_num,
+            "title": self.titles[index],
+            "url": self.urls[index],
+            "location": self.locations[index],
+            "latitude": None if math.isnan(latitude) else latitude,
+            "longitude": None if math.isnan(longitude) else longitude,
+            "year_from": None if year_from == MISSING else year_from,
+            "year_until": None if year_until == MISSING else year_until,
+        }
+
+    def chronological(self) -> List[dict]:
+        """
+        Returns all dated episodes ordered by year_from, year_until and episode number.
+        """
+        return [self.episode(index) for index in self._chronological]
+
+    def overlapping(self, year_from: int, year_until: int) -> List[dict]:
+        """
+        Returns the episodes whose period shares at least one year with [year_from, year_until], in chronological
+        order.
+        """
+        if year_until < year_from:
+            year_from, year_until = year_until, year_from
+        indices = sorted(self._intervals.overlapping(year_from, year_until), key=self._positions.__getitem__)
+        return [self.episode(index) for index in indices]
+
+    def at_year(self, year: int) -> List[dict]:
+        """
+        Returns the episodes whose period contains the year.
+        """
+        return self.overlapping(year, year)
+
+    def next_chronological(self, episode_num: int, count: int = 1) -> List[dict]:
+        """
+        Returns the episodes following an episode in chronological order.
+
+        Raises:
+            KeyError: If the episode is not in the catalog or has no years
+        """
+        position = self._positions[self._by_episode_num[episode_num]]
+        return [self.episode(index) for index in self._chronological[position + 1:position + 1 + count]]
+
+    def previous_chronological(self, episode_num: int, count: int = 1) -> List[dict]:
+        """
+        Returns the episodes preceding an episode in chronological order, nearest first.
+
+        Raises:
+            KeyError: If the episode is not in the catalog or has no years
+        """
+        position = self._positions[self._by_episode_num[episode_num]]
+        return [self.episode(index) for index in reversed(self._chronological[max(0, position - count):position])]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[dict]:
+        """
+        Returns the episodes located within the radius around a location, nearest first. Every episode dict has
+        an additional 'distance_km'.
+        """
+        episodes = []
+        for distance, index in self._grid.within(latitude, longitude, radius_km):
+            episode = self.episode(index)
+            episode["distance_km"] = round(distance, 1)
+            episodes.append(episode)
+        return episodes
+
+    def _chronological_key(self, index: int) -> Tuple[int, int, int]:
+        return self.years_from[index], self.years_until[index], self.episode_nums[index]
+
+    @staticmethod
+    def _episode_num(url: Optional[str], title: Optional[str]) -> int:
+        episode_num = episode_num_from_url_or_title(url, title)
+        return MISSING if episode_num is None else episode_num
+
+
+def _print_episodes(episodes: List[dict]):
+    for episode in episodes:
+        years = f"{episode['year_from']}–{episode['year_until']}" if episode["year_from"] is not None else "?"
+        distance = f"  {episode['distance_km']} km" if "distance_km" in episode else ""
+        print(f"{years:>12}  {episode['title']}  ({episode['location']}){distance}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the episode catalog by period and place")
+    parser.add_argument("--results", default="output/episode_data.sqlite", help="location of the results store")
+    parser.add_argument("--csv", help="load an exported episode_data.csv instead of the results store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    overlap_parser = commands.add_parser("overlap", help="episodes overlapping a period")
+    overlap_parser.add_argument("year_from", type=int)
+    overlap_parser.add_argument("year_until", type=int)
+    next_parser = commands.add_parser("next", help="episodes following an episode chronologically")
+    next_parser.add_argument("episode_num", type=int)
+    next_parser.add_argument("--count", type=int, default=1)
+    near_parser = commands.add_parser("near", help="episodes within a radius around a location")
+    near_parser.add_argument("latitude", type=float)
+    near_parser.add_argument("longitude", type=float)
+    near_parser.add_argument("radius_km", type=float)
+    args = parser.parse_args()
+
+    episode_catalog = EpisodeCatalog.from_csv(args.csv) if args.csv else EpisodeCatalog.from_store(args.results)
+    if args.command == "overlap":
+        _print_episodes(episode_catalog.overlapping(args.year_from, args.year_until))
+    elif args.command == "next":
+        _print_episodes(episode_catalog.next_chronological(args.episode_num, args.count))
+    else:
+        _print_episodes(episode_catalog.within_radius(args.latitude, args.longitude, args.radius_km))
@@ -0,0 +1,114 @@
+"""
+Episode Checkpoint Manifest
+This module records the progress of every episode of a crawl run: its status and the outputs of every finished
+stage (page content, search term, Wikipedia summary, location, coordinates). A rerun skips finished episodes and
+resumes failed episodes from the stage where they failed.
+
+The manifest is an append-only JSON-lines file; the last record per episode URL wins. It is compacted whenever
+it is loaded.
+
+Dependencies:
+    - Standard library only (json, threading)
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_IN_PROGRESS = "in_progress"
+
+
+class CheckpointManifest:
+    """
+    Thread-safe, persistent record of the per-episode progress of crawl runs.
+    """
+
+    def __init__(self, path: str = "output/checkpoint.jsonl"):
+        """
+        Args:
+            path (str): Location of the manifest file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[str, dict] = {}
+        self._load()
+
+    def get_state(self, url: str) -> dict:
+        """
+        Returns the saved state of an episode, or a fresh state if the episode was never processed.
+
+        Args:
+            url (str): Episode URL
+
+        Returns:
+            dict: Episode state including 'url' and 'completed_stages'
+        """
+        with self._lock:
+            record = self._records.get(url)
+            if record is None:
+                return {"url": url, "completed_stages": []}
+            return json.loads(json.dumps(record["state"]))
+
+    def get_status(self, url: str) -> Optional[str]:
+        """
+        Returns the status of an episode, or None if the episode was never processed.
+        """
+        with self._lock:
+            record = self._records.get(url)
+            return record["status"] if record else None
+
+    def get_urls_with_status(self, status: str) -> List[str]:
+        """
+        Returns all episode URLs with the given status.
+        """
+        with self._lock:
+            return [url for url, record in self._records.items() if record["status"] == status]
+
+    def record(self, state: dict, status: str, failed_stage: Optional[str] = None, error: Optional[str] = None):
+        """
+        Saves the state and status of an episode.
+
+        Args:
+            state (dict): Episode state, must contain 'url' and be JSON serializable
+            status (str): One of STATUS_DONE, STATUS_FAILED, STATUS_IN_PROGRESS
+            failed_stage (str, optional): Name of the stage that failed
+            error (str, optional): Error message of the failure
+        """
+        record = {
+            "url": state["url"],
+            "status": status,
+            "failed_stage": failed_stage,
+            "error": error,
+            "state": state,
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._records[state["url"]] = json.loads(line)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run that was killed mid-write can leave a truncated last line
+                    continue
+                self._records[record["url"]] = record
+
+        # Compact the log to one record per episode
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self._records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,153 @@
+"""
+Prompt Context Budget
+This module keeps the Wikipedia context of the LLM prompts small. Instead of appending the whole article summary,
+its sentences are ranked by their relevance to the episode and only the best ones that fit into a fixed token
+budget are kept, in their original order. It also formats the episode information as plain prompt text instead
+of a Python dict repr.
+
+Token counts are estimated (about four characters per token), which is accurate enough for budgeting.
+
+Dependencies:
+    - metrics: Records the token counts of the prompt texts
+"""
+
+import math
+import re
+from typing import List, Optional
+
+from metrics import increment
+
+DEFAULT_TOKEN_BUDGET = 200
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+(?=["„(\[]?[A-ZÄÖÜ0-9])')
+_WORD_PATTERN = re.compile(r'[A-Za-zÄÖÜäöüß]{4,}')
+_YEAR_PATTERN = re.compile(r'\b\d{3,4}\b|Jahrhundert|v\. Chr\.|n\. Chr\.')
+# Words ending in a period that do not end a sentence even before a capitalized word, e.g. "z. B. Kaiser" or
+# "St. Petersburg" ("v. Chr." usually does end a sentence when a capitalized word follows)
+_ABBREVIATIONS = {"bzw", "ca", "st", "jh", "jhd", "nr", "geb", "gest", "dr", "etc", "vgl", "usw", "sog",
+                  "evtl", "ggf", "hl", "röm", "kath", "ev", "inkl", "lat", "griech", "franz", "engl"}
+_STOP_WORDS = {"dass", "eine", "einer", "eines", "einem", "einen", "sich", "sind", "wird", "wurde", "wurden",
+               "nicht", "auch", "oder", "aber", "nach", "über", "unter", "durch", "sowie", "werden", "diese",
+               "dieser", "dieses", "sein", "seine", "seiner", "ihre", "ihrer", "haben", "hatte", "hatten",
+               "folge", "episode", "geschichte", "geschichten", "springen", "diesmal", "erzählen"}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimates the number of LLM tokens of a text.
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits a German text into sentences without breaking at ordinals ("18. Jahrhundert") or common abbreviations.
+    """
+    sentences = []
+    current = ""
+    for part in _SENTENCE_BREAK.split(text.strip()):
+        current = f"{current} {part}" if current else part
+        last_word = current.split()[-1]
+        if last_word.endswith("."):
+            # Initials ("z.", "B."), ordinals ("18.") and abbreviations continue the sentence
+            word = last_word[:-1]
+            if len(word) == 1 and word.isalpha() or len(word) <= 2 and word.isdigit() or word.lower() in _ABBREVIATIONS:
+                continue
+        sentences.append(current)
+        current = ""
+    if current:
+        sentences.append(current)
+    return sentences
+
+
+def _terms(text: str) -> set:
+    return {word.lower() for word in _WORD_PATTERN.findall(text or "")} - _STOP_WORDS
+
+
+def compress_context(context: str, query: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Keeps the sentences of the context that are most relevant to the query and fit into the token budget.
+
+    Sentences are scored by the query terms they share, normalized by their length. The lead sentence, which
+    defines the article's subject, and sentences mentioning years get a bonus, since the prompts ask for dates
+    and places.
+
+    Args:
+        context (str): Text to compress, e.g. a Wikipedia summary
+        query (str): Text the context has to be relevant to, e.g. the episode title and summary
+        token_budget (int): Maximum estimated number of tokens of the result
+
+    Returns:
+        str: The selected sentences in their original order
+    """
+    if not context or estimate_tokens(context) <= token_budget:
+        return context or ""
+
+    query_terms = _terms(query)
+    sentences = split_sentences(context)
+    scores = []
+    for position, sentence in enumerate(sentences):
+        sentence_terms = _terms(sentence)
+        score = len(sentence_terms & query_terms) / math.sqrt(len(sentence_terms) + 1)
+        if position == 0:
+            score += 1.0
+        if _YEAR_PATTERN.search(sentence):
+            score += 0.5
+        scores.append(score)
+
+    selected = set()
+    used_tokens = 0
+    for position in sorted(range(len(sentences)), key=lambda index: (-scores[index], index)):
+        sentence_tokens = estimate_tokens(sentences[position]) + 1
+        if used_tokens + sentence_tokens <= token_budget:
+            selected.add(position)
+            used_tokens += sentence_tokens
+    return " ".join(sentences[position] for position in sorted(selected))
+
+
+def format_episode_context(episode: dict) -> str:
+    """
+    Formats the episode information for a prompt: title and summary as plain text, every further field
+    (e.g. the Wikipedia context) as a labeled line.
+    """
+    lines = [str(episode[key]) for key in ("title", "summary") if episode.get(key)]
+    lines.extend(f"{key}: {value}" for key, value in episode.items() if key not in ("title", "summary") and value)
+    return "\n".join(lines)
+
+
+def episode_prompt_text(state: dict) -> str:
+    """
+    Formats the episode information of a pipeline state for a prompt and records its token count next to the
+    count of the former prompt text (the dict repr with the full Wikipedia summary).
+    """
+    episode_information_dict = state["episode"]
+    prompt_text = format_episode_context(episode_information_dict)
+
+    uncompressed = dict(episode_information_dict)
+    wikipedia_summary = state.get("wikipedia_summary")
+    if wikipedia_summary and wikipedia_summary[1] is not None:
+        uncompressed["Wikipedia-Informationen"] = str(tuple(wikipedia_summary))
+    increment("prompt_context_tokens_before", estimate_tokens(str(uncompressed)))
+    increment("prompt_context_tokens_after", estimate_tokens(prompt_text))
+    return prompt_text
+
+
+def add_wikipedia_context(state: dict, wikipedia_summary: tuple, token_budget: int = DEFAULT_TOKEN_BUDGET):
+    """
+    Adds the most relevant sentences of the Wikipedia summary, within the token budget, to the episode information
+    of a pipeline state.
+
+    Args:
+        state (dict): Pipeline state with 'episode' and optionally 'search_term'
+        wikipedia_summary (tuple): (article title, summary) as returned by get_wikipedia_summary
+        token_budget (int): Maximum estimated tokens of the added context
+    """
+    state["wikipedia_summary"] = wikipedia_summary
+    article_title, summary = wikipedia_summary
+    if summary is None:
+        return
+    episode_information_dict = state["episode"]
+    query = " ".join(filter(None, (episode_information_dict.get("title"), episode_information_dict.get("summary"),
+                                   state.get("search_term"))))
+    context = compress_context(summary, query, token_budget)
+    episode_information_dict["Wikipedia-Informationen"] = f"{article_title}: {context}"
@@ -0,0 +1,255 @@
+"""
+Rule-Based Date Extraction
+This module reads the historical time period of an episode directly from its German description, without an LLM.
+Most episode descriptions state their dates outright ("Im November 1532", "ins Jahr 53 v.Chr.", "2. Hälfte des
+18. Jahrhunderts", "die 1920er Jahre", "von 1618 bis 1648"), which a few regular expressions resolve in
+microseconds.
+
+The result has the same shape as the LLM answer of llm_call.get_year_from_episode_information plus a confidence
+score between 0 and 1. Explicit years and ranges score high, centuries and decades somewhat lower, and
+descriptions that mention several periods far apart score low, so the caller can fall back to the LLM for them.
+A bare four-digit number without any cue ("1532 nehmen ...") stays just below the default threshold: on its own
+it is not certain enough to skip the LLM. Ordinals ("zum 1000. Mal"), page and phone numbers are not years.
+
+Usage:
+    python date_parser.py "Wir springen diesmal in die 2. Hälfte des 18. Jahrhunderts."
+
+Dependencies:
+    - helper_fuctions: Contains the integer extraction
+"""
+
+import datetime
+import re
+import sys
+from typing import List, NamedTuple, Optional
+
+from helper_fuctions import extract_integers
+
+# Minimum confidence at which the rule-based dates are used without asking the LLM
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Mentions spreading further than this beyond the widest one are treated as unrelated, e.g. the story and an epilogue in the present
+MAX_COMBINED_SPAN = 150
+
+# Era markers; the ones before Christ all start with a "v"
+_ERA = (r'(?:v\.\s?Chr\.?|vor\s+Christus|vdZw\.?|v\.\s?d\.\s?Z\.?|v\.\s?u\.\s?Z\.?|vor\s+unserer\s+Zeitrechnung'
+        r'|n\.\s?Chr\.?|nach\s+Christus|ndZw\.?|n\.\s?d\.\s?Z\.?|u\.\s?Z\.?)')
+_MONTHS = "Januar|Jänner|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember"
+_SEASONS = "Frühjahr|Frühling|Sommer|Herbst|Winter"
+
+_CENTURY_PATTERN = re.compile(
+    r'(?:(?P<part>Anfang|Beginn|Mitte|Ende)\s+des\s+|(?P<half>[12])\.\s*Hälfte\s+des\s+|(?P<adjective>frühen|späten)\s+)?'
+    r'(?<![\w.])(?P<first>\d{1,2})\.(?:\s*(?:bis|und|-|–)\s*(?P<last>\d{1,2})\.)?\s*'
+    r'(?P<unit>Jahrhunderts?|Jh\.|Jhd?t?\.|Jahrtausends?)(?:\s*(?P<era>' + _ERA + r'))?')
+_DECADE_PATTERN = re.compile(
+    r'(?:(?P<part>Anfang|Mitte|Ende)\s+der\s+)?(?<![\w.])(?P<decade>\d{3}0|\d0)er(?:n|[\s-]*Jahren?)?\b')
+_RANGE_PATTERN = re.compile(
+    r'(?<!\w)(?P<first>\d{1,4})(?:\s*(?P<first_era>' + _ERA + r'))?\s*(?P<separator>bis|und|-|–|/)\s*'
+    r'(?P<last>\d{1,4})(?!\d)(?:\s*(?P<era>' + _ERA + r'))?')
+_YEAR_PATTERN = re.compile(
+    r'(?:\b(?P<cue>Jahre?s?|(?i:im|ins|um|anno|seit|ab|bis|nach)|' + _MONTHS + '|' + _SEASONS + r')\s+)?'
+    r'(?<!\w)(?P<year>\d{1,4})(?!\d)(?!\.\d)(?:\s*(?P<era>' + _ERA + r'))?')
+
+# Words after a number that make it a quantity instead of a year ("vor 2000 Jahren", "1500 Soldaten")
+_QUANTITY_WORDS = {"jahre", "jahren", "jahr", "menschen", "soldaten", "mann", "kilometer", "km", "meter", "euro",
+                   "mark", "dollar", "einwohner", "tote", "toten", "seiten", "stück", "prozent", "%", "schiffe",
+                   "männer", "frauen", "kinder", "leute", "personen", "gulden", "taler", "pfund", "tage", "tagen"}
+# Nouns after an ordinal number ("die 2000. Folge", "zum 1000. Mal"); a lowercase word after "<number>." is
+# always read as an ordinal, a capitalized one only if it is one of these
+_ORDINAL_NOUNS = {"mal", "folge", "episode", "ausgabe", "auflage", "geburtstag", "todestag", "jahrestag",
+                  "jubiläum", "platz", "stelle", "teil", "band", "kapitel", "sendung", "jahrhundert"}
+# Words before a number that make it a reference instead of a year ("Seite 1200", "Folge 1000")
+_REFERENCE_WORDS = {"seite", "s.", "nr.", "nr", "nummer", "telefon", "tel.", "tel", "fax", "folge", "episode",
+                    "band", "heft", "kapitel", "ausgabe", "artikel", "§", "paragraph", "platz", "gag", "zs"}
+
+# Confidence of a bare year without era or cue, below DEFAULT_MIN_CONFIDENCE so that it never skips the LLM alone
+BARE_YEAR_CONFIDENCE = 0.7
+
+
+class DateMention(NamedTuple):
+    start: int
+    end: int
+    confidence: float
+    position: int
+
+
+def format_year(year: Optional[int]) -> Optional[str]:
+    """
+    Formats a signed year like the LLM answers, e.g. 1532 -> "+1532" and -53 -> "-0053".
+    """
+    return None if year is None else f"{year:+05d}"
+
+
+def _is_bc(era: Optional[str]) -> bool:
+    return era is not None and era.lower().startswith("v")
+
+
+def _signed(year: int, era: Optional[str]) -> int:
+    return -year if _is_bc(era) else year
+
+
+def _part_of(start: int, end: int, fraction_start: float, fraction_end: float) -> tuple:
+    span = end - start + 1
+    return start + int(span * fraction_start), start + int(span * fraction_end) - 1
+
+
+_PART_FRACTIONS = {"anfang": (0.0, 0.25), "beginn": (0.0, 0.25), "frühen": (0.0, 0.34), "mitte": (0.35, 0.65),
+                   "ende": (0.75, 1.0), "späten": (0.66, 1.0), "1": (0.0, 0.5), "2": (0.5, 1.0)}
+
+
+def _century_mention(match: re.Match) -> Optional[DateMention]:
+    numbers = extract_integers(f"{match.group('first')} {match.group('last') or ''}")
+    size = 1000 if match.group("unit").startswith("Jahrtausend") else 100
+    first, last = numbers[0], numbers[-1]
+    if not 0 < first <= last <= (40 if size == 100 else 10):
+        return None
+    if _is_bc(match.group("era")):
+        # The 5th century BC runs from 500 to 401 BC, counting backwards
+        start, end = -last * size, -(first - 1) * size - 1
+    else:
+        start, end = max((first - 1) * size, 1), last * size - 1
+    part = match.group("part") or match.group("half") or match.group("adjective")
+    if part and first == last:
+        start, end = _part_of(start, end, *_PART_FRACTIONS[part.lower()])
+    return DateMention(start, end, 0.85 if size == 100 else 0.8, match.start())
+
+
+def _decade_mention(match: re.Match) -> DateMention:
+    decade = int(match.group("decade"))
+    # "die 20er Jahre" leaves the century open, the most recent one is the usual reading
+    confidence = 0.9
+    if decade < 100:
+        decade += 1900
+        confidence = 0.7
+    start, end = decade, decade + 9
+    part = match.group("part")
+    if part:
+        start, end = {"anfang": (decade, decade + 3), "mitte": (decade + 3, decade + 6),
+                      "ende": (decade + 7, decade + 9)}[part.lower()]
+    return DateMention(start, end, confidence, match.start())
+
+
+def _range_mention(match: re.Match, text: str, latest_year: int) -> Optional[DateMention]:
+    first, last = extract_integers(match.group("first") + " " + match.group("last"))
+    separator = match.group("separator")
+    first_era, last_era = match.group("first_era"), match.group("era")
+    if separator == "und" and not re.search(r'(?i:zwischen)\s+(?:den\s+Jahren\s+)?$', text[:match.start()]):
+        return None
+    if first_era is None and last_era is None:
+        # Without an era only proper years count, with the abbreviated form "1914-18" or "1870/71"
+        if not 1000 <= first <= latest_year:
+            return None
+        if last < 100 and len(match.group("last")) == 2:
+            last = first // 100 * 100 + last
+        if not first < last <= latest_year:
+            return None
+        return DateMention(first, last, 0.95, match.start())
+    # "53 bis 44 v. Chr." puts both years before Christ, "44 v. Chr. bis 14 n. Chr." only the first one
+    start = _signed(first, first_era or last_era)
+    end = _signed(last, last_era)
+    if start >= end or 0 in (first, last):
+        return None
+    return DateMention(start, end, 0.95, match.start())
+
+
+def _year_mention(match: re.Match, text: str, latest_year: int) -> Optional[DateMention]:
+    digits = match.group("year")
+    year = int(digits)
+    era, cue = match.group("era"), match.group("cue")
+    year_start = match.start("year")
+    if era is not None:
+        return DateMention(_signed(year, era), _signed(year, era), 0.95, match.start()) if year else None
+    if len(digits) == 3 and re.search(r'\d\.$', text[:year_start]):
+        # Thousands separator, e.g. "10.000"
+        return None
+    if re.search(r'\d[ /-]?$', text[:year_start]) or re.match(r'[ /-]?\d', text[match.end():]):
+        # Part of a longer digit sequence, e.g. a phone number "0800 1234"
+        return None
+    ordinal = re.match(r'\.\s*(\w+)', text[match.end():match.end() + 30])
+    if ordinal and (ordinal.group(1)[0].islower() or ordinal.group(1).lower() in _ORDINAL_NOUNS):
+        return None
+    preceding = text[:year_start].split()[-1:]
+    if cue is None and preceding and preceding[0].lower().lstrip("(") in _REFERENCE_WORDS:
+        return None
+    following = text[match.end():match.end() + 20].split()
+    if following and following[0].lower().strip('.,;:!?)') in _QUANTITY_WORDS:
+        return None
+    if cue in ("Jahr", "Jahre", "Jahres"):
+        return DateMention(year, year, 0.95, match.start()) if 0 < year <= latest_year else None
+    if not 1000 <= year <= latest_year:
+        return None
+    if cue is None:
+        confidence = BARE_YEAR_CONFIDENCE
+    elif cue in _MONTHS.split("|") or cue in _SEASONS.split("|"):
+        confidence = 0.95
+    else:
+        confidence = 0.9
+    return DateMention(year, year, confidence, match.start())
+
+
+def find_date_mentions(text: str) -> List[DateMention]:
+    """
+    Finds all centuries, decades, year ranges and single years mentioned in a text.
+
+    Longer forms are matched first and their text is not searched again, so "1914 bis 1918" is one range
+    and not two years, and the "18." of "18. Jahrhundert" is not read as a year.
+
+    Returns:
+        List[DateMention]: Mentions ordered by their position in the text
+    """
+    latest_year = datetime.date.today().year
+    mentions = []
+    consumed = []
+
+    def is_free(match: re.Match) -> bool:
+        return all(match.end() <= start or match.start() >= end for start, end in consumed)
+
+    for pattern, read in ((_CENTURY_PATTERN, _century_mention),
+                          (_DECADE_PATTERN, _decade_mention),
+                          (_RANGE_PATTERN, lambda match: _range_mention(match, text, latest_year)),
+                          (_YEAR_PATTERN, lambda match: _year_mention(match, text, latest_year))):
+        for match in pattern.finditer(text):
+            if not is_free(match):
+                continue
+            mention = read(match)
+            if mention is not None:
+                mentions.append(mention)
+                consumed.append((match.start(), match.end()))
+    return sorted(mentions, key=lambda mention: mention.position)
+
+
+def parse_dates(text: str) -> dict:
+    """
+    Determines the time period of an episode from the dates stated in its description.
+
+    Related mentions are merged into one period ("Im November 1532 ... 1533 wird Atahualpa hingerichtet" gives
+    1532 to 1533). If the mentions lie too far apart to belong to one story, the first one is used with a low
+    confidence, since episode descriptions usually open with the period they are about.
+
+    Args:
+        text (str): The episode description
+
+    Returns:
+        dict: A dictionary containing:
+            - 'start_date': The starting year in format '+/-YYYY', None if no date was found
+            - 'end_date': The ending year in format '+/-YYYY', None if no date was found
+            - 'confidence': How certain the dates are, from 0 (no date found) to 1
+    """
+    mentions = find_date_mentions(text or "")
+    if not mentions:
+        return {"start_date": None, "end_date": None, "confidence": 0.0}
+
+    start = min(mention.start for mention in mentions)
+    end = max(mention.end for mention in mentions)
+    widest = max(mention.end - mention.start for mention in mentions)
+    if end - start <= widest + MAX_COMBINED_SPAN:
+        confidence = max(mention.confidence for mention in mentions)
+    else:
+        start, end = mentions[0].start, mentions[0].end
+        confidence = round(mentions[0].confidence * 0.6, 2)
+    return {"start_date": format_year(start), "end_date": format_year(end), "confidence": confidence}
+
+
+if __name__ == "__main__":
+    for argument in sys.argv[1:] or [line for line in sys.stdin]:
+        print(parse_dates(argument))
@@ -0,0 +1,189 @@
+"""
+Episode Discovery for Geschichte.fm
+This module builds an index of all podcast episodes (episode number -> URL, title and summary) from the podcast
+RSS feed and the website sitemap in a few bulk requests, instead of guessing every episode URL from its number.
+Feeds are streamed and parsed incrementally, so even very large feeds are never held in memory as a whole.
+
+Episodes whose description is already contained in the feed do not need their HTML page fetched at all.
+
+Dependencies:
+    - requests: For making HTTP requests
+    - website_crawler: For cleaning the feed descriptions the same way as the episode pages
+"""
+
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, Optional, Tuple
+
+from http_transport import get_transport
+from results_store import EPISODE_TITLE_PATTERN
+from website_crawler import extract_relevant_episode_data
+
+FEED_URL = "https://www.geschichte.fm/feed/mp3/"
+SITEMAP_URL = "https://www.geschichte.fm/sitemap.xml"
+
+_EPISODE_URL_PATTERN = re.compile(r'/(?:podcast/zs|archiv/gag)(\d+)/?$', re.IGNORECASE)
+
+
+def _local_name(tag: str) -> str:
+    # Strip the XML namespace, e.g. '{http://purl.org/rss/1.0/modules/content/}encoded' -> 'encoded'
+    return tag.rsplit('}', 1)[-1]
+
+
+def _stream_xml(url: str, timeout: float = 60.0) -> Iterator[ET.Element]:
+    """
+    Fetches an XML document with a streamed request and yields every element as soon as it is complete.
+    """
+    with get_transport().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        for _, element in ET.iterparse(response.raw, events=("end",)):
+            yield element
+
+
+def _episode_num(title: str, url: str) -> Optional[int]:
+    match = _EPISODE_URL_PATTERN.search(url or "")
+    if match:
+        return int(match.group(1))
+    match = EPISODE_TITLE_PATTERN.match(title or "")
+    return int(match.group("num")) if match else None
+
+
+def _clean_description(title: str, description: str) -> Optional[str]:
+    """
+    Cleans a feed description with the same rules as the episode pages (first two paragraphs, no ads).
+    """
+    if not description:
+        return None
+    if "<p" not in description:
+        description = "".join(f"<p>{paragraph}</p>" for paragraph in description.split("\n\n"))
+    html_content = f'<h1 class="page-title">{title}</h1><div class="entry-content">{description}</div>'
+    episode = extract_relevant_episode_data(html_content=html_content)
+    return episode["summary"] if episode else None
+
+
+def iter_feed_episodes(feed_url: str = FEED_URL) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams the podcast RSS feed and yields every episode it contains.
+
+    Args:
+        feed_url (str): URL of the RSS feed
+
+    Yields:
+        Tuple[int, dict]: Episode number and a dict with 'url', 'title' and 'summary'
+    """
+    for element in _stream_xml(feed_url):
+        if _local_name(element.tag) != "item":
+            continue
+
+        fields = {_local_name(child.tag): (child.text or "") for child in element}
+        title = fields.get("title", "").strip()
+        url = fields.get("link", "").strip()
+        episode_num = _episode_num(title, url)
+
+        # Free the parsed item, the feed can contain hundreds of long episode descriptions
+        element.clear()
+
+        if episode_num is None:
+            continue
+        description = fields.get("encoded") or fields.get("description") or ""
+        yield episode_num, {
+            "url": url,
+            "title": title,
+            "summary": _clean_description(title, description),
+        }
+
+
+def iter_sitemap_episodes(sitemap_url: str = SITEMAP_URL) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams the website sitemap (following nested sitemap indexes) and yields every episode page.
+
+    Args:
+        sitemap_url (str): URL of the sitemap or sitemap index
+
+    Yields:
+        Tuple[int, dict]: Episode number and a dict with 'url'
+    """
+    nested_sitemaps = []
+    for element in _stream_xml(sitemap_url):
+        tag = _local_name(element.tag)
+        if tag not in ("url", "sitemap"):
+            continue
+        location = next((child.text.strip() for child in element
+                         if _local_name(child.tag) == "loc" and child.text), None)
+        element.clear()
+        if location is None:
+            continue
+
+        if tag == "sitemap":
+            nested_sitemaps.append(location)
+            continue
+        match = _EPISODE_URL_PATTERN.search(location)
+        if match:
+            yield int(match.group(1)), {"url": location}
+
+    for nested_sitemap in nested_sitemaps:
+        yield from iter_sitemap_episodes(nested_sitemap)
+
+
+def discover_episodes(feed_url: Optional[str] = FEED_URL,
+                      sitemap_url: Optional[str] = SITEMAP_URL) -> Dict[int, dict]:
+    """
+    Builds the episode index from the RSS feed and the sitemap.
+
+    Feed entries take precedence, as they also contain title and description; the sitemap fills in episodes
+    that dropped out of the feed.
+
+    Args:
+        feed_url (str, optional): URL of the RSS feed, None to skip the feed
+        sitemap_url (str, optional): URL of the sitemap, None to skip the sitemap
+
+    Returns:
+        Dict[int, dict]: Episode number -> dict with 'url' and, if known, 'title' and 'summary'
+    """
+    index = {}
+    sources = [(feed_url, iter_feed_episodes), (sitemap_url, iter_sitemap_episodes)]
+    for source_url, iter_episodes in sources:
+        if source_url is None:
+            continue
+        try:
+            for episode_num, episode in iter_episodes(source_url):
+                if episode_num in index:
+                    # Keep the feed entry, only fill in missing fields
+                    for key, value in episode.items():
+                        if not index[episode_num].get(key):
+                            index[episode_num][key] = value
+                else:
+                    index[episode_num] = episode
+        # requests.RequestException derives from OSError
+        except (OSError, ET.ParseError) as e:
+            print(f"Error reading {source_url}: {e}")
+
+    print(f"Discovered {len(index)} episodes")
+    return index
+
+
+def save_episode_index(index: Dict[int, dict], filename: str = "output/episode_index.json"):
+    """
+    Saves the episode index as JSON.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({str(num): episode for num, episode in sorted(index.items())}, f, ensure_ascii=False, indent=1)
+
+
+def load_episode_index(filename: str = "output/episode_index.json") -> Dict[int, dict]:
+    """
+    Loads an episode index saved with save_episode_index.
+
+    Returns:
+        Dict[int, dict]: Episode number -> episode dict, empty if the file does not exist
+    """
+    if not os.path.isfile(filename):
+        return {}
+    with open(filename, "r", encoding="utf-8") as f:
+        return {int(num): episode for num, episode in json.load(f).items()}
@@ -0,0 +1,94 @@
+"""
+Extraction Engine Comparison
+This script checks that the fast streaming extractor (fast_html_extraction.py) returns exactly the same title and
+summary as the BeautifulSoup based extraction on a corpus of saved episode pages, and compares their speed.
+
+The corpus is either a directory of saved .html pages or the HTTP cache filled by earlier crawl runs.
+
+Usage:
+    python extraction_benchmark.py [--pages DIR] [--cache DIR] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import glob
+import gzip
+import io
+import os
+import time
+from typing import List
+
+from website_crawler import extract_relevant_episode_data
+
+
+def load_corpus(pages_dir: str = None, cache_dir: str = "output/http_cache") -> List[str]:
+    """
+    Loads the saved episode pages.
+
+    Args:
+        pages_dir (str, optional): Directory with saved .html pages; takes precedence over the cache
+        cache_dir (str): Directory of the HTTP cache
+
+    Returns:
+        List[str]: HTML content of every page
+    """
+    pages = []
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    else:
+        for path in sorted(glob.glob(os.path.join(cache_dir, "blobs", "*.gz"))):
+            with gzip.open(path, "rb") as f:
+                pages.append(f.read().decode("utf-8", errors="replace"))
+    return pages
+
+
+def _time_engine(pages: List[str], engine: str, repeat: int):
+    results = []
+    start = time.perf_counter()
+    # Both engines print diagnostics for broken pages, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            results = [extract_relevant_episode_data(html_content=page, engine=engine) for page in pages]
+    return results, time.perf_counter() - start
+
+
+def compare_engines(pages: List[str], repeat: int = 3) -> bool:
+    """
+    Runs both engines over all pages, reports mismatches and the timings.
+
+    Returns:
+        bool: True if both engines returned identical results for every page
+    """
+    bs4_results, bs4_seconds = _time_engine(pages, "bs4", repeat)
+    fast_results, fast_seconds = _time_engine(pages, "fast", repeat)
+
+    mismatches = 0
+    for index, (expected, actual) in enumerate(zip(bs4_results, fast_results)):
+        if expected != actual:
+            mismatches += 1
+            print(f"Mismatch on page {index}:\n  bs4:  {expected!r}\n  fast: {actual!r}")
+
+    runs = max(len(pages) * repeat, 1)
+    print(f"Pages: {len(pages)}, mismatches: {mismatches}")
+    print(f"bs4:  {bs4_seconds / runs * 1000:.3f} ms/page")
+    print(f"fast: {fast_seconds / runs * 1000:.3f} ms/page")
+    if fast_seconds > 0:
+        print(f"Speedup: {bs4_seconds / fast_seconds:.1f}x")
+    return mismatches == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the fast and the BeautifulSoup extraction engines")
+    parser.add_argument("--pages", help="directory with saved .html episode pages")
+    parser.add_argument("--cache", default="output/http_cache", help="HTTP cache directory used as corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="number of passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pages, args.cache)
+    if not corpus:
+        print("No pages found, crawl some episodes first or pass --pages")
+    else:
+        identical = compare_engines(corpus, args.repeat)
+        raise SystemExit(0 if identical else 1)
@@ -0,0 +1,206 @@
+"""
+Offline Fake Providers
+Lightweight stand-ins for the LLM, geocoder, Wikipedia source, page fetcher and Spotify playlist (see
+providers.py). They answer
+deterministically from a hash of their input and never touch the network, which makes them suitable for dry runs
+of the whole pipeline and for tests. Their answers are marked as not cacheable, so they never end up in the
+persistent LLM or geocode caches.
+
+Dependencies:
+    - Standard library only
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from http_cache import CacheMissError, HttpCache
+
+# The places and search terms the fakes answer with, also used by the benchmarks to build matching inputs
+PLACES = [("Vienna, Austria", (48.2082, 16.3738)), ("Rome, Italy", (41.9028, 12.4964)),
+          ("Cajamarca, Peru", (-7.1638, -78.5003)), ("Iraq", (33.2232, 43.6793)), ("Berlin", (52.52, 13.405))]
+SEARCH_TERMS = ["Alboin", "Schlacht bei Waterloo", "Ivar Kreuger", "Parapsychologie", "Jemima Nicholas",
+                "Schachtürke"]
+
+
+def stable_hash(text: str) -> int:
+    """
+    Hash of a text that is the same in every process (Python's hash() is salted per process), so the fakes
+    answer the same across runs.
+    """
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:12], 16)
+
+
+def synthetic_episode_page(episode_num: int) -> str:
+    """
+    Builds a synthetic episode page with the structure of a geschichte.fm page.
+    """
+    term = SEARCH_TERMS[episode_num % len(SEARCH_TERMS)]
+    navigation = "".join(f'<li><a href="/archiv/gag{i}/">GAG{i}</a></li>' for i in range(200))
+    return (
+        f'<html><head><title>GAG{episode_num}</title><script>var episode = {episode_num};</script></head><body>'
+        f'<nav><ul>{navigation}</ul></nav>'
+        f'<h1 class="page-title">GAG{episode_num}: Eine Geschichte über {term}</h1>'
+        f'<div class="entry-content"><p>Wir springen in dieser Folge ins Jahr {1000 + episode_num % 1000} '
+        f'und sprechen über {term}.</p><p>Eine spannende Geschichte mit vielen Wendungen.</p>'
+        f'<p>Vielen Dank an alle Unterstützer!</p></div><footer><ul>{navigation}</ul></footer></body></html>'
+    )
+
+
+class FakeResponse:
+    """
+    LLM response with the attributes llm_call.py reads.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeLLMProvider:
+    """
+    LLM stand-in that recognizes the prompts of llm_call.py and gives well-formed, deterministic answers.
+    Batched prompts are answered with an empty array, so the batch functions fall back to single requests.
+    """
+    model_name = "fake"
+    cacheable = False
+
+    def generate(self, prompt: str, generation_config: dict, prefix: str = "") -> FakeResponse:
+        prompt = prefix + prompt
+        seed = stable_hash(prompt)
+        place = PLACES[seed % len(PLACES)][0]
+        term = SEARCH_TERMS[seed % len(SEARCH_TERMS)]
+        year = f"+{1000 + seed % 900:04d}"
+
+        if "Jede Episode ist mit einer ID markiert" in prompt:
+            return FakeResponse("[]")
+        if '"search_term"' in prompt:
+            return FakeResponse(json.dumps({"search_term": term, "location": place, "start_date": year,
+                                             "end_date": year}))
+        if "start_date" in prompt:
+            return FakeResponse(json.dumps({"start_date": year, "end_date": year}))
+        if "Suchbegriff" in prompt:
+            return FakeResponse(term)
+        return FakeResponse(place)
+
+
+class FakeGeocoder:
+    """
+    Geocoder stand-in: known places get their real coordinates, every other address stable made-up ones.
+    """
+    cacheable = False
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        known = dict(PLACES)
+        if address in known:
+            return known[address]
+        seed = stable_hash(address)
+        return round((seed % 18000) / 100 - 90, 4), round((seed // 18000 % 36000) / 100 - 180, 4)
+
+
+class FakeWikipediaProvider:
+    """
+    Wikipedia stand-in returning a short generated article for every search term.
+    """
+
+    def summary(self, search_term: str) -> Tuple[Optional[str], Optional[str]]:
+        if not search_term:
+            return None, None
+        return search_term, f"{search_term} ist ein Thema der Geschichte."
+
+
+class FakeFetcher:
+    """
+    Page fetcher stand-in: serves pages from the HTTP cache if they were fetched before and a synthetic
+    episode page otherwise.
+    """
+
+    def __init__(self, cache_dir: str = "output/http_cache"):
+        self._cache = HttpCache(cache_dir, offline=True)
+
+    def get_text(self, url: str, encoding: str = "utf-8") -> str:
+        try:
+            return self._cache.get_text(url, encoding)
+        except CacheMissError:
+            digits = re.findall(r'\d+', url)
+            return synthetic_episode_page(int(digits[-1]) if digits else 0)
+
+
+class FakePlaylist:
+    """
+    Stand-in for the Spotify playlist API with the same semantics: at most 100 items per add or remove call,
+    remove drops every occurrence of an item, and every write changes the snapshot id. The show has one
+    synthetic episode per episode number. If a path is given, the playlist is kept in that JSON file across runs.
+    """
+
+    def __init__(self, path: Optional[str] = None, episode_count: int = 1000):
+        self.path = path
+        self.episode_count = episode_count
+        self.calls: Counter = Counter()
+        self._items: List[str] = []
+        self._version = 0
+        if path and os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._items, self._version = state["items"], state["version"]
+
+    def snapshot_id(self) -> str:
+        self.calls["read"] += 1
+        return f"fake-snapshot-{self._version}"
+
+    def items(self) -> List[str]:
+        # Paged like the real API, one read per 100 items
+        self.calls["read"] += max(1, -(-len(self._items) // 100))
+        return list(self._items)
+
+    def show_episodes(self) -> List[Tuple[str, str]]:
+        self.calls["read"] += max(1, -(-self.episode_count // 50))
+        return [(f"spotify:episode:fake{num:04d}",
+                 f"GAG{num}: Eine Geschichte über {SEARCH_TERMS[num % len(SEARCH_TERMS)]}")
+                for num in range(1, self.episode_count + 1)]
+
+    def add(self, uris: List[str], position: Optional[int] = None) -> str:
+        self._check_batch(uris)
+        position = len(self._items) if position is None else position
+        if not 0 <= position <= len(self._items):
+            raise ValueError(f"Invalid position {position} for a playlist of {len(self._items)} items")
+        self._items[position:position] = uris
+        return self._write()
+
+    def remove(self, uris: List[str]) -> str:
+        self._check_batch(uris)
+        removed = set(uris)
+        self._items = [uri for uri in self._items if uri not in removed]
+        return self._write()
+
+    def reorder(self, range_start: int, insert_before: int, range_length: int = 1) -> str:
+        if range_start < 0 or range_length < 1 or range_start + range_length > len(self._items) \
+                or not 0 <= insert_before <= len(self._items):
+            raise ValueError(f"Invalid range {range_start}+{range_length} -> {insert_before}")
+        block = self._items[range_start:range_start + range_length]
+        del self._items[range_start:range_start + range_length]
+        if insert_before >= range_start + range_length:
+            insert_before -= range_length
+        elif insert_before > range_start:
+            insert_before = range_start
+        self._items[insert_before:insert_before] = block
+        return self._write()
+
+    @staticmethod
+    def _check_batch(uris: List[str]):
+        if len(uris) > 100:
+            raise ValueError(f"At most 100 items per call, got {len(uris)}")
+
+    def _write(self) -> str:
+        self.calls["write"] += 1
+        self._version += 1
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"items": self._items, "version": self._version}, f)
+        return f"fake-snapshot-{self._version}"
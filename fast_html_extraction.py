@@ -0,0 +1,218 @@
+"""
+Fast Episode Page Extraction
+This module extracts the episode title and summary from Geschichte.fm episode pages without building a full
+document tree. A streaming parser only collects the text of h1.page-title and of the first two <p> elements of
+div.entry-content, and stops reading the page as soon as both are complete.
+
+The output is identical to the BeautifulSoup based extraction in website_crawler, see extraction_benchmark.py
+for the comparison on a corpus of saved pages.
+
+Dependencies:
+    - Standard library only (html.parser)
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+UNWANTED_PHRASES = ['Vielen Dank', 'AUS UNSERER WERBUNG', 'Weiterlesen']
+
+# The phrases never overlap each other, so cutting at the earliest match of any of them gives the same result
+# as cutting at each phrase one after another
+_UNWANTED_PHRASES_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in UNWANTED_PHRASES))
+
+# Text inside these elements is not part of get_text() in BeautifulSoup
+_NON_TEXT_ELEMENTS = {'script', 'style', 'template'}
+
+_VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source',
+                  'track', 'wbr'}
+
+# Whitespace-only strings outside these elements are collapsed to a single space or newline by BeautifulSoup
+_WHITESPACE_PRESERVING_ELEMENTS = {'pre', 'textarea'}
+
+_ASCII_SPACES = {ord(char): None for char in '\x20\x0a\x09\x0c\x0d'}
+
+_CHUNK_SIZE = 16 * 1024
+
+
+def clean_summary(summary: str) -> str:
+    """
+    Cuts the summary at the first unwanted text pattern (thank-you notes, ads, "read more" links).
+
+    Args:
+        summary (str): Combined paragraph text
+
+    Returns:
+        str: Cleaned summary
+    """
+    match = _UNWANTED_PHRASES_PATTERN.search(summary)
+    if match:
+        summary = summary[:match.start()]
+    return summary.strip()
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _EpisodePageParser(HTMLParser):
+    """
+    Streaming parser collecting the title and the first two content paragraphs of an episode page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.content_found = False
+        self.paragraphs: List[List[str]] = []
+
+        # Stack of open element names, used to match end tags like BeautifulSoup's tree builder does
+        self._open_elements: List[str] = []
+        self._title_depth: Optional[int] = None
+        self._title_parts: List[str] = []
+        self._content_depth: Optional[int] = None
+        self._content_done = False
+        # (depth, paragraph index) of the currently open paragraphs, nested paragraphs are possible
+        self._open_paragraphs: List[tuple] = []
+        self._non_text_depth = 0
+        self._preserve_whitespace_depth = 0
+        # Text is buffered until the next markup, since the parser may deliver a single string in pieces
+        self._pending_text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in _VOID_ELEMENTS:
+            return
+        self._open_elements.append(tag)
+        depth = len(self._open_elements)
+
+        if tag in _NON_TEXT_ELEMENTS:
+            self._non_text_depth += 1
+        if tag in _WHITESPACE_PRESERVING_ELEMENTS:
+            self._preserve_whitespace_depth += 1
+        if tag == 'h1' and self.title is None and self._title_depth is None and self._has_class(attrs, 'page-title'):
+            self._title_depth = depth
+        elif tag == 'div' and not self.content_found and self._has_class(attrs, 'entry-content'):
+            self.content_found = True
+            self._content_depth = depth
+        elif tag == 'p' and self._content_depth is not None and not self._content_done and len(self.paragraphs) < 2:
+            self._open_paragraphs.append((depth, len(self.paragraphs)))
+            self.paragraphs.append([])
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags like <br/> contain no text
+        if tag not in _VOID_ELEMENTS:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # Ignore end tags without a matching open element, close everything up to the matching one otherwise
+        if tag not in self._open_elements:
+            return
+        while self._open_elements:
+            closed = self._open_elements.pop()
+            self._close(closed, len(self._open_elements) + 1)
+            if closed == tag:
+                break
+        self._check_done()
+
+    def handle_data(self, data):
+        self._pending_text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+
+    def _flush_text(self):
+        if not self._pending_text:
+            return
+        text = "".join(self._pending_text)
+        self._pending_text = []
+        if self._non_text_depth:
+            return
+        if not self._preserve_whitespace_depth and not text.translate(_ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+
+        if self._title_depth is not None:
+            self._title_parts.append(text)
+        for _, paragraph_index in self._open_paragraphs:
+            self.paragraphs[paragraph_index].append(text)
+
+    def _close(self, tag: str, depth: int):
+        if tag in _NON_TEXT_ELEMENTS:
+            self._non_text_depth -= 1
+        if tag in _WHITESPACE_PRESERVING_ELEMENTS:
+            self._preserve_whitespace_depth -= 1
+        if self._title_depth == depth:
+            self.title = "".join(self._title_parts)
+            self._title_depth = None
+        if self._open_paragraphs and self._open_paragraphs[-1][0] == depth:
+            self._open_paragraphs.pop()
+        if self._content_depth == depth:
+            self._content_depth = None
+            self._content_done = True
+
+    def _check_done(self):
+        # Early termination: the title is known and no more paragraph text can follow
+        paragraphs_done = self._content_done or (len(self.paragraphs) == 2 and not self._open_paragraphs)
+        if self.title is not None and paragraphs_done:
+            raise _StopParsing()
+
+    def finish(self):
+        # Elements still open at the end of the document are closed implicitly
+        self._flush_text()
+        while self._open_elements:
+            closed = self._open_elements.pop()
+            self._close(closed, len(self._open_elements) + 1)
+
+    @staticmethod
+    def _has_class(attrs, class_name: str) -> bool:
+        for name, value in attrs:
+            if name == 'class' and value and class_name in value.split():
+                return True
+        return False
+
+
+def extract_episode_data_fast(html_content: str) -> Optional[Dict[str, str]]:
+    """
+    Extracts episode title and summary from the HTML of a Geschichte.fm episode page.
+
+    Args:
+        html_content (str): Raw HTML content
+
+    Returns:
+        dict: Dictionary containing:
+            - title (str): Episode title
+            - summary (str): Combined and cleaned first two paragraphs
+        None: If no summary was found
+    """
+    parser = _EpisodePageParser()
+    try:
+        for start in range(0, len(html_content), _CHUNK_SIZE):
+            parser.feed(html_content[start:start + _CHUNK_SIZE])
+        parser.close()
+    except _StopParsing:
+        pass
+    parser.finish()
+
+    if not parser.content_found:
+        print("Content div not found")
+        return None
+
+    summary = clean_summary(" ".join("".join(parts) for parts in parser.paragraphs))
+    if not summary:
+        return None
+
+    return {
+        "title": (parser.title or "").strip(),
+        "summary": summary
+    }
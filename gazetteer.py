@@ -0,0 +1,168 @@
+"""
+Local Gazetteer for Offline Geocoding
+This module resolves common place names to coordinates without any network access, using a GeoNames-style
+gazetteer file (e.g. cities15000.txt from https://download.geonames.org/export/dump/). All names and alternate
+names are indexed in a dict by their normalized form; a name that is not found as a whole is matched by its longest
+prefix ending at a word boundary ("Wien Innere Stadt" -> "Wien").
+
+Country qualifiers ("Cajamarca, Peru", "Paris, FR") are resolved with the GeoNames countryInfo.txt next to the
+gazetteer file, if present, and with the country rows (A/PCL*) of the gazetteer itself; ISO country codes are
+always understood.
+
+Dependencies:
+    - Standard library only
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+COUNTRY_INFO_FILE = "countryInfo.txt"
+
+# Column positions in the GeoNames main table format
+_NAME, _ASCII_NAME, _ALTERNATE_NAMES, _LATITUDE, _LONGITUDE, _FEATURE_CLASS, _FEATURE_CODE, _COUNTRY_CODE = \
+    1, 2, 3, 4, 5, 6, 7, 8
+_POPULATION = 14
+# Column positions in countryInfo.txt
+_ISO, _ISO3, _COUNTRY_NAME = 0, 1, 4
+
+
+def normalize_place_name(name: str) -> str:
+    """
+    Normalizes a place name for lookups: case-folded, without accents, quotes and surplus whitespace.
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.replace('"', ' ').replace("'", ' ').replace("„", ' ').replace("“", ' ')
+    return " ".join(name.casefold().split()).strip(" .")
+
+
+class Gazetteer:
+    """
+    Place name lookup loaded from a GeoNames-style file, indexed by normalized name.
+    """
+
+    def __init__(self, path: str, min_population: int = 0, countries_path: Optional[str] = None):
+        """
+        Args:
+            path (str): Path of the tab-separated GeoNames-style file
+            min_population (int): Places with a smaller population are skipped (countries are always kept)
+            countries_path (str, optional): Path of the GeoNames countryInfo.txt, by default next to the gazetteer
+        """
+        self.path = path
+        # Up to five places per normalized name, the most populous first
+        self._places: Dict[str, List[Tuple[float, float, str, int]]] = {}
+        # Country code of every country name and ISO code, used to disambiguate places like "Paris, France"
+        self._countries: Dict[str, str] = {}
+        self._load(min_population)
+        self._load_countries(countries_path or os.path.join(os.path.dirname(path), COUNTRY_INFO_FILE))
+
+    def _load(self, min_population: int):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) <= _POPULATION:
+                    continue
+                try:
+                    place = (float(columns[_LATITUDE]), float(columns[_LONGITUDE]), columns[_COUNTRY_CODE],
+                             int(columns[_POPULATION] or 0))
+                except ValueError:
+                    continue
+
+                names = {columns[_NAME], columns[_ASCII_NAME]}
+                names.update(name for name in columns[_ALTERNATE_NAMES].split(",") if name)
+                is_country = columns[_FEATURE_CLASS] == "A" and columns[_FEATURE_CODE].startswith("PCL")
+                if is_country:
+                    for name in names:
+                        self._countries[normalize_place_name(name)] = columns[_COUNTRY_CODE]
+                elif place[3] < min_population:
+                    continue
+
+                # The ISO code of every loaded place is a valid qualifier, even without any country file
+                self._countries.setdefault(columns[_COUNTRY_CODE].casefold(), columns[_COUNTRY_CODE])
+                for name in {normalize_place_name(name) for name in names}:
+                    self._insert(name, place)
+
+    def _load_countries(self, path: str):
+        if not os.path.isfile(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) <= _COUNTRY_NAME or not columns[_ISO]:
+                    continue
+                for name in (columns[_ISO], columns[_ISO3], columns[_COUNTRY_NAME]):
+                    key = normalize_place_name(name)
+                    if key:
+                        self._countries.setdefault(key, columns[_ISO])
+
+    def _insert(self, key: str, place: Tuple[float, float, str, int]):
+        if not key:
+            return
+        candidates = self._places.setdefault(key, [])
+        if place not in candidates:
+            candidates.append(place)
+            # Most populous place first, it is the most likely meaning of an ambiguous name
+            candidates.sort(key=lambda candidate: -candidate[3])
+            del candidates[5:]
+
+    def _longest_prefix(self, key: str) -> Optional[List]:
+        # Longest name the key starts with, ending at a word boundary
+        boundaries = [match.start() for match in re.finditer(r'[^\w]+', key)]
+        for end in reversed(boundaries):
+            candidates = self._places.get(key[:end])
+            if candidates:
+                return candidates
+        return None
+
+    def lookup(self, address: str) -> Optional[Tuple[float, float]]:
+        """
+        Resolves an address like "Vienna, Austria" or "Cajamarca, Peru" to coordinates.
+
+        Args:
+            address (str): Place name, optionally followed by comma separated region or country parts
+
+        Returns:
+            Tuple[float, float]: (latitude, longitude), None if the place is not in the gazetteer, or not in the
+                                 named country
+        """
+        parts = [normalize_place_name(part) for part in address.split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+
+        country_code = self._countries.get(parts[-1]) if len(parts) > 1 else None
+        candidates = self._places.get(parts[0]) or self._longest_prefix(parts[0])
+        if not candidates:
+            return None
+
+        if country_code:
+            # A place of the same name in another country is a wrong answer, the caller falls back to the geocoder
+            candidates = [candidate for candidate in candidates if candidate[2] == country_code]
+            if not candidates:
+                return None
+        latitude, longitude, _, _ = candidates[0]
+        return latitude, longitude
+
+
+_gazetteers: Dict[str, Gazetteer] = {}
+_gazetteers_lock = threading.Lock()
+
+
+def load_gazetteer(path: str) -> Optional[Gazetteer]:
+    """
+    Returns the gazetteer for the path, loading it on first use.
+
+    Returns:
+        Gazetteer: The loaded gazetteer, None if the file does not exist
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    with _gazetteers_lock:
+        if path not in _gazetteers:
+            _gazetteers[path] = Gazetteer(path)
+        return _gazetteers[path]
@@ -0,0 +1,76 @@
+"""
+Persistent Geocoding Cache
+This module stores geocoding results in a small SQLite database, keyed on the normalized address, so that the
+same place ("Rome, Italy", "rome, italy ") is only ever geocoded once. Addresses that could not be resolved are
+cached as well, so they do not trigger another paid request either. Every thread uses its own connection (see
+sqlite_connections.py).
+
+Dependencies:
+    - Standard library only (sqlite3)
+"""
+
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from gazetteer import normalize_place_name
+from sqlite_connections import ThreadLocalConnections
+
+# Returned by GeocodeCache.get for addresses that are not cached at all, as opposed to cached misses (None)
+NOT_CACHED = object()
+
+
+class GeocodeCache:
+    """
+    SQLite-backed cache of address -> coordinates.
+    """
+
+    def __init__(self, path: str = "output/geocode_cache.sqlite"):
+        """
+        Args:
+            path (str): Location of the SQLite database
+        """
+        self.path = path
+        self._connections = ThreadLocalConnections(path, setup=self._create_tables)
+
+    def get(self, address: str):
+        """
+        Returns the cached coordinates of an address.
+
+        Returns:
+            Tuple[float, float]: (latitude, longitude) for a cached hit,
+            None for a cached miss, or NOT_CACHED if the address was never geocoded
+        """
+        row = self._connect().execute("SELECT latitude, longitude FROM geocodes WHERE address_key = ?",
+                                      (normalize_place_name(address),)).fetchone()
+        if row is None:
+            return NOT_CACHED
+        if row[0] is None:
+            return None
+        return row[0], row[1]
+
+    def put(self, address: str, coordinates: Optional[Tuple[float, float]], source: str):
+        """
+        Stores the coordinates of an address (None for addresses that could not be resolved).
+
+        Args:
+            address (str): The geocoded address
+            coordinates (Tuple[float, float], optional): (latitude, longitude)
+            source (str): Where the coordinates came from, e.g. 'google' or 'gazetteer'
+        """
+        latitude, longitude = coordinates if coordinates else (None, None)
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO geocodes (address_key, address, latitude, longitude, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_place_name(address), address, latitude, longitude, source, time.time()))
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection):
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes (address_key TEXT PRIMARY KEY, address TEXT NOT NULL, "
+            "latitude REAL, longitude REAL, source TEXT NOT NULL, created_at REAL NOT NULL)")
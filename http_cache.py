@@ -0,0 +1,174 @@
+"""
+Persistent HTTP Response Cache
+This module provides an on-disk cache for HTTP GET responses. Response bodies are stored gzip-compressed and
+content-addressed (by their SHA-256 hash), while a small metadata file per URL keeps the ETag and Last-Modified
+headers. Cached entries are revalidated with conditional GET requests, so unchanged pages are answered with a
+304 instead of a full download. If revalidation fails with a connection error or a 5xx answer, the cached copy is
+served. In offline mode responses are served from the cache only.
+
+Dependencies:
+    - http_transport: For the shared pooled and rate-limited HTTP transport
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from http_transport import get_transport
+from metrics import increment
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+class HttpCache:
+    """
+    Content-addressed, gzip-compressed HTTP response cache with conditional revalidation.
+
+    Layout below cache_dir:
+        meta/<sha256(url)>.json   - url, etag, last_modified, encoding and the body hash
+        blobs/<sha256(body)>.gz   - compressed response body, shared by identical responses
+    """
+
+    def __init__(self, cache_dir: str = "output/http_cache", offline: bool = False, timeout: float = 30.0):
+        """
+        Args:
+            cache_dir (str): Directory the cache is stored in
+            offline (bool): Serve responses from the cache only, never touch the network
+            timeout (float): Timeout for network requests in seconds
+        """
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.timeout = timeout
+        self._meta_dir = os.path.join(cache_dir, "meta")
+        self._blob_dir = os.path.join(cache_dir, "blobs")
+
+    def get_text(self, url: str, encoding: str = "utf-8") -> str:
+        """
+        Returns the body of the URL as text, using the cache wherever possible.
+
+        Args:
+            url (str): URL to fetch
+            encoding (str): Encoding used to decode the response body
+
+        Returns:
+            str: Decoded response body
+
+        Raises:
+            CacheMissError: If offline mode is enabled and the URL is not cached
+            requests.RequestException: If the request fails and no cached copy exists
+        """
+        return self.get_bytes(url).decode(encoding, errors="replace")
+
+    def get_bytes(self, url: str) -> bytes:
+        """
+        Returns the raw body of the URL, using the cache wherever possible.
+
+        Args:
+            url (str): URL to fetch
+
+        Returns:
+            bytes: Response body
+        """
+        meta = self._read_meta(url)
+        cached_body = self._read_blob(meta["sha256"]) if meta else None
+
+        if self.offline:
+            if cached_body is None:
+                increment("http_cache_miss")
+                raise CacheMissError(f"URL not in cache (offline mode): {url}")
+            increment("http_cache_hit")
+            return cached_body
+
+        # Imported here, so that offline runs and the CLI start without loading requests
+        import requests
+
+        headers = {}
+        if cached_body is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = get_transport().get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            # Fall back to a stale copy rather than failing the whole crawl
+            if cached_body is not None:
+                print(f"Request failed, using cached copy of {url}")
+                increment("http_cache_stale_hit")
+                return cached_body
+            raise
+
+        if response.status_code == 304 and cached_body is not None:
+            increment("http_cache_hit")
+            return cached_body
+        if response.status_code >= 500 and cached_body is not None:
+            # A server hiccup during revalidation does not make the cached copy unusable
+            print(f"Server answered {response.status_code}, using cached copy of {url}")
+            increment("http_cache_stale_hit")
+            return cached_body
+        increment("http_cache_miss")
+
+        response.raise_for_status()
+        body = response.content
+        self._store(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return body
+
+    def _store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        body_hash = hashlib.sha256(body).hexdigest()
+        blob_path = os.path.join(self._blob_dir, f"{body_hash}.gz")
+        if not os.path.isfile(blob_path):
+            self._atomic_write(blob_path, gzip.compress(body))
+
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": body_hash,
+        }
+        self._atomic_write(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+
+    def _read_meta(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(url), "rb") as f:
+                return json.loads(f.read().decode("utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _read_blob(self, body_hash: str) -> Optional[bytes]:
+        try:
+            with gzip.open(os.path.join(self._blob_dir, f"{body_hash}.gz"), "rb") as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def _meta_path(self, url: str) -> str:
+        url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._meta_dir, f"{url_hash}.json")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        # Write to a temporary file first so concurrent readers never see half-written entries
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def offline_http_cache() -> HttpCache:
+    """
+    Returns an HTTP cache that only serves cached responses, used as the 'offline' fetcher provider.
+    """
+    return HttpCache(offline=True)
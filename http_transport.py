@@ -0,0 +1,249 @@
+"""
+Shared HTTP Transport
+This module provides the one HTTP transport all outbound calls of the crawler go through: a pooled requests
+session with keep-alive connections, per-host token-bucket rate limits, default timeouts and retries with jittered
+exponential backoff that honor Retry-After headers.
+
+Only idempotent requests (GET, HEAD, OPTIONS) are retried after any failure. A write that may have reached the
+server, e.g. adding items to a playlist, would be applied twice by a replay; writes are therefore only retried if no
+connection could be established or the server rejected them with 429 and a Retry-After header.
+
+Clients that cannot use the session directly (the Gemini client talks to its API on its own) still take their
+tokens from the same per-host buckets with throttle().
+
+Rate limits (requests per second) can be overridden in config.ini:
+
+    [rate_limits]
+    www.geschichte.fm = 4
+    de.wikipedia.org = 10
+
+Dependencies:
+    - requests: For the pooled session, only imported when the first request is sent
+"""
+
+import configparser
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from metrics import increment
+
+GESCHICHTE_HOST = "www.geschichte.fm"
+WIKIPEDIA_HOST = "de.wikipedia.org"
+GEMINI_HOST = "generativelanguage.googleapis.com"
+MAPS_HOST = "maps.googleapis.com"
+SPOTIFY_HOST = "api.spotify.com"
+
+# Requests per second and burst size per host; hosts without an entry are not limited
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    GESCHICHTE_HOST: (4.0, 8),
+    WIKIPEDIA_HOST: (10.0, 10),
+    GEMINI_HOST: (1.0, 5),
+    MAPS_HOST: (40.0, 40),
+    SPOTIFY_HOST: (5.0, 10),
+}
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `burst` requests and `rate` requests per second on average.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Maximum number of tokens in the bucket
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes one token, waiting until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HttpTransport:
+    """
+    Pooled, rate-limited and retrying HTTP transport shared by all fetchers.
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, Tuple[float, int]]] = None, pool_size: int = 32,
+                 timeout: float = 30.0, max_retries: int = 4, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        """
+        Args:
+            rate_limits (Dict[str, Tuple[float, int]], optional): Host -> (requests per second, burst size),
+                                                                  defaults to DEFAULT_RATE_LIMITS
+            pool_size (int): Maximum number of kept-alive connections per host
+            timeout (float): Timeout in seconds of requests that do not set their own
+            max_retries (int): Retries of failed connections and of 429/5xx responses (of writes only see above)
+            backoff_base (float): Upper bound of the first backoff delay in seconds, doubled with every retry
+            backoff_max (float): Upper bound of any backoff delay in seconds
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {host: TokenBucket(rate, burst)
+                         for host, (rate, burst) in (rate_limits if rate_limits is not None
+                                                     else DEFAULT_RATE_LIMITS).items()}
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        The shared requests session. Requests sent through it are rate limited and retried like get().
+        """
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def get(self, url: str, **kwargs):
+        """
+        Sends a GET request, see requests.get for the arguments.
+
+        Returns:
+            requests.Response: The response, possibly with an error status once all retries are used up
+        """
+        return self.session.get(url, **kwargs)
+
+    def throttle(self, host: str) -> float:
+        """
+        Waits until the rate limit of the host allows another request.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            return 0.0
+        waited = bucket.acquire()
+        if waited:
+            increment("http_throttled_seconds", waited)
+        return waited
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        transport = self
+
+        class _TransportSession(requests.Session):
+            def request(self, method, url, **kwargs):
+                return transport._send(super().request, method, url, **kwargs)
+
+        session = _TransportSession()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _send(self, send, method: str, url: str, **kwargs):
+        import requests
+
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname or ""
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.max_retries + 1):
+            self.throttle(host)
+            increment("http_request")
+            try:
+                response = send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or self._not_sent(e)):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                retry_after = self._retry_after(response)
+                retryable = response.status_code in RETRY_STATUS_CODES and (
+                    idempotent or (response.status_code == 429 and "Retry-After" in response.headers))
+                if not retryable or attempt == self.max_retries:
+                    return response
+                delay = max(self._backoff(attempt), retry_after)
+                response.close()
+            increment("http_retry")
+            time.sleep(delay)
+
+    @staticmethod
+    def _not_sent(error) -> bool:
+        # True if no connection could be established, so the server cannot have seen the request
+        import requests
+        from urllib3.exceptions import NewConnectionError
+
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        # requests wraps urllib3's MaxRetryError, whose reason is the actual connection error
+        cause = error.args[0] if error.args else None
+        return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads the retries of concurrent workers instead of sending them in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        # Retry-After is either a number of seconds or an HTTP date; very long waits are capped at 5 minutes
+        value = response.headers.get("Retry-After")
+        if not value:
+            return 0.0
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return 0.0
+        return min(max(seconds, 0.0), 300.0)
+
+
+def _configured_rate_limits() -> Dict[str, Tuple[float, int]]:
+    rate_limits = dict(DEFAULT_RATE_LIMITS)
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    if config.has_section('rate_limits'):
+        for host, rate in config.items('rate_limits'):
+            rate_limits[host] = (float(rate), max(1, int(float(rate))))
+    return rate_limits
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Returns the process-wide transport, creating it with the rate limits from config.ini on first use.
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport(_configured_rate_limits())
+        return _transport
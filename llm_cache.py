@@ -0,0 +1,98 @@
+"""
+Persistent LLM Response Cache
+This module stores LLM responses in a small SQLite database, keyed on a hash of the prompt and the generation
+parameters. The cache is bounded both in number of entries and in total size; least recently used entries
+are evicted first. Every thread uses its own connection (see sqlite_connections.py).
+
+Dependencies:
+    - Standard library only (sqlite3)
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Optional
+
+from sqlite_connections import ThreadLocalConnections
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed LRU cache for LLM response texts.
+    """
+
+    def __init__(self, path: str = "output/llm_cache.sqlite", max_entries: int = 20000,
+                 max_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            path (str): Location of the SQLite database
+            max_entries (int): Maximum number of cached responses
+            max_bytes (int): Maximum total size of the cached response texts in bytes
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._connections = ThreadLocalConnections(path, setup=self._create_tables)
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, top_k: int, max_output_tokens: int) -> str:
+        """
+        Builds the cache key for a prompt and its generation parameters.
+
+        Returns:
+            str: SHA-256 hex digest identifying the request
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key_data = json.dumps([prompt_hash, model, temperature, top_k, max_output_tokens])
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached response text for the key, or None on a miss.
+        """
+        connection = self._connect()
+        with connection:
+            row = connection.execute("SELECT text FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, text: str):
+        """
+        Stores a response text and evicts least recently used entries if the cache is over its limits.
+        """
+        size = len(text.encode("utf-8"))
+        connection = self._connect()
+        # Insert and eviction are one transaction, concurrent writers wait for each other
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()))
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        count, total_size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+
+        # Walk the entries from least to most recently used until both limits are met again
+        evict_keys = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            count -= 1
+            total_size -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", evict_keys)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection):
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
@@ -1,46 +1,40 @@
 import configparser
-import google.generativeai as genai
+import datetime
 import json
 import re
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 
-def get_gemini_response(prompt: str, temperature: float = 0.3, max_output_tokens = 40):
-    """
-    Send a prompt to Gemini Pro and get response
+from date_parser import DEFAULT_MIN_CONFIDENCE, parse_dates
+from http_transport import GEMINI_HOST, get_transport
+from llm_cache import LLMResponseCache
+from metrics import increment
+from providers import LLM, get_provider
 
-    Args:
-        prompt (str): The input text prompt
-        temperature (float): Controls randomness (0.0 to 1.0)
-                           0.0 = focused/deterministic
-                           1.0 = more creative/random
-    """
+MODEL_NAME = 'gemini-pro'
 
-    config = configparser.ConfigParser()
-    config.read('config.ini')
+_response_cache = LLMResponseCache("output/llm_cache.sqlite")
 
-    # Set up your Spotify API credentials from the config file
-    api_key = config['gemini']['api_key']
-    genai.configure(api_key=api_key)
 
-    model = genai.GenerativeModel('gemini-pro')
-
-    # Configure generation parameters
-    generation_config = {
-        'temperature': temperature,
-        'top_p': 1.0,
-        'top_k': 1,
-        'max_output_tokens': max_output_tokens,
-    }
-
-    response = model.generate_content(
-        prompt,
-        generation_config=generation_config
-    )
+def configure_response_cache(path: str):
+    """
+    Moves the persistent LLM response cache to another location, e.g. into the directory of a shard.
+    """
+    global _response_cache
+    _response_cache = LLMResponseCache(path)
 
-    return response
+# Shared by all hedged requests, so concurrent episodes cannot start an unbounded number of Gemini calls
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+# Seconds a hedged attempt may take before the next one is sent alongside it
+HEDGE_DELAY_SECONDS = 3.0
+# top_k of sampled retries; with the default greedy decoding (top_k = 1) a retry would repeat the same answer
+SAMPLING_TOP_K = 40
 
 
-def get_goelocation_from_episode_information(text: str):
-    prompt = f"""
+# Task instructions and few-shot examples, shared by the single-episode and the batched prompts
+_GEOLOCATION_INSTRUCTIONS = """
         Du bist ein Spezialist für die Analyse von Texten und die Extraktion von Ortsangaben. Deine Aufgabe ist es, aus der Beschreibung einer Podcast-Episode den wichtigsten geografischen Ort zu bestimmen.
         
         Regeln:
@@ -64,6 +58,200 @@ def get_goelocation_from_episode_information(text: str):
             Input: "Wir sprechen über den Beamten Wolfgang von Kempelen, der in Wien einen faszinierenden Schachautomaten konstruierte, um die Kaiserin zu beeindrucken."
             Output: "Vienna, Austria"
         
+"""
+
+_YEAR_INSTRUCTIONS = """
+    Sie sind ein Spezialist für die Extraktion historischer Daten. Ihre Aufgabe ist es, die Beschreibungen von Podcast-Episoden zu analysieren und den Zeitraum zu bestimmen, über den gesprochen wird. Bitte geben Sie die Anfangs- und Enddaten der erwähnten historischen Ereignisse oder Zeiträume an.
+
+    Regeln:
+    1. Verwenden Sie immer das Format +YYYY für Jahreszahlen (z. B. +1789 statt „18. Jahrhundert“ oder „1700er“)
+    2. Wenn keine genauen Daten genannt werden, nutzen Sie Ihr Wissen, um eine fundierte Schätzung vorzunehmen.
+    3. Wenn ein einjähriges Ereignis erwähnt wird, verwenden Sie dasselbe Jahr als Anfangs- und Enddatum.
+    5. Wenn eine Zeitspanne nur grob angegeben ist, z.B. Mittelalter oder altes Ägypten, dann wähle die Zeitspanne für das Mittelalter oder alte Ägypten aus.
+
+    Hier sind einige Beispiele:    
+
+        Beispiel 1:
+        Input: "Wir springen in dieser Folge ins Jahr 53 vdZw., als sich in einer Ebene in Mesopotamien zwei Heere gegenüber stehen. Auf der einen Seite das des Partherreichs, angeführt von Surena, auf der anderen eines der Römischen Republik, angeführt von M. Licinius Crassus. Wir werden in dieser Folge über diese Schlacht, die Osterweiterung Roms und die Folgen der Schlacht für die Römische Republik sprechen."
+        Output: {"start_date": "-0053", "end_date": "-0053"}
+
+        Beispiel 2:
+        Input: "Im November 1532 nehmen spanische Konquistadoren unter dem Kommando von Francisco Pizarro den letzten König der Inka gefangen: Atahualpa. Dabei gelangen sie an Unmengen Gold und Silber. Spätestens jetzt sind viele Konquistadoren überzeugt, dass die Gerüchte um ein sagenumwobenes Goldland wahr sind. Liegen die Ursprünge der Eldorado-Legende vielleicht bei einem kleinen Bergsee bei Guatavita im heutigen Kolumbien? Wir sprechen in der Folge über deutsche Konquistadoren, die sich für die Welser in Klein-Venedig auf die Jagd nach Eldorado machten und über Philipp von Hutten, den Generalkapitän Venezuelas, dessen Goldsuche auf tragische Weise endete – ohne Goldfund."
+        Output: {"start_date": "+1532", "end_date": "+1532"}
+
+        Beispiel 3:
+        Input: "Wir springen diesmal in die 2. Hälfte des 18. Jahrhunderts. Automaten, also mechanische Konstrukte, die selbständig jene Dinge tun, die eigentlich lebenden Wesen vorbehalten waren, sind gerade der große Renner. Und auch in Wien konstruiert der Beamte Wolfgang von Kempelen einen solchen Automaten um die Kaiserin zu beeindrucken. Wir sprechen über diesen Automaten – den Schachtürken – und die Erfolge, die er bald darauf in ganz Europa feiern wird. Doch der faszinierende Automat birgt ein Geheimnis, das die Menschen selbst lang nach dem Ableben seines Erschaffers beschäftigen wird."
+        Output: {"start_date": "+1750", "end_date": "+1800"}
+        
+        Beispiel 4:
+        Input: "Wir springen nach Amsterdam: 1661 beginnt dort der Katholik Jan Hartmann, eine Kirche in sein Grachtenhaus zu bauen. Es entstand eine beeindruckende Kirche, die bis zum Ende des 19. Jahrhunderts genutzt wurde, ehe sie 1888 zu einem Museum wurde, das noch heute besucht werden kann: das Museum Ons’ Lieve Heer op Solder. Um zu klären, warum Jan Hartmann das gemacht hat, sprechen wir über eine faszinierende Zeit in der niederländischen Geschichte: Die Reformation, den Achtzigjährigen Krieg und das Goldene Zeitalter, in dem Amsterdam zu einer der bedeutendsten Städte der Welt wurde."
+        Output: {"start_date": "+1661", "end_date": "+1888"}
+        
+
+"""
+
+_SEARCH_TERM_INSTRUCTIONS = """
+    Ihre Aufgabe ist es, den wichtigsten historischen Suchbegriff aus einer Podcast-Episodenbeschreibung zu extrahieren.
+    Dieser Suchbegriff soll genutzt werden, um der den relevantesten Wikipedia-Artikel zu finden. 
+
+    Anweisungen zur Bearbeitung der Episodenbeschreibung:
+    1. Identifizieren Sie das zentrale historische Thema, die Person, das Ereignis oder das Konzept
+    2. Bevorzugen Sie spezifische Eigennamen gegenüber allgemeinen Begriffen
+    3. Wenn mehrere Begriffe existieren, wählen Sie den historisch bedeutendsten aus
+    4. Geben Sie nur den Suchbegriff in deutscher Sprache zurück, da er für die deutsche Wikipedia verwendet wird
+    5. Fügen Sie keinen erklärenden Text oder mehrere Optionen ein.
+
+    Beispiel 1:
+    Input: „GAG01 Vier Langobarden-Könige und ein Trinkbecher: Frühes Mittelalter in Italien: Die Zeiten sind rau, alle wollen ein Stück vom Kuchen des ehemaligen weströmischen Reichs abhaben. Einer von ihnen ist Alboin, Langobardenkönig. Und wie so oft, war auch ihm kein Greisenalter vergönnt.“
+    Output: „Alboin“
+    
+    Beispiel 2:
+    Input: "GAG11: Von Kindern und Kegeln: Wer oder was ist eigentlich der »Kegel«? In diesem Zeitsprung gehen wir dieser Frage nach, sehen uns einen dieser Kegel genauer an und reisen gemeinsam von Regensburg nach Madrid und Brüssel. Wieder mal mit der großartigen stimmlichen Unterstützung von Martin Hemmer."
+    Output: "Kind und Kegel"
+    
+    Beispiel 3:
+    Input: "GAG422: Eine kleine Geschichte der Parapsychologie. Wir springen diesmal an den Beginn des 20. Jahrhunderts. Schauplatz ist Österreich, wo sich ein neuer Forschungszweig etabliert. Erzählt von Anna Masoner, widmen wir uns einer Zeit, in der viele Dinge noch möglich schienen. Mittendrin ein Dienstmädchen namens Wilma, dessen Fähigkeiten nun in den Fokus eben jener Forschung rücken."
+    Output: "Parapsychologie"
+    
+    Beispiel 4:
+    Input: "GAG182: Der Zündholzkönig Ivar Kreuger. Wir springen in die 1920er Jahre und beschäftigen uns mit Streichhölzern: Genauer gesagt, mit dem Mann, der mit Streichhölzern ein gigantisches Firmenimperium aufgebaut hat, im Zentrum des amerikanischen Börsenbooms stand, zahlreiche Finanzprodukte erfunden und einen Finanzskandal ausgelöst hat, der 1933 und 1934 zur Regulierung der Börsen in den USA geführt hat. Sein Geschäftsmodell: Kredite an Staaten zahlen und im Gegenzug dort ein Zündholzmonopol erhalten. Auf diese Weise wurde Kreuger zum größten Kreditgeber für Europa. Der Deal mit Deutschland aus dem Jahr 1930 hatte bis ins Jahr 1983 bestand. Bis dahin durften in Deutschland nur Zündhölzer der Marken Welthölzer und Haushaltsware produziert und verkauft werden."
+    Output: "Ivar Kreuger"
+    
+    Beispiel 5:
+    Input: "GAG441: Jemima Nicholas und die Schlacht von Fishguard. Wir springen in dieser Folge ans Ende des 18. Jahrhunderts. Im Zuge der Revolutionskriege wird von Frankreich der Plan einer Invasion Großbritanniens ausgeheckt. Ausgangsort soll Irland sein, doch nichts läuft so wie geplant. Schlussendlich wird es vor allem eine Schusterin aus Wales werden, deren Andenken heute noch an diese letzte Invasion Großbritanniens erinnert. Das Episodenbild zeigt einen Ausschnitt einer Darstellung der Landung der Franzosen in Wales, aus einem zeitgenössischen Reiseführer."
+    Output: "Jemima Nicholas"
+    
+    Beispiel 6:
+    Input: "GAG04: Wellingtons Rache, oder: Ein Bein für ein Königreich. Wir springen in die Zeit der napoleonischen Kriege, genauer zu ihrer finalen Schlacht: Bei Waterloo findet nicht nur die Herrschaft der hundert Tage ein Ende, auch ein Bein sieht seinen letzten Tag. Wir erzählen euch, was es damit auf sich hat. Danke an Martin Hemmer für die Stimmen Wellingtons und Pagets."
+    Output: "Schlacht bei Waterloo"
+
+"""
+
+
+@dataclass
+class LLMResponse:
+    """
+    Text response of the LLM, either fresh from the API or from the response cache.
+    """
+    text: str
+    cached: bool = False
+
+
+class GeminiProvider:
+    """
+    LLM provider backed by the Gemini API. google.generativeai is only imported when the provider is created.
+
+    With context caching enabled in config.ini ([gemini] context_caching = true), the static instruction prefix
+    of a prompt is uploaded once as cached content and every request only sends the episode specific rest.
+    Models that do not support context caching, or prefixes below the model's minimum cache size, fall back to
+    sending the full prompt.
+    """
+    cacheable = True
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        import google.generativeai as genai
+
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+
+        # Set up your Gemini API credentials from the config file
+        api_key = config['gemini']['api_key']
+        genai.configure(api_key=api_key)
+
+        self.model_name = model_name
+        self.context_caching = config.getboolean('gemini', 'context_caching', fallback=False)
+        self._genai = genai
+        self._model = genai.GenerativeModel(model_name)
+        self._prefix_models = {}
+        self._prefix_lock = threading.Lock()
+
+    def generate(self, prompt: str, generation_config: dict, prefix: str = ""):
+        # The Gemini client manages its own connections, but still shares the rate limit of its host
+        get_transport().throttle(GEMINI_HOST)
+        model = self._prefix_model(prefix) if prefix and self.context_caching else None
+        if model is not None:
+            increment("llm_cached_prefix_request")
+            return model.generate_content(prompt, generation_config=generation_config)
+        return self._model.generate_content(
+            prefix + prompt,
+            generation_config=generation_config
+        )
+
+    def _prefix_model(self, prefix: str):
+        # Model bound to the cached content of the prefix, created once per prefix; None if caching failed
+        with self._prefix_lock:
+            if prefix not in self._prefix_models:
+                try:
+                    from google.generativeai import caching
+
+                    cached_content = caching.CachedContent.create(model=f"models/{self.model_name}",
+                                                                  contents=[prefix],
+                                                                  ttl=datetime.timedelta(hours=1))
+                    self._prefix_models[prefix] = self._genai.GenerativeModel.from_cached_content(cached_content)
+                except Exception as e:
+                    print(f"Context caching not available, sending full prompts: {e}")
+                    self._prefix_models[prefix] = None
+            return self._prefix_models[prefix]
+
+
+def get_gemini_response(prompt: str, temperature: float = 0.3, max_output_tokens = 40, use_cache: bool = True,
+                        prefix: str = "", top_k: int = 1):
+    """
+    Send a prompt to Gemini Pro and get response
+
+    Identical requests (same prompt and generation parameters) are answered from a persistent response cache.
+
+    Args:
+        prompt (str): The input text prompt, following the prefix
+        temperature (float): Controls randomness (0.0 to 1.0)
+                           0.0 = focused/deterministic
+                           1.0 = more creative/random
+        max_output_tokens (int): Maximum number of tokens in the response
+        use_cache (bool): Look up and store the response in the response cache
+        prefix (str): Static instructions shared by many requests, which the provider may cache on its side
+        top_k (int): Number of most likely tokens sampled from; 1 is greedy decoding, where temperature has no
+                     effect and identical requests give identical answers
+
+    Returns:
+        LLMResponse: The response text
+    """
+
+    # Configure generation parameters
+    generation_config = {
+        'temperature': temperature,
+        'top_p': 1.0,
+        'top_k': top_k,
+        'max_output_tokens': max_output_tokens,
+    }
+
+    provider = get_provider(LLM)
+    # Answers of offline fakes are never cached, they would be served to real runs later on
+    use_cache = use_cache and provider.cacheable
+    cache_key = LLMResponseCache.make_key(prefix + prompt, provider.model_name, temperature, generation_config['top_k'],
+                                          max_output_tokens)
+    if use_cache:
+        cached_text = _response_cache.get(cache_key)
+        if cached_text is not None:
+            increment("llm_cache_hit")
+            return LLMResponse(text=cached_text, cached=True)
+
+    response = provider.generate(prompt, generation_config, prefix=prefix)
+
+    increment("llm_request")
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        increment("llm_prompt_tokens", getattr(usage, 'prompt_token_count', 0) or 0)
+        increment("llm_response_tokens", getattr(usage, 'candidates_token_count', 0) or 0)
+
+    # Accessing .text raises a ValueError if the response was blocked, so blocked responses are never cached
+    text = response.text
+    if use_cache:
+        _response_cache.put(cache_key, text)
+    return LLMResponse(text=text)
+
+
+def get_goelocation_from_episode_information(text: str):
+    prompt = f"""\
         Analysiere nun bitte die folgende Episodenbeschreibung und gib den wichtigsten Ort in der gleichen Form an:
         
         {text}
@@ -73,13 +261,14 @@ def get_goelocation_from_episode_information(text: str):
 
 
     # Initial attempt to get dates
-    response = get_gemini_response(prompt, temperature=0.9, max_output_tokens=30)
+    response = get_gemini_response(prompt, temperature=0.9, max_output_tokens=30, prefix=_GEOLOCATION_INSTRUCTIONS)
     return response.text
 
 
 
 
-def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
+def get_year_from_episode_information(text: str, max_reps: int = 3, hedged: bool = False,
+                                      vote: bool = False, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> dict:
     """
     Extracts historical dates from podcast episode descriptions using Gemini LLM.
 
@@ -87,9 +276,21 @@ def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
     time period being discussed. It makes multiple attempts with increasing
     temperature if the initial attempt fails to extract valid dates.
 
+    Dates stated explicitly in the description are read with the rule-based parser (see date_parser.py)
+    first; the LLM is only asked if the parser's confidence is below min_confidence.
+
+    Retries sample from the top SAMPLING_TOP_K tokens, so they can give a different answer than the greedy
+    first attempt. In hedged mode a retry is already sent while the first attempt is still late, instead of
+    only after it failed (see _get_year_hedged).
+
     Args:
         text (str): The podcast episode description text to analyze
         max_reps (int, optional): Maximum number of retry attempts. Defaults to 3
+        hedged (bool, optional): Send the next attempt as soon as the previous one is late or invalid and use
+                                 the first valid answer
+        vote (bool, optional): In hedged mode, sample all attempts at once and use the majority of the valid answers
+        min_confidence (float, optional): Minimum confidence of the rule-based dates to skip the LLM,
+                                          values above 1 always ask the LLM
 
     Returns:
         dict: A dictionary containing:
@@ -98,35 +299,12 @@ def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
             If dates cannot be determined, returns 'Unknown' for both values
     """
 
-    # Define the prompt template for the LLM
-    prompt_template = """
-    Sie sind ein Spezialist für die Extraktion historischer Daten. Ihre Aufgabe ist es, die Beschreibungen von Podcast-Episoden zu analysieren und den Zeitraum zu bestimmen, über den gesprochen wird. Bitte geben Sie die Anfangs- und Enddaten der erwähnten historischen Ereignisse oder Zeiträume an.
-
-    Regeln:
-    1. Verwenden Sie immer das Format +YYYY für Jahreszahlen (z. B. +1789 statt „18. Jahrhundert“ oder „1700er“)
-    2. Wenn keine genauen Daten genannt werden, nutzen Sie Ihr Wissen, um eine fundierte Schätzung vorzunehmen.
-    3. Wenn ein einjähriges Ereignis erwähnt wird, verwenden Sie dasselbe Jahr als Anfangs- und Enddatum.
-    5. Wenn eine Zeitspanne nur grob angegeben ist, z.B. Mittelalter oder altes Ägypten, dann wähle die Zeitspanne für das Mittelalter oder alte Ägypten aus.
-
-    Hier sind einige Beispiele:    
-
-        Beispiel 1:
-        Input: "Wir springen in dieser Folge ins Jahr 53 vdZw., als sich in einer Ebene in Mesopotamien zwei Heere gegenüber stehen. Auf der einen Seite das des Partherreichs, angeführt von Surena, auf der anderen eines der Römischen Republik, angeführt von M. Licinius Crassus. Wir werden in dieser Folge über diese Schlacht, die Osterweiterung Roms und die Folgen der Schlacht für die Römische Republik sprechen."
-        Output: {{"start_date": "-0053", "end_date": "-0053"}}
-
-        Beispiel 2:
-        Input: "Im November 1532 nehmen spanische Konquistadoren unter dem Kommando von Francisco Pizarro den letzten König der Inka gefangen: Atahualpa. Dabei gelangen sie an Unmengen Gold und Silber. Spätestens jetzt sind viele Konquistadoren überzeugt, dass die Gerüchte um ein sagenumwobenes Goldland wahr sind. Liegen die Ursprünge der Eldorado-Legende vielleicht bei einem kleinen Bergsee bei Guatavita im heutigen Kolumbien? Wir sprechen in der Folge über deutsche Konquistadoren, die sich für die Welser in Klein-Venedig auf die Jagd nach Eldorado machten und über Philipp von Hutten, den Generalkapitän Venezuelas, dessen Goldsuche auf tragische Weise endete – ohne Goldfund."
-        Output: {{"start_date": "+1532", "end_date": "+1532"}}
-
-        Beispiel 3:
-        Input: "Wir springen diesmal in die 2. Hälfte des 18. Jahrhunderts. Automaten, also mechanische Konstrukte, die selbständig jene Dinge tun, die eigentlich lebenden Wesen vorbehalten waren, sind gerade der große Renner. Und auch in Wien konstruiert der Beamte Wolfgang von Kempelen einen solchen Automaten um die Kaiserin zu beeindrucken. Wir sprechen über diesen Automaten – den Schachtürken – und die Erfolge, die er bald darauf in ganz Europa feiern wird. Doch der faszinierende Automat birgt ein Geheimnis, das die Menschen selbst lang nach dem Ableben seines Erschaffers beschäftigen wird."
-        Output: {{"start_date": "+1750", "end_date": "+1800"}}
-        
-        Beispiel 4:
-        Input: "Wir springen nach Amsterdam: 1661 beginnt dort der Katholik Jan Hartmann, eine Kirche in sein Grachtenhaus zu bauen. Es entstand eine beeindruckende Kirche, die bis zum Ende des 19. Jahrhunderts genutzt wurde, ehe sie 1888 zu einem Museum wurde, das noch heute besucht werden kann: das Museum Ons’ Lieve Heer op Solder. Um zu klären, warum Jan Hartmann das gemacht hat, sprechen wir über eine faszinierende Zeit in der niederländischen Geschichte: Die Reformation, den Achtzigjährigen Krieg und das Goldene Zeitalter, in dem Amsterdam zu einer der bedeutendsten Städte der Welt wurde."
-        Output: {{"start_date": "+1661", "end_date": "+1888"}}
-        
+    rule_based_dates = _get_rule_based_year(text, min_confidence)
+    if rule_based_dates is not None:
+        return rule_based_dates
 
+    # Define the prompt template for the LLM
+    prompt_template = """\
     Analysieren Sie nun bitte die folgende Episodenbeschreibung und geben Sie den Zeitraum im gleichen Format an:
 
     {input_text}
@@ -147,9 +325,12 @@ def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
     # Format the prompt with the input text
     prompt = prompt_template.format(input_text=text)
 
+    if hedged:
+        return _get_year_hedged(prompt, max_reps, vote)
+
     # Initial attempt to get dates
     try:
-        response = get_gemini_response(prompt, temperature=0.3)
+        response = get_gemini_response(prompt, temperature=0.3, prefix=_YEAR_INSTRUCTIONS)
         response_data = json.loads(response.text)
     except json.JSONDecodeError:
         response_data = {
@@ -164,12 +345,15 @@ def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
     if not re.match(valid_date_pattern, str(response_data['start_date'])):
         for attempt in range(max_reps):
             print(f"Date extraction attempt {attempt + 1}/{max_reps}")
+            increment("llm_retry")
 
             # Increase temperature with each attempt (max 0.6)
             temperature = min(0.2 + 0.1 * attempt, 0.6)
 
             try:
-                response = get_gemini_response(prompt, temperature)
+                # Bypass the cache, a cached answer for this temperature could be the invalid one
+                response = get_gemini_response(prompt, temperature, use_cache=False, prefix=_YEAR_INSTRUCTIONS,
+                                               top_k=SAMPLING_TOP_K)
                 response_data = json.loads(response.text)
 
                 # Check if we got a valid date
@@ -190,42 +374,103 @@ def get_year_from_episode_information(text: str, max_reps: int = 3) -> dict:
     else:
         return response_data
 
-def get_wikipedia_search_term_from_episode_information(text):
-    prompt_template = """
-    Ihre Aufgabe ist es, den wichtigsten historischen Suchbegriff aus einer Podcast-Episodenbeschreibung zu extrahieren.
-    Dieser Suchbegriff soll genutzt werden, um der den relevantesten Wikipedia-Artikel zu finden. 
 
-    Anweisungen zur Bearbeitung der Episodenbeschreibung:
-    1. Identifizieren Sie das zentrale historische Thema, die Person, das Ereignis oder das Konzept
-    2. Bevorzugen Sie spezifische Eigennamen gegenüber allgemeinen Begriffen
-    3. Wenn mehrere Begriffe existieren, wählen Sie den historisch bedeutendsten aus
-    4. Geben Sie nur den Suchbegriff in deutscher Sprache zurück, da er für die deutsche Wikipedia verwendet wird
-    5. Fügen Sie keinen erklärenden Text oder mehrere Optionen ein.
+def _get_rule_based_year(text, min_confidence: float):
+    # The dates read from the text without the LLM, or None if they are not certain enough
+    if min_confidence > 1:
+        return None
+    dates = parse_dates(str(text))
+    if dates["confidence"] < min_confidence:
+        increment("year_rule_fallback")
+        return None
+    increment("year_rule_hit")
+    return {"start_date": dates["start_date"], "end_date": dates["end_date"]}
 
-    Beispiel 1:
-    Input: „GAG01 Vier Langobarden-Könige und ein Trinkbecher: Frühes Mittelalter in Italien: Die Zeiten sind rau, alle wollen ein Stück vom Kuchen des ehemaligen weströmischen Reichs abhaben. Einer von ihnen ist Alboin, Langobardenkönig. Und wie so oft, war auch ihm kein Greisenalter vergönnt.“
-    Output: „Alboin“
-    
-    Beispiel 2:
-    Input: "GAG11: Von Kindern und Kegeln: Wer oder was ist eigentlich der »Kegel«? In diesem Zeitsprung gehen wir dieser Frage nach, sehen uns einen dieser Kegel genauer an und reisen gemeinsam von Regensburg nach Madrid und Brüssel. Wieder mal mit der großartigen stimmlichen Unterstützung von Martin Hemmer."
-    Output: "Kind und Kegel"
-    
-    Beispiel 3:
-    Input: "GAG422: Eine kleine Geschichte der Parapsychologie. Wir springen diesmal an den Beginn des 20. Jahrhunderts. Schauplatz ist Österreich, wo sich ein neuer Forschungszweig etabliert. Erzählt von Anna Masoner, widmen wir uns einer Zeit, in der viele Dinge noch möglich schienen. Mittendrin ein Dienstmädchen namens Wilma, dessen Fähigkeiten nun in den Fokus eben jener Forschung rücken."
-    Output: "Parapsychologie"
-    
-    Beispiel 4:
-    Input: "GAG182: Der Zündholzkönig Ivar Kreuger. Wir springen in die 1920er Jahre und beschäftigen uns mit Streichhölzern: Genauer gesagt, mit dem Mann, der mit Streichhölzern ein gigantisches Firmenimperium aufgebaut hat, im Zentrum des amerikanischen Börsenbooms stand, zahlreiche Finanzprodukte erfunden und einen Finanzskandal ausgelöst hat, der 1933 und 1934 zur Regulierung der Börsen in den USA geführt hat. Sein Geschäftsmodell: Kredite an Staaten zahlen und im Gegenzug dort ein Zündholzmonopol erhalten. Auf diese Weise wurde Kreuger zum größten Kreditgeber für Europa. Der Deal mit Deutschland aus dem Jahr 1930 hatte bis ins Jahr 1983 bestand. Bis dahin durften in Deutschland nur Zündhölzer der Marken Welthölzer und Haushaltsware produziert und verkauft werden."
-    Output: "Ivar Kreuger"
-    
-    Beispiel 5:
-    Input: "GAG441: Jemima Nicholas und die Schlacht von Fishguard. Wir springen in dieser Folge ans Ende des 18. Jahrhunderts. Im Zuge der Revolutionskriege wird von Frankreich der Plan einer Invasion Großbritanniens ausgeheckt. Ausgangsort soll Irland sein, doch nichts läuft so wie geplant. Schlussendlich wird es vor allem eine Schusterin aus Wales werden, deren Andenken heute noch an diese letzte Invasion Großbritanniens erinnert. Das Episodenbild zeigt einen Ausschnitt einer Darstellung der Landung der Franzosen in Wales, aus einem zeitgenössischen Reiseführer."
-    Output: "Jemima Nicholas"
-    
-    Beispiel 6:
-    Input: "GAG04: Wellingtons Rache, oder: Ein Bein für ein Königreich. Wir springen in die Zeit der napoleonischen Kriege, genauer zu ihrer finalen Schlacht: Bei Waterloo findet nicht nur die Herrschaft der hundert Tage ein Ende, auch ein Bein sieht seinen letzten Tag. Wir erzählen euch, was es damit auf sich hat. Danke an Martin Hemmer für die Stimmen Wellingtons und Pagets."
-    Output: "Schlacht bei Waterloo"
 
+def _sample_year(prompt: str, temperature: float, use_cache: bool, top_k: int):
+    # One candidate of a hedged request: the parsed answer if its start date is valid, None otherwise
+    response = get_gemini_response(prompt, temperature, use_cache=use_cache, prefix=_YEAR_INSTRUCTIONS, top_k=top_k)
+    try:
+        response_data = json.loads(response.text)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(response_data, dict) and re.match(r'^[+-]\d{4}$', str(response_data.get('start_date'))):
+        return response_data
+    return None
+
+
+def _get_year_hedged(prompt: str, max_reps: int, vote: bool, hedge_delay: float = HEDGE_DELAY_SECONDS) -> dict:
+    """
+    Hedged variant of the attempts of get_year_from_episode_information.
+
+    Without voting, the greedy first attempt is sent alone; a sampled retry follows as soon as every attempt in
+    flight is later than hedge_delay or has returned an invalid answer, and the first valid answer is returned.
+    An episode the first attempt answers in time therefore costs a single call.
+
+    With voting, the first attempt and max_reps sampled candidates are sent at once and the answer most of them
+    agree on is returned, early once a candidate has an absolute majority. The samples use top_k > 1, so they
+    are independent draws rather than repetitions of the greedy answer.
+
+    Candidates that have not started yet are cancelled when the answer is known, calls already in flight cannot be
+    aborted and finish in the background.
+
+    Raises:
+        ValueError: If every candidate failed, e.g. because all responses were blocked
+    """
+    candidates = [(0.3, True, 1)] + [(min(0.5 + 0.1 * attempt, 0.9), False, SAMPLING_TOP_K)
+                                     for attempt in range(max_reps)]
+    waiting = list(candidates)
+
+    def launch():
+        temperature, use_cache, top_k = waiting.pop(0)
+        return _hedge_executor.submit(_sample_year, prompt, temperature, use_cache, top_k)
+
+    pending = {launch() for _ in range(len(candidates) if vote else 1)}
+    valid_answers = []
+    errors = []
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=None if vote or not waiting else hedge_delay,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if answer is not None:
+                    valid_answers.append(answer)
+
+            if valid_answers and not vote:
+                print(f"Successfully extracted dates: {valid_answers[0]}")
+                return valid_answers[0]
+            if valid_answers and vote:
+                votes = Counter((answer['start_date'], answer.get('end_date')) for answer in valid_answers)
+                (start_date, end_date), count = votes.most_common(1)[0]
+                if count * 2 > len(candidates) or not pending:
+                    print(f"Successfully extracted dates: {start_date} - {end_date} ({count} votes)")
+                    return {"start_date": start_date, "end_date": end_date}
+
+            # Late or invalid: hedge with the next candidate
+            if not vote and waiting:
+                increment("llm_retry")
+                pending.add(launch())
+    finally:
+        cancelled = sum(1 for future in pending if future.cancel())
+        if cancelled:
+            increment("llm_hedge_cancelled", cancelled)
+
+    if errors and len(errors) == len(candidates):
+        raise errors[0]
+
+    print(f"Unable to extract any dates.")
+    return {
+        "start_date": None,
+        "end_date": None
+    }
+
+def get_wikipedia_search_term_from_episode_information(text):
+    prompt_template = """\
     Analysieren Sie nun bitte die folgende Episodenbeschreibung und antworten Sie mit einen einzelnen Suchbegriff:
 
     {input_text}
@@ -235,8 +480,8 @@ def get_wikipedia_search_term_from_episode_information(text):
 
     try:
         # Parse the response as JSON
-        response = get_gemini_response(prompt, 0.2)
-        response = response.candidates[0].content.parts[0].text.strip()
+        response = get_gemini_response(prompt, 0.2, prefix=_SEARCH_TERM_INSTRUCTIONS)
+        response = response.text.strip()
         return response
     except Exception as e:
         # Fallback in case the response isn't proper JSON
@@ -244,3 +489,265 @@ def get_wikipedia_search_term_from_episode_information(text):
 
 
 
+
+
+_BATCH_PROMPT_TEMPLATE = """
+    Analysieren Sie nun bitte die folgenden {count} Episodenbeschreibungen. Jede Episode ist mit einer ID markiert
+    und wird unabhängig von den anderen nach den obigen Regeln bearbeitet.
+
+{episodes}
+
+    Geben Sie Ihre Antwort NUR als JSON-Array mit genau {count} Objekten in derselben Reihenfolge zurück,
+    ohne zusätzliche Erklärungen oder Markdown-Formatierung:
+    [{answer_example}, ...]
+    """
+
+
+def _parse_json_array(text: str) -> list:
+    """
+    Parses a JSON array from an LLM response, tolerating surrounding text or Markdown code fences.
+
+    Returns:
+        list: The parsed array, or an empty list if no array could be parsed
+    """
+    start = text.find('[')
+    end = text.rfind(']')
+    if start == -1 or end <= start:
+        return []
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _run_batched(episodes: list, instructions: str, answer_field: str, answer_example: str, validate,
+                 single_fallback, batch_size: int, temperature: float, tokens_per_episode: int) -> list:
+    """
+    Packs several episodes into one prompt, parses the per-episode answers and retries only the episodes
+    whose answer is missing or invalid with the single-episode function.
+
+    Args:
+        episodes (list): Episode information, typically dicts with 'title' and 'summary'
+        instructions (str): Shared task instructions and few-shot examples
+        answer_field (str): JSON field holding the answer of each episode
+        answer_example (str): Example answer object shown to the LLM
+        validate (Callable): Returns the cleaned answer for a raw answer, or None if it is invalid
+        single_fallback (Callable): Single-episode function used to retry failed items
+        batch_size (int): Maximum number of episodes per request
+        temperature (float): Sampling temperature of the batched requests
+        tokens_per_episode (int): Output token budget per episode
+
+    Returns:
+        list: One answer per episode, in input order
+    """
+    results = [None] * len(episodes)
+
+    for batch_start in range(0, len(episodes), batch_size):
+        batch = episodes[batch_start:batch_start + batch_size]
+        episode_texts = "\n\n".join(f"    ID {index + 1}:\n    {episode}" for index, episode in enumerate(batch))
+        prompt = _BATCH_PROMPT_TEMPLATE.format(count=len(batch), episodes=episode_texts,
+                                               answer_example=answer_example)
+
+        answers = []
+        try:
+            response = get_gemini_response(prompt, temperature=temperature,
+                                           max_output_tokens=tokens_per_episode * len(batch) + 20, prefix=instructions)
+            answers = _parse_json_array(response.text)
+        except Exception as e:
+            print(f"Batched request failed, falling back to single requests: {e}")
+
+        # Match answers by ID, so a skipped or reordered item does not shift all following answers
+        answers_by_id = {}
+        for position, answer in enumerate(answers):
+            if isinstance(answer, dict):
+                # Models sometimes return the IDs as strings ("1") or floats (1.0)
+                try:
+                    answer_id = int(answer.get("id", position + 1))
+                except (TypeError, ValueError):
+                    continue
+                answers_by_id[answer_id] = answer.get(answer_field)
+
+        for index, episode in enumerate(batch):
+            answer = validate(answers_by_id.get(index + 1))
+            if answer is None:
+                print(f"Retrying batch item {batch_start + index + 1} with a single request")
+                increment("llm_retry")
+                try:
+                    answer = single_fallback(episode)
+                except Exception as e:
+                    print(f"Single request failed: {e}")
+            results[batch_start + index] = answer
+
+    return results
+
+
+def _validate_text_answer(answer):
+    if isinstance(answer, str) and answer.strip():
+        return answer.strip().strip('"„“')
+    return None
+
+
+def _validate_year_answer(answer):
+    valid_date_pattern = r'^[+-]\d{4}$'
+    if isinstance(answer, dict) and all(re.match(valid_date_pattern, str(answer.get(key)))
+                                        for key in ("start_date", "end_date")):
+        return {"start_date": answer["start_date"], "end_date": answer["end_date"]}
+    return None
+
+
+def get_goelocation_from_episode_information_batch(episodes: list, batch_size: int = 10) -> list:
+    """
+    Batched variant of get_goelocation_from_episode_information.
+
+    Args:
+        episodes (list): Episode information dicts
+        batch_size (int): Maximum number of episodes per request
+
+    Returns:
+        list: Location string per episode ("Unknown" if none was found)
+    """
+    locations = _run_batched(
+        episodes, _GEOLOCATION_INSTRUCTIONS, "location", '{"id": 1, "location": "Vienna, Austria"}',
+        validate=_validate_text_answer,
+        single_fallback=lambda episode: get_goelocation_from_episode_information(str(episode)),
+        batch_size=batch_size, temperature=0.9, tokens_per_episode=30)
+    return [location if location else "Unknown" for location in locations]
+
+
+def get_year_from_episode_information_batch(episodes: list, batch_size: int = 10, max_reps: int = 3,
+                                            min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> list:
+    """
+    Batched variant of get_year_from_episode_information. Only the episodes the rule-based parser cannot date
+    with confidence are sent to the LLM.
+
+    Args:
+        episodes (list): Episode information dicts
+        batch_size (int): Maximum number of episodes per request
+        max_reps (int, optional): Maximum number of retry attempts for items retried one by one
+        min_confidence (float, optional): Minimum confidence of the rule-based dates to skip the LLM
+
+    Returns:
+        list: Dict with 'start_date' and 'end_date' per episode (None values if no dates were found)
+    """
+    years = [_get_rule_based_year(episode, min_confidence) for episode in episodes]
+    undated = [index for index, year in enumerate(years) if year is None]
+    llm_years = _run_batched(
+        [episodes[index] for index in undated], _YEAR_INSTRUCTIONS, "dates",
+        '{"id": 1, "dates": {"start_date": "+1532", "end_date": "+1532"}}',
+        validate=_validate_year_answer,
+        # The rule-based dates were already checked, a retry has to ask the LLM
+        single_fallback=lambda episode: get_year_from_episode_information(str(episode), max_reps, min_confidence=1.1),
+        batch_size=batch_size, temperature=0.3, tokens_per_episode=40)
+    for index, year in zip(undated, llm_years):
+        years[index] = year
+    return [year if year else {"start_date": None, "end_date": None} for year in years]
+
+
+def get_wikipedia_search_term_from_episode_information_batch(episodes: list, batch_size: int = 10) -> list:
+    """
+    Batched variant of get_wikipedia_search_term_from_episode_information.
+
+    Args:
+        episodes (list): Episode information dicts
+        batch_size (int): Maximum number of episodes per request
+
+    Returns:
+        list: Search term per episode (None if none could be determined)
+    """
+    return _run_batched(
+        episodes, _SEARCH_TERM_INSTRUCTIONS, "search_term", '{"id": 1, "search_term": "Alboin"}',
+        validate=_validate_text_answer,
+        single_fallback=lambda episode: get_wikipedia_search_term_from_episode_information(str(episode)),
+        batch_size=batch_size, temperature=0.2, tokens_per_episode=20)
+
+
+_COMBINED_INSTRUCTIONS = """
+    Sie sind ein Spezialist für die Analyse historischer Podcast-Episodenbeschreibungen. Bestimmen Sie aus einer
+    Episodenbeschreibung in einem einzigen Schritt:
+    - "search_term": den wichtigsten historischen Suchbegriff für die deutsche Wikipedia (Eigenname, Person, Ereignis
+      oder Konzept, ohne erklärenden Text)
+    - "location": den EINEN wichtigsten Ort in seiner heutigen, modernen Bezeichnung, so genau wie möglich
+      (z.B. "Vienna, Austria" statt "Austria"), oder "Unknown", wenn kein Ort bestimmt werden kann
+    - "start_date" und "end_date": Anfangs- und Endjahr des besprochenen Zeitraums im Format +YYYY bzw. -YYYY
+      (v. Chr.). Bei einjährigen Ereignissen sind beide Jahre gleich, bei groben Angaben wie "18. Jahrhundert"
+      nehmen Sie eine fundierte Schätzung vor.
+
+    Hier sind einige Beispiele:
+
+        Beispiel 1:
+        Input: "Wir springen in dieser Folge ins Jahr 53 vdZw., als sich in einer Ebene in Mesopotamien zwei Heere gegenüber stehen. Auf der einen Seite das des Partherreichs, angeführt von Surena, auf der anderen eines der Römischen Republik, angeführt von M. Licinius Crassus."
+        Output: {"search_term": "Schlacht bei Carrhae", "location": "Iraq", "start_date": "-0053", "end_date": "-0053"}
+
+        Beispiel 2:
+        Input: "Im November 1532 nehmen spanische Konquistadoren unter dem Kommando von Francisco Pizarro den letzten König der Inka gefangen: Atahualpa. Die Geschichte spielt in der alten Inka-Hauptstadt Cajamarca."
+        Output: {"search_term": "Atahualpa", "location": "Cajamarca, Peru", "start_date": "+1532", "end_date": "+1532"}
+
+        Beispiel 3:
+        Input: "Wir springen diesmal in die 2. Hälfte des 18. Jahrhunderts. Und auch in Wien konstruiert der Beamte Wolfgang von Kempelen einen Automaten um die Kaiserin zu beeindrucken. Wir sprechen über diesen Automaten – den Schachtürken."
+        Output: {"search_term": "Schachtürke", "location": "Vienna, Austria", "start_date": "+1750", "end_date": "+1800"}
+
+"""
+
+
+def _validate_combined_answer(answer) -> dict:
+    """
+    Validates the fields of a combined extraction answer.
+
+    Returns:
+        dict: 'search_term', 'location', 'start_date' and 'end_date'; invalid fields are None,
+              a location that could not be determined is "Unknown"
+    """
+    answer = answer if isinstance(answer, dict) else {}
+    years = _validate_year_answer(answer) or {"start_date": None, "end_date": None}
+    return {
+        "search_term": _validate_text_answer(answer.get("search_term")),
+        "location": _validate_text_answer(answer.get("location")) or "Unknown",
+        "start_date": years["start_date"],
+        "end_date": years["end_date"],
+    }
+
+
+def is_combined_answer_complete(answer: dict) -> bool:
+    """
+    Checks whether a combined extraction answer needs no refinement pass.
+    """
+    return (answer["search_term"] is not None and answer["location"] != "Unknown"
+            and answer["start_date"] is not None)
+
+
+def get_combined_information_from_episode_information(text: str, top_k: int = 1) -> dict:
+    """
+    Extracts Wikipedia search term, location and time period of an episode in a single LLM call.
+
+    Args:
+        text (str): The podcast episode description text to analyze, optionally including Wikipedia context
+        top_k (int): 1 for the greedy answer, SAMPLING_TOP_K to retry with a differently sampled one
+
+    Returns:
+        dict: A dictionary containing:
+            - 'search_term': Wikipedia search term, None if invalid
+            - 'location': Most important location, "Unknown" if none was found
+            - 'start_date': The starting year in format '+/-YYYY', None if invalid
+            - 'end_date': The ending year in format '+/-YYYY', None if invalid
+    """
+    prompt_template = """\
+    Analysieren Sie nun bitte die folgende Episodenbeschreibung:
+
+    {input_text}
+
+    Geben Sie Ihre Antwort NUR als JSON-Objekt mit den Feldern "search_term", "location", "start_date" und
+    "end_date" zurück, ohne zusätzliche Erklärungen oder Markdown-Formatierung.
+    """
+    prompt = prompt_template.format(input_text=text)
+
+    response = get_gemini_response(prompt, temperature=0.3, max_output_tokens=80, prefix=_COMBINED_INSTRUCTIONS,
+                                   top_k=top_k)
+    text = response.text
+    start = text.find('{')
+    end = text.rfind('}')
+    try:
+        answer = json.loads(text[start:end + 1]) if start != -1 and end > start else {}
+    except json.JSONDecodeError:
+        answer = {}
+    return _validate_combined_answer(answer)
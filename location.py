@@ -1,20 +1,93 @@
 import configparser
-import googlemaps
 
+from gazetteer import load_gazetteer
+from geocode_cache import GeocodeCache, NOT_CACHED
+from http_transport import get_transport
+from metrics import increment
+from providers import GEOCODER, get_provider, provider_name
 
-config = configparser.ConfigParser()
-config.read('config.ini')
-api_key = config['googlemaps']['api_key']
-gmaps = googlemaps.Client(key=api_key)
+# GeoNames-style gazetteer used to resolve common places offline, e.g. cities15000.txt from
+# https://download.geonames.org/export/dump/ ; can be overridden in config.ini ([geocoding] gazetteer = ...).
+# countryInfo.txt from the same download page, placed next to it, resolves country qualifiers like "Paris, France"
+DEFAULT_GAZETTEER_PATH = "output/cities15000.txt"
 
-def get_coordinates_google(address):
+_gazetteer_path = None
+_geocode_cache = GeocodeCache("output/geocode_cache.sqlite")
 
-    # Geocode the address
-    result = gmaps.geocode(address)
 
-    if result:
+def configure_geocode_cache(path: str):
+    """
+    Moves the persistent geocode cache to another location, e.g. into the directory of a shard.
+    """
+    global _geocode_cache
+    _geocode_cache = GeocodeCache(path)
+
+
+def _read_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    return config
+
+
+class GoogleGeocoder:
+    """
+    Geocoder provider backed by the Google Maps API. googlemaps is only imported when the provider is created.
+    """
+    cacheable = True
+
+    def __init__(self):
+        import googlemaps
+
+        api_key = _read_config()['googlemaps']['api_key']
+        # Share the pooled, rate-limited session instead of letting the client open its own connections
+        self._client = googlemaps.Client(key=api_key, requests_session=get_transport().session)
+
+    def geocode(self, address: str):
+        result = self._client.geocode(address)
+        if not result:
+            return None
         location = result[0]['geometry']['location']
-        return (location['lat'], location['lng'])
-    return None
+        return location['lat'], location['lng']
 
 
+def _get_gazetteer():
+    global _gazetteer_path
+    if _gazetteer_path is None:
+        _gazetteer_path = _read_config().get('geocoding', 'gazetteer', fallback=DEFAULT_GAZETTEER_PATH)
+    return load_gazetteer(_gazetteer_path)
+
+
+def get_coordinates_google(address):
+    """
+    Geocodes an address to (latitude, longitude).
+
+    Results are cached persistently by normalized address. Places found in the local gazetteer are resolved
+    offline; the geocoder provider (Google Maps by default) is only asked for addresses that are neither cached
+    nor in the gazetteer.
+
+    Args:
+        address (str): The address or place name to geocode
+
+    Returns:
+        tuple: (latitude, longitude), None if the address could not be geocoded
+    """
+    cached = _geocode_cache.get(address)
+    if cached is not NOT_CACHED:
+        increment("geocode_cache_hit")
+        return cached
+
+    gazetteer = _get_gazetteer()
+    if gazetteer is not None:
+        coordinates = gazetteer.lookup(address)
+        if coordinates is not None:
+            increment("gazetteer_hit")
+            _geocode_cache.put(address, coordinates, "gazetteer")
+            return coordinates
+
+    # Geocode the address
+    geocoder = get_provider(GEOCODER)
+    increment("geocode_api_request")
+    coordinates = geocoder.geocode(address)
+    if geocoder.cacheable:
+        _geocode_cache.put(address, coordinates, provider_name(GEOCODER))
+    return coordinates
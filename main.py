@@ -3,129 +3,600 @@ Web Crawler for Geschichte.fm Podcast Episodes
 This module crawls podcast episodes from Geschichten aus der Geschichte (geschichte.fm), extracts episode information,
 and determines the historical time period discussed in each episode using an LLM.
 
+Episodes are processed either sequentially or in a staged pipeline (see pipeline.py), where crawling, Wikipedia
+lookup, LLM geolocation and geocoding each run in their own worker pool.
+
 Dependencies:
     - llm_call: Contains functions for LLM prompt modification and Gemini API calls
+    - date_parser: Contains the rule-based extraction of explicitly stated dates
     - website_crawler: Contains web scraping functionality
-    - write_to_csv: Contains CSV writing utilities
+    - results_store: Contains the SQLite results store and the CSV/Parquet export
+    - pipeline: Contains the staged concurrent pipeline
+    - checkpoint: Contains the checkpoint manifest used to resume interrupted runs
+    - episode_discovery: Contains the episode discovery from the podcast feed and sitemap
+    - metrics: Contains the per-stage timing and run metrics
+    - providers: Contains the registry of the LLM, geocoder, Wikipedia and page fetcher backends
+    - sharding: Contains the partitioning of the episodes across machines and the merge of their results
 """
+import argparse
+import cProfile
+import functools
+import os
+from typing import Optional, Tuple
+
+from checkpoint import CheckpointManifest, STATUS_DONE, STATUS_FAILED, STATUS_IN_PROGRESS
+from context_budget import add_wikipedia_context, episode_prompt_text
+from date_parser import DEFAULT_MIN_CONFIDENCE, parse_dates
+from episode_discovery import discover_episodes, load_episode_index, save_episode_index
 from llm_call import get_wikipedia_search_term_from_episode_information, get_year_from_episode_information, \
-    get_goelocation_from_episode_information
-from location import get_coordinates_google
+    get_goelocation_from_episode_information, get_combined_information_from_episode_information, \
+    is_combined_answer_complete, configure_response_cache, SAMPLING_TOP_K
+from location import configure_geocode_cache, get_coordinates_google
+from metrics import configure_metrics, get_recorder, increment, timed
+from pipeline import Stage, run_pipeline
+from providers import use_fake_providers
+from results_store import BufferedResultsWriter, ResultsStore
+from sharding import parse_shard, select_shard, shard_dir
+from sqlite_connections import copy_database
 from website_crawler import extract_relevant_episode_data
 from wikipedia_summary import get_wikipedia_summary
-from write_to_csv import write_to_csv
 
 
-def _crawl_gag_episode(url: str):
+def _build_episode_url(episode_num: int) -> str:
     """
-    Crawls a single podcast episode page and extracts relevant information.
+    Constructs the episode page URL from the episode number.
 
-    Args:
-        url (str): The URL of the podcast episode to crawl
+    Episodes <= 270 use 'zs' format, > 270 use 'gag' format, since GAG move from the name "Zeitsprung"
+    to "Geschichten aus der Geschichte" at Episode 270.
+    """
+    if episode_num <= 270:
+        return f"https://www.geschichte.fm/podcast/zs{str(episode_num).zfill(2)}/"
+    return f"https://www.geschichte.fm/archiv/gag{str(episode_num).zfill(2)}/"
 
-    Returns:
-        dict: Dictionary containing episode data with keys:
-            - title: Episode title
-            - summary: Episode summary
-            - year_from: Start year of historical period
-            - year_until: End year of historical period
+
+# How the separate year prompt is asked, see _year_stage
+YEAR_MODES = ("sequential", "hedged", "vote")
+
+
+def _fetch_stage(state: dict) -> dict:
+    """
+    Crawls the episode page and stores the title and summary in state['episode']. Episodes whose title and
+    summary are already known from the podcast feed are not fetched again.
+
+    Raises:
+        ValueError: If the page could not be crawled
     """
+    if state.get("episode"):
+        print(f"Using episode information from the podcast feed for: {state['url']}")
+        return state
 
-    # Extract content from webpage
-    print(f"Crawling from url: {url}")
-    episode_information_dict = extract_relevant_episode_data(url=url)
-    print(f"crawled episode information from GAG website: {episode_information_dict}")
+    print(f"Crawling from url: {state['url']}")
+    episode_information_dict = extract_relevant_episode_data(url=state["url"])
+    if episode_information_dict is None:
+        raise ValueError(f"No episode information found at {state['url']}")
+    print(f"crawled episode: {episode_information_dict.get('title')}")
+    state["episode"] = episode_information_dict
+    return state
 
-    # searching for wikipedia context and adding context to the episode summary
-    wikipedia_search_term = get_wikipedia_search_term_from_episode_information(str(episode_information_dict))
-    print(f"wikipedia search term: {wikipedia_search_term}")
 
+def _wikipedia_stage(state: dict) -> dict:
+    """
+    Determines a Wikipedia search term with the LLM and adds the Wikipedia context to the episode information.
+    """
+    with timed("search_term_llm", url=state["url"]):
+        wikipedia_search_term = get_wikipedia_search_term_from_episode_information(episode_prompt_text(state))
+    print(f"wikipedia search term: {wikipedia_search_term}")
+    state["search_term"] = wikipedia_search_term
 
-    try:
+    with timed("wikipedia", url=state["url"]):
         wikipedia_summary = get_wikipedia_summary(wikipedia_search_term)
-        print(f"wikipedia summary: {wikipedia_summary}")
-        if wikipedia_summary is not None:
-            episode_information_dict["Wikipedia-Informationen"] = str(wikipedia_summary)
+    print(f"wikipedia article: {wikipedia_summary[0]}")
+    add_wikipedia_context(state, wikipedia_summary)
+    return state
+
+
+def _llm_stage(state: dict) -> dict:
+    """
+    Asks the LLM for the most important location of the episode.
+    """
+    with timed("geolocation_llm", url=state["url"]):
+        llm_geolocation_estimate = get_goelocation_from_episode_information(episode_prompt_text(state))
+    print(f"llm_geolocation_estimate: {llm_geolocation_estimate}")
+    state["location"] = llm_geolocation_estimate
+    return state
+
+
+def _year_stage(state: dict, mode: str = "sequential") -> dict:
+    """
+    Determines the time period of the episode. Dates stated in the description are read by the rule-based parser,
+    the LLM is only asked for the others: in 'sequential' mode with retries after invalid answers, in 'hedged' mode
+    with the next attempt sent as soon as the previous one is late, in 'vote' mode with all attempts sampled at once
+    and the majority answer taken.
+    """
+    with timed("year_llm", url=state["url"]):
+        llm_year_estimate = get_year_from_episode_information(episode_prompt_text(state), hedged=mode != "sequential",
+                                                              vote=mode == "vote")
+    print(f"llm_year_estimate: {llm_year_estimate}")
+    state["years"] = llm_year_estimate
+    return state
+
+
+def _combined_llm_stage(state: dict) -> dict:
+    """
+    Extracts search term, location and time period in one LLM call. Only if that answer is incomplete, the
+    Wikipedia context is fetched and a second, refining call is made.
+    """
+    with timed("combined_llm", url=state["url"]):
+        answer = get_combined_information_from_episode_information(episode_prompt_text(state))
+    print(f"llm_combined_estimate: {answer}")
+
+    if answer["search_term"] is None:
+        # A malformed answer has no search term, so the refinement below could never run. Retry it sampled (a
+        # greedy retry would repeat the cached answer), then fall back to asking for the search term alone
+        increment("combined_llm_retry")
+        with timed("combined_llm", url=state["url"]):
+            retried_answer = get_combined_information_from_episode_information(episode_prompt_text(state),
+                                                                               top_k=SAMPLING_TOP_K)
+        print(f"llm_combined_retry: {retried_answer}")
+        answer["search_term"] = retried_answer["search_term"]
+        if answer["location"] == "Unknown":
+            answer["location"] = retried_answer["location"]
+        if answer["start_date"] is None:
+            answer["start_date"] = retried_answer["start_date"]
+            answer["end_date"] = retried_answer["end_date"]
+        if answer["search_term"] is None:
+            with timed("search_term_llm", url=state["url"]):
+                answer["search_term"] = get_wikipedia_search_term_from_episode_information(
+                    episode_prompt_text(state)) or None
+
+    # Dates stated explicitly in the description take precedence over every LLM answer, including the refinement
+    rule_based_dates = parse_dates(f"{state['episode'].get('title', '')}. {state['episode'].get('summary', '')}")
+    explicitly_dated = rule_based_dates["confidence"] >= DEFAULT_MIN_CONFIDENCE
+    if explicitly_dated:
+        increment("year_rule_hit")
+        answer["start_date"] = rule_based_dates["start_date"]
+        answer["end_date"] = rule_based_dates["end_date"]
+
+    if not is_combined_answer_complete(answer) and answer["search_term"] is not None:
+        with timed("wikipedia", url=state["url"]):
+            wikipedia_summary = get_wikipedia_summary(answer["search_term"])
+        print(f"wikipedia article: {wikipedia_summary[0]}")
+        if wikipedia_summary[1] is not None:
+            state["search_term"] = answer["search_term"]
+            add_wikipedia_context(state, wikipedia_summary)
+            with timed("refine_llm", url=state["url"]):
+                refined_answer = get_combined_information_from_episode_information(episode_prompt_text(state))
+            print(f"llm_refined_estimate: {refined_answer}")
 
-        # Get time period prediction from LLM
-        #llm_year_estimate = get_year_from_episode_information(episode_information_dict, 4)
-        #print(f"llm_year_estimate: {llm_year_estimate}")
+            # Keep the first answer for every field the refinement could not determine
+            if refined_answer["location"] != "Unknown":
+                answer["location"] = refined_answer["location"]
+            if refined_answer["start_date"] is not None and not explicitly_dated:
+                answer["start_date"] = refined_answer["start_date"]
+                answer["end_date"] = refined_answer["end_date"]
 
-        llm_geolocation_estimate = get_goelocation_from_episode_information(str(episode_information_dict))
-        print(f"llm_geolocation_estimate: {llm_geolocation_estimate}")
+    state["search_term"] = answer["search_term"]
+    state["location"] = answer["location"]
+    state["years"] = {"start_date": answer["start_date"], "end_date": answer["end_date"]}
+    return state
 
-        if llm_geolocation_estimate != "Unknown":
+
+def _geocode_stage(state: dict) -> dict:
+    """
+    Geocodes the LLM location estimate and compiles the final result in state['result'].
+    """
+    llm_geolocation_estimate = state["location"]
+    if llm_geolocation_estimate != "Unknown":
+        with timed("geocode", url=state["url"]):
             coordinates = get_coordinates_google(llm_geolocation_estimate)
-            print(f"llm_coordinates: {coordinates}")
+        print(f"llm_coordinates: {coordinates}")
+        state["coordinates"] = coordinates
 
-            latitude = coordinates[0]
-            longitude = coordinates[1]
+        latitude = coordinates[0]
+        longitude = coordinates[1]
 
-        else:
-            latitude = None
-            longitude = None
-
-        # Compile results
-        result = {
-            "title": episode_information_dict['title'],
-            #"summary": episode_information_dict['summary'],
-            "location" : llm_geolocation_estimate,
-            "latitude": latitude,
-            "longitude": longitude,
-            #"year_from": llm_year_estimate['start_date'],
-            #"year_until": llm_year_estimate['end_date'],
-            #"url" : url
-        }
-        return result
-
-    except ValueError as e:
+    else:
+        latitude = None
+        longitude = None
+
+    # Compile results
+    state["result"] = {
+        "title": state["episode"]['title'],
+        #"summary": state["episode"]['summary'],
+        "location" : llm_geolocation_estimate,
+        "latitude": latitude,
+        "longitude": longitude,
+        #"year_from": llm_year_estimate['start_date'],
+        #"year_until": llm_year_estimate['end_date'],
+        #"url" : url
+    }
+    if "years" in state:
+        state["result"]["year_from"] = state["years"]["start_date"]
+        state["result"]["year_until"] = state["years"]["end_date"]
+    return state
+
+
+def _error_result(state: dict, error: Exception) -> dict:
+    """
+    Reports a failed episode and builds the fallback result row.
+    """
+    if isinstance(error, ValueError):
         # Handles safety filter triggers and content policy violations
-        print(f"Safety filter triggered: {e}")
-    except ConnectionError as e:
+        print(f"Safety filter triggered: {error}")
+        category = "safety_filter"
+    elif isinstance(error, ConnectionError):
         # Handles API connection issues
-        print(f"Connection error: {e}")
-    except Exception as e:
+        print(f"Connection error: {error}")
+        category = "connection"
+    else:
         # Catches any other unexpected errors
-        print(f"Unexpected error: {e}")
+        print(f"Unexpected error: {error}")
+        category = "unexpected"
+    increment(f"failure_{category}", url=state["url"], error=type(error).__name__)
 
+    episode_information_dict = state.get("episode") or {}
     result = {
-        "title": episode_information_dict['title'],
-        "summary": episode_information_dict['summary'],
+        "title": episode_information_dict.get('title'),
+        "summary": episode_information_dict.get('summary'),
         "year_from": None,
         "year_until": None,
-        "url": url,
+        "url": state["url"],
     }
     return result
 
 
-def main():
+def _get_stages(combined_extraction: bool = False, year_mode: Optional[str] = None) -> list:
+    """
+    Returns the (name, function) pairs of the stages an episode passes through, in order.
+
+    Args:
+        combined_extraction (bool): Use a single combined LLM extraction instead of separate search term and
+                                    geolocation prompts
+        year_mode (str, optional): Also date the episodes with the separate year prompt, one of YEAR_MODES
+                                   (the combined extraction dates them itself)
+    """
+    if combined_extraction:
+        return [("crawl", _fetch_stage), ("llm", _combined_llm_stage), ("geocode", _geocode_stage)]
+    stages = [("crawl", _fetch_stage), ("wikipedia", _wikipedia_stage), ("llm", _llm_stage)]
+    if year_mode is not None:
+        stages.append(("years", functools.partial(_year_stage, mode=year_mode)))
+    return stages + [("geocode", _geocode_stage)]
+
 
+def _checkpointed(stage_name: str, stage_func, manifest: Optional[CheckpointManifest]):
     """
-    Main execution function that processes a range of podcast episodes.
-    Crawls each episode page, extracts information, and saves to CSV.
+    Wraps a stage function so that it is skipped if the episode already passed the stage in an earlier run,
+    and so that its output is saved to the checkpoint manifest.
     """
-    start_at_episode = 1
-    end_at_episode = 30
+    def run(state: dict) -> dict:
+        completed_stages = state.setdefault("completed_stages", [])
+        if stage_name in completed_stages:
+            return state
+        state = stage_func(state)
+        completed_stages.append(stage_name)
+        if manifest is not None:
+            manifest.record(state, STATUS_IN_PROGRESS)
+        return state
+    return run
 
-    for episode_num in range(start_at_episode, end_at_episode+1):
-        print(f"Crawling episode: {episode_num}")
 
-        # Construct URL based on episode number: Episodes <= 270 use 'zs' format, > 270 use 'gag' format,
-        # since GAG move from the name "Zeitsprung" to "Geschichten aus der Geschichte" at Episode 270
-        if episode_num <= 270:
-            url = f"https://www.geschichte.fm/podcast/zs{str(episode_num).zfill(2)}/"
+def _record_failure(state: dict, stage_name: str, error: Exception, manifest: Optional[CheckpointManifest]) -> dict:
+    """
+    Saves a failed episode to the checkpoint manifest and compiles its fallback result.
+    """
+    print(f"Stage '{stage_name}' failed for {state['url']}")
+    if manifest is not None:
+        manifest.record(state, STATUS_FAILED, failed_stage=stage_name, error=str(error))
+    state["result"] = _error_result(state, error)
+    return state
+
+
+def _load_state(url: str, manifest: Optional[CheckpointManifest], prefetched: Optional[dict] = None) -> dict:
+    """
+    Returns the state an episode starts from: its saved state from an earlier run, seeded with the episode
+    information from the podcast feed if the page has not been crawled yet.
+    """
+    state = manifest.get_state(url) if manifest is not None else {"url": url}
+    if prefetched and url in prefetched and not state.get("episode"):
+        state["episode"] = dict(prefetched[url])
+    return state
+
+
+def _crawl_gag_episode(url: str, combined_extraction: bool = False, manifest: Optional[CheckpointManifest] = None,
+                       prefetched: Optional[dict] = None, year_mode: Optional[str] = None):
+    """
+    Crawls a single podcast episode page and extracts relevant information.
+
+    Args:
+        url (str): The URL of the podcast episode to crawl
+        combined_extraction (bool): Use a single combined LLM extraction per episode
+        manifest (CheckpointManifest, optional): Manifest to resume the episode from and save its progress to
+        prefetched (dict, optional): URL -> episode information ('title', 'summary') already known from the feed
+        year_mode (str, optional): Date the episode with the separate year prompt, one of YEAR_MODES
+
+    Returns:
+        dict: Dictionary containing episode data with keys:
+            - title: Episode title
+            - summary: Episode summary
+            - year_from: Start year of historical period
+            - year_until: End year of historical period
+    """
+    state = _load_state(url, manifest, prefetched)
+
+    for stage_name, stage_func in _get_stages(combined_extraction, year_mode):
+        try:
+            state = _checkpointed(stage_name, stage_func, manifest)(state)
+        except Exception as e:
+            return _record_failure(state, stage_name, e, manifest)["result"]
+    return state["result"]
+
+
+def _write_result(writer: BufferedResultsWriter, url: str, result: dict, manifest: Optional[CheckpointManifest]):
+    """
+    Hands a single episode result to the results writer.
+    """
+    failed = manifest is not None and manifest.get_status(url) == STATUS_FAILED
+    with timed("write", url=url):
+        writer.add(url, result, failed)
+
+
+def _finish_episodes(urls: list, manifest: Optional[CheckpointManifest]):
+    """
+    Marks episodes as done in the manifest once their results are committed to the store, unless they failed.
+    """
+    if manifest is None:
+        return
+    for url in urls:
+        if manifest.get_status(url) == STATUS_IN_PROGRESS:
+            manifest.record(manifest.get_state(url), STATUS_DONE)
+
+
+def _export_results(store: ResultsStore, export_parquet: bool = False, output_dir: str = "output"):
+    """
+    Exports the whole results store to the output files.
+    """
+    csv_path = os.path.join(output_dir, "episode_data.csv")
+    written = store.export_csv(csv_path)
+    failed = store.export_csv(os.path.join(output_dir, "errors_while_parsing.csv"), failed=True)
+    print(f"Exported {written} episodes to {csv_path} ({failed} failed)")
+    if export_parquet:
+        store.export_parquet(os.path.join(output_dir, "episode_data.parquet"))
+
+
+def _crawl_gag_episodes_pipelined(urls, crawl_workers: int = 8, wikipedia_workers: int = 8,
+                                  llm_workers: int = 4, geocode_workers: int = 4, queue_size: int = 32,
+                                  combined_extraction: bool = False, manifest: Optional[CheckpointManifest] = None,
+                                  writer: Optional[BufferedResultsWriter] = None, prefetched: Optional[dict] = None,
+                                  year_mode: Optional[str] = None):
+    """
+    Processes many episodes concurrently in a staged pipeline and writes the results in episode order.
+
+    Args:
+        urls (Iterable[str]): Episode page URLs, in the order the results should be written
+        crawl_workers (int): Worker threads fetching episode pages
+        wikipedia_workers (int): Worker threads determining search terms and fetching Wikipedia context
+        llm_workers (int): Worker threads asking the LLM for the episode location, and for the time period
+        geocode_workers (int): Worker threads geocoding the locations
+        queue_size (int): Maximum number of episodes waiting in front of each stage
+        combined_extraction (bool): Use a single combined LLM extraction stage instead of the separate
+                                    Wikipedia and LLM stages
+        manifest (CheckpointManifest, optional): Manifest to resume episodes from and save their progress to
+        writer (BufferedResultsWriter, optional): Writer the results are stored with, defaults to the results store
+                                                  in output/
+        prefetched (dict, optional): URL -> episode information ('title', 'summary') already known from the feed
+        year_mode (str, optional): Date the episodes with the separate year prompt, one of YEAR_MODES
+
+    Returns:
+        int: Number of written results
+    """
+    workers = {"crawl": crawl_workers, "wikipedia": wikipedia_workers, "llm": llm_workers, "years": llm_workers,
+               "geocode": geocode_workers}
+    stages = [Stage(stage_name, _checkpointed(stage_name, stage_func, manifest), workers=workers[stage_name],
+                    queue_size=queue_size)
+              for stage_name, stage_func in _get_stages(combined_extraction, year_mode)]
+
+    def on_error(state, stage_name, error):
+        return _record_failure(state, stage_name, error, manifest)
+
+    if writer is None:
+        writer = BufferedResultsWriter(ResultsStore(), on_flush=lambda flushed: _finish_episodes(flushed, manifest))
+
+    def sink(state):
+        _write_result(writer, state["url"], state["result"], manifest)
+        print(f"Finished parsing episode: {state['url']} \n\n")
+
+    states = (_load_state(url, manifest, prefetched) for url in urls)
+    with writer:
+        return run_pipeline(states, stages, sink=sink, on_error=on_error)
+
+
+def _select_episode_urls(start_at_episode: int, end_at_episode: int, manifest: CheckpointManifest,
+                         retry_failed_only: bool = False, episode_index: Optional[dict] = None) -> list:
+    """
+    Returns the URLs of all episodes in the range that still need to be processed.
+
+    Args:
+        start_at_episode (int): First episode number
+        end_at_episode (int): Last episode number (inclusive)
+        manifest (CheckpointManifest): Manifest of earlier runs
+        retry_failed_only (bool): Only select episodes that failed in an earlier run
+        episode_index (dict, optional): Discovered episodes (episode number -> episode); if given, only
+                                        episodes contained in it are selected instead of guessing URLs
+
+    Returns:
+        list: Episode URLs in episode order
+    """
+    urls = []
+    for episode_num in range(start_at_episode, end_at_episode+1):
+        if episode_index is not None:
+            if episode_num not in episode_index:
+                continue
+            url = episode_index[episode_num]["url"]
         else:
-            url = f"https://www.geschichte.fm/archiv/gag{str(episode_num).zfill(2)}/"
+            url = _build_episode_url(episode_num)
+        status = manifest.get_status(url)
+        if status == STATUS_DONE:
+            continue
+        if retry_failed_only and status != STATUS_FAILED:
+            continue
+        urls.append(url)
+    return urls
+
+
+def _use_shard_caches(output_dir: str):
+    """
+    Moves the LLM and geocode caches into the shard directory, starting from copies of the main caches.
+    """
+    for cache_file, configure in (("llm_cache.sqlite", configure_response_cache),
+                                  ("geocode_cache.sqlite", configure_geocode_cache)):
+        path = os.path.join(output_dir, cache_file)
+        main_path = os.path.join("output", cache_file)
+        if not os.path.exists(path) and os.path.exists(main_path):
+            # The main caches may be in use by another run, the backup API also copies changes still in the WAL
+            copy_database(main_path, path)
+        configure(path)
 
-        # Process episode and write results
-        result = _crawl_gag_episode(url)
-        if True: #result["year_from"] not in [None, "unknown", "Unknown"]:
-            write_to_csv(result, "output/episode_data.csv")
+
+def main(start_at_episode: int = 1, end_at_episode: int = 30, use_pipeline: bool = False,
+         combined_extraction: bool = False, retry_failed_only: bool = False,
+         checkpoint_path: str = "output/checkpoint.jsonl", results_path: str = "output/episode_data.sqlite",
+         export_parquet: bool = False, discover: bool = False, metrics_path: Optional[str] = "output/metrics.jsonl",
+         dry_run: bool = False, shard: Optional[Tuple[int, int]] = None, year_mode: Optional[str] = None):
+
+    """
+    Main execution function that processes a range of podcast episodes.
+    Crawls each episode page, extracts information, stores the results and finally exports them to CSV.
+
+    Episodes finished in an earlier run are skipped and failed episodes resume from the stage where they failed.
+
+    Args:
+        start_at_episode (int): First episode number
+        end_at_episode (int): Last episode number (inclusive)
+        use_pipeline (bool): Process the episodes concurrently in a staged pipeline instead of one after another
+        combined_extraction (bool): Use a single combined LLM extraction per episode
+        retry_failed_only (bool): Only process episodes that failed in an earlier run
+        checkpoint_path (str): Location of the checkpoint manifest
+        results_path (str): Location of the SQLite results store
+        export_parquet (bool): Additionally export the results to output/episode_data.parquet
+        discover (bool): Discover the episodes from the podcast feed and sitemap instead of guessing their URLs
+        metrics_path (str, optional): JSON-lines file the stage timings and counters are written to
+        dry_run (bool): Replace every network backend with its offline fake (see fake_providers.py) and write all
+                        outputs to output/dry_run/ instead
+        shard (Tuple[int, int], optional): (shard index starting at 1, shard count); only process the episodes of
+                                           this shard and keep all outputs and caches in its own directory
+                                           (see sharding.py)
+        year_mode (str, optional): Also date the episodes with the separate year prompt: 'sequential', 'hedged' or
+                                   'vote' (see _year_stage); the combined extraction dates them itself
+    """
+    if year_mode is not None and year_mode not in YEAR_MODES:
+        raise ValueError(f"Unknown year mode '{year_mode}', expected one of {', '.join(YEAR_MODES)}")
+    output_dir = "output"
+    if dry_run:
+        use_fake_providers()
+        output_dir = os.path.join("output", "dry_run")
+    if shard is not None:
+        output_dir = shard_dir(*shard, base_dir=output_dir)
+    if dry_run:
+        # Answers of the fakes must neither come from nor end up in the caches of real runs
+        configure_response_cache(os.path.join(output_dir, "llm_cache.sqlite"))
+        configure_geocode_cache(os.path.join(output_dir, "geocode_cache.sqlite"))
+    elif shard is not None:
+        _use_shard_caches(output_dir)
+    if output_dir != "output":
+        checkpoint_path = os.path.join(output_dir, os.path.basename(checkpoint_path))
+        results_path = os.path.join(output_dir, os.path.basename(results_path))
+        if metrics_path:
+            metrics_path = os.path.join(output_dir, os.path.basename(metrics_path))
+
+    configure_metrics(metrics_path)
+    manifest = CheckpointManifest(checkpoint_path)
+    store = ResultsStore(results_path)
+    writer = BufferedResultsWriter(store, on_flush=lambda flushed: _finish_episodes(flushed, manifest))
+
+    episode_index = None
+    prefetched = {}
+    if discover and dry_run:
+        # Reuse the index of an earlier discovery instead of reading the feed, or guess the URLs without one
+        episode_index = load_episode_index() or None
+    elif discover:
+        episode_index = discover_episodes()
+        if episode_index:
+            save_episode_index(episode_index)
         else:
-            write_to_csv(result, "output/errors_while_parsing.csv")
+            # Feed and sitemap could not be read; an empty index would silently select no episode at all
+            episode_index = load_episode_index() or None
+            print("Episode discovery found no episodes, "
+                  + ("using the index of an earlier discovery" if episode_index else "guessing the episode URLs"))
+    if episode_index is not None:
+        prefetched = {episode["url"]: {"title": episode["title"], "summary": episode["summary"]}
+                      for episode in episode_index.values() if episode.get("title") and episode.get("summary")}
+
+    urls = _select_episode_urls(start_at_episode, end_at_episode, manifest, retry_failed_only, episode_index)
+    if shard is not None:
+        urls = select_shard(urls, *shard)
+        print(f"Shard {shard[0]}/{shard[1]}: writing to {output_dir}")
+    print(f"Processing {len(urls)} episodes")
+
+    if use_pipeline:
+        _crawl_gag_episodes_pipelined(urls, combined_extraction=combined_extraction, manifest=manifest,
+                                      writer=writer, prefetched=prefetched, year_mode=year_mode)
+    else:
+        with writer:
+            for url in urls:
+                print(f"Crawling episode: {url}")
+
+                # Process episode and write results
+                result = _crawl_gag_episode(url, combined_extraction, manifest, prefetched, year_mode)
+                _write_result(writer, url, result, manifest)
+
+                print(f"Finished parsing episode: {url} \n\n")
+
+    _export_results(store, export_parquet, output_dir)
+    print(get_recorder().summary_table())
+    get_recorder().close()
+
 
-        print(f"Finished parsing episode: {episode_num} \n\n")
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Crawl and date Geschichten aus der Geschichte podcast episodes")
+    parser.add_argument("--start", type=int, default=1, help="first episode number (default: 1)")
+    parser.add_argument("--end", type=int, default=30, help="last episode number, inclusive (default: 30)")
+    parser.add_argument("--pipeline", action="store_true", help="process episodes concurrently in a staged pipeline")
+    parser.add_argument("--combined", action="store_true", help="use a single combined LLM extraction per episode")
+    parser.add_argument("--years", choices=YEAR_MODES, dest="year_mode",
+                        help="also date the episodes with the year prompt: retries one after another, hedged "
+                             "(next attempt sent when one is late) or vote (majority of parallel samples)")
+    parser.add_argument("--retry-failed", action="store_true", help="only retry episodes that failed before")
+    parser.add_argument("--checkpoint", default="output/checkpoint.jsonl", help="location of the checkpoint manifest")
+    parser.add_argument("--results", default="output/episode_data.sqlite", help="location of the results store")
+    parser.add_argument("--parquet", action="store_true", help="additionally export the results to Parquet")
+    parser.add_argument("--discover", action="store_true",
+                        help="discover episodes from the podcast feed and sitemap instead of guessing URLs")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="use offline fakes instead of every network backend, outputs go to output/dry_run/")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="only process shard I of N, e.g. 2/4; merge the shards with: python sharding.py merge")
+    parser.add_argument("--metrics", default="output/metrics.jsonl", help="location of the JSON-lines metrics file")
+    parser.add_argument("--profile", nargs="?", const="output/profile.pstats",
+                        help="run under cProfile and save the statistics (default: output/profile.pstats)")
+    args = parser.parse_args(argv)
+    if args.combined and args.year_mode:
+        parser.error("--years cannot be combined with --combined, which dates the episodes itself")
+    return args
 
 
 if __name__ == '__main__':
-    main()
+    args = _parse_args()
+    run_kwargs = dict(start_at_episode=args.start, end_at_episode=args.end, use_pipeline=args.pipeline,
+                      combined_extraction=args.combined, retry_failed_only=args.retry_failed,
+                      checkpoint_path=args.checkpoint, results_path=args.results, export_parquet=args.parquet,
+                      discover=args.discover, metrics_path=args.metrics, dry_run=args.dry_run, shard=args.shard,
+                      year_mode=args.year_mode)
+    if args.profile:
+        # cProfile only sees the main thread; for pipeline runs attach py-spy instead, e.g.
+        # py-spy record -o profile.svg -- python main.py --pipeline (worker threads are named after their stage)
+        profiler = cProfile.Profile()
+        profiler.runcall(main, **run_kwargs)
+        profiler.dump_stats(args.profile)
+        print(f"Profile saved to {args.profile} (inspect with: python -m pstats {args.profile})")
+    else:
+        main(**run_kwargs)
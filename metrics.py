@@ -0,0 +1,166 @@
+"""
+Run Metrics and Tracing
+This module times the processing stages of a crawl run (fetch, parse, LLM calls, Wikipedia, geocode, write) and
+counts events like token usage, retries, cache hits and failure categories. Every measurement is emitted as one
+JSON line to the metrics file, and a summary table is printed at the end of a run.
+
+Usage:
+    with timed("geocode", url=url):
+        ...
+    increment("llm_cache_hit")
+
+Dependencies:
+    - Standard library only
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class MetricsRecorder:
+    """
+    Thread-safe collector of stage timings and counters, optionally writing JSON lines.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path (str, optional): JSON-lines file every measurement is appended to; None keeps them in memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self.durations: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, stage: str, **fields):
+        """
+        Times the enclosed block as one execution of the stage. Exceptions are recorded and re-raised.
+
+        Args:
+            stage (str): Name of the stage
+            **fields: Additional fields of the emitted event, e.g. the episode URL
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            event = {"type": "stage", "stage": stage, "seconds": round(seconds, 6),
+                     "status": "error" if error is not None else "ok", **fields}
+            if error is not None:
+                event["error"] = type(error).__name__
+            with self._lock:
+                self.durations.setdefault(stage, []).append(seconds)
+                if error is not None:
+                    self.failures[stage] = self.failures.get(stage, 0) + 1
+            self._emit(event)
+
+    def increment(self, name: str, value: float = 1, **fields):
+        """
+        Adds to a counter, e.g. token counts, retries or cache hits.
+
+        Args:
+            name (str): Name of the counter
+            value (float): Amount to add
+            **fields: Additional fields of the emitted event
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self._emit({"type": "counter", "name": name, "value": value, **fields})
+
+    def summary_table(self) -> str:
+        """
+        Returns a table with count, total and latency percentiles of every stage, followed by all counters.
+        """
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self.durations.items()}
+            failures = dict(self.failures)
+            counters = dict(self.counters)
+
+        lines = [f"{'stage':<20}{'count':>7}{'errors':>8}{'total s':>10}{'p50 ms':>10}{'p90 ms':>10}"
+                 f"{'p99 ms':>10}{'max ms':>10}"]
+        for stage, values in durations.items():
+            lines.append(f"{stage:<20}{len(values):>7}{failures.get(stage, 0):>8}{sum(values):>10.2f}"
+                         f"{_percentile(values, 0.5) * 1000:>10.1f}{_percentile(values, 0.9) * 1000:>10.1f}"
+                         f"{_percentile(values, 0.99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}")
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<27}{'value':>10}")
+            for name, value in sorted(counters.items()):
+                lines.append(f"{name:<27}{value:>10g}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _emit(self, event: dict):
+        if self.path is None:
+            return
+        event["time"] = round(time.time(), 3)
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line + "\n")
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+_recorder = MetricsRecorder()
+
+
+def configure_metrics(path: Optional[str] = "output/metrics.jsonl") -> MetricsRecorder:
+    """
+    Starts a fresh process-wide recorder writing to the given JSON-lines file.
+
+    Returns:
+        MetricsRecorder: The new recorder
+    """
+    global _recorder
+    _recorder.close()
+    _recorder = MetricsRecorder(path)
+    return _recorder
+
+
+def get_recorder() -> MetricsRecorder:
+    """
+    Returns the process-wide recorder.
+    """
+    return _recorder
+
+
+def timed(stage: str, **fields):
+    """
+    Times the enclosed block with the process-wide recorder, see MetricsRecorder.timed.
+    """
+    return _recorder.timed(stage, **fields)
+
+
+def increment(name: str, value: float = 1, **fields):
+    """
+    Adds to a counter of the process-wide recorder, see MetricsRecorder.increment.
+    """
+    _recorder.increment(name, value, **fields)
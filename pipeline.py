@@ -0,0 +1,174 @@
+"""
+Staged Concurrent Pipeline
+This module runs a sequence of processing stages over a stream of items, where every stage has its own
+bounded worker pool and input queue. Many items are in flight at once, bounded queues provide backpressure
+between stages, and results are handed to the sink strictly in input order. The number of items between the
+oldest undelivered one and the newest one fed is limited, so a slow item cannot make the reorder buffer grow
+without bound.
+
+Dependencies:
+    - Standard library only (threading, queue)
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class Stage:
+    """
+    A single pipeline stage.
+
+    Attributes:
+        name (str): Name of the stage, used in error reports
+        func (Callable): Function that receives the item payload and returns the (updated) payload
+        workers (int): Number of worker threads serving this stage
+        queue_size (int): Maximum number of items waiting in front of this stage
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 4
+    queue_size: int = 16
+
+
+@dataclass
+class _Job:
+    index: int
+    payload: Any
+    error: Optional[BaseException] = None
+    failed_stage: Optional[str] = None
+
+
+_SENTINEL = object()
+
+
+def run_pipeline(items: Iterable[Any],
+                 stages: List[Stage],
+                 sink: Callable[[Any], None],
+                 on_error: Optional[Callable[[Any, str, BaseException], Any]] = None,
+                 max_in_flight: Optional[int] = None) -> int:
+    """
+    Pushes every item through all stages concurrently and delivers the results to the sink in input order.
+
+    A stage that raises marks the item as failed; the remaining stages are skipped for that item and
+    on_error is used to turn it into a result for the sink.
+
+    Args:
+        items (Iterable): Input payloads, processed in the order given
+        stages (List[Stage]): Stages every item passes through
+        sink (Callable): Receives every finished payload, called from the calling thread only
+        on_error (Callable, optional): Called with (payload, stage_name, exception) for failed items.
+                                       Its return value is passed to the sink; None drops the item
+        max_in_flight (int, optional): Maximum number of items fed but not yet delivered; the feeder waits
+                                       for the oldest item before reading more. By default all queues and
+                                       workers can be busy at once
+
+    Returns:
+        int: Number of items delivered to the sink
+
+    Raises:
+        Exception: Whatever iterating the items raised, after the items read before it have been delivered
+    """
+    if not stages:
+        raise ValueError("At least one stage must be provided")
+    for stage in stages:
+        if stage.workers < 1:
+            raise ValueError(f"Stage '{stage.name}' needs at least one worker, got {stage.workers}")
+    if max_in_flight is None:
+        max_in_flight = sum(max(stage.queue_size, 1) + stage.workers for stage in stages)
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+
+    queues = [queue.Queue(maxsize=max(stage.queue_size, 1)) for stage in stages]
+    # The output queue needs no bound of its own: the feeder never lets more than max_in_flight items be underway
+    output_queue = queue.Queue()
+    threads = []
+    # Index of the next item to deliver, guarded by the condition the feeder waits on
+    window = threading.Condition()
+    next_index = 0
+    feed_error: List[BaseException] = []
+
+    def feed():
+        try:
+            for index, payload in enumerate(items):
+                with window:
+                    while index - next_index >= max_in_flight:
+                        window.wait()
+                queues[0].put(_Job(index=index, payload=payload))
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            # Always shut the stages down, otherwise the reorder loop below would wait forever
+            for _ in range(stages[0].workers):
+                queues[0].put(_SENTINEL)
+
+    def make_worker(stage_index: int, remaining: List[int], lock: threading.Lock):
+        stage = stages[stage_index]
+        in_queue = queues[stage_index]
+        is_last = stage_index == len(stages) - 1
+        out_queue = output_queue if is_last else queues[stage_index + 1]
+        next_workers = 1 if is_last else stages[stage_index + 1].workers
+
+        def work():
+            while True:
+                job = in_queue.get()
+                if job is _SENTINEL:
+                    break
+                if job.error is None:
+                    try:
+                        job.payload = stage.func(job.payload)
+                    except Exception as e:
+                        job.error = e
+                        job.failed_stage = stage.name
+                out_queue.put(job)
+
+            # The last worker of a stage to finish shuts down the next stage
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                for _ in range(next_workers):
+                    out_queue.put(_SENTINEL)
+
+        return work
+
+    feeder = threading.Thread(target=feed, name="pipeline-feeder", daemon=True)
+    threads.append(feeder)
+    for stage_index, stage in enumerate(stages):
+        remaining = [stage.workers]
+        lock = threading.Lock()
+        work = make_worker(stage_index, remaining, lock)
+        for worker_num in range(stage.workers):
+            threads.append(threading.Thread(target=work, name=f"pipeline-{stage.name}-{worker_num}", daemon=True))
+
+    for thread in threads:
+        thread.start()
+
+    # Reorder buffer: hold finished jobs until every job before them has been delivered
+    pending: Dict[int, _Job] = {}
+    delivered = 0
+    while True:
+        job = output_queue.get()
+        if job is _SENTINEL:
+            break
+        pending[job.index] = job
+        while next_index in pending:
+            ready = pending.pop(next_index)
+            with window:
+                next_index += 1
+                window.notify()
+            result = ready.payload
+            if ready.error is not None:
+                result = on_error(ready.payload, ready.failed_stage, ready.error) if on_error else None
+            if result is not None:
+                sink(result)
+                delivered += 1
+
+    for thread in threads:
+        thread.join()
+
+    if feed_error:
+        raise feed_error[0]
+    return delivered
@@ -0,0 +1,150 @@
+"""
+Pluggable Service Providers
+This module is the registry of the external services the crawler depends on: the LLM, the geocoder, the Wikipedia
+source, the page fetcher and the Spotify playlist. Providers are created lazily on first use, so heavy client libraries
+(google.generativeai, googlemaps, ...) are only imported - and credentials only read - once a run
+actually needs them.
+
+The provider of every kind is selected in config.ini and can be overridden at runtime, e.g. for dry runs:
+
+    [providers]
+    llm = gemini          ; or: fake
+    geocoder = google     ; or: fake
+    wikipedia = wikipedia ; or: mediawiki (batched, see below), fake
+    fetcher = http        ; or: offline, fake
+    playlist = spotify    ; or: fake
+
+Provider interfaces:
+    - llm:       generate(prompt, generation_config, prefix="") -> response with .text (and optional
+                 .usage_metadata), where prefix holds static instructions the provider may cache;
+                 attributes model_name and cacheable
+    - geocoder:  geocode(address) -> (latitude, longitude) or None; attribute cacheable
+    - wikipedia: summary(search_term) -> (article_title, first_paragraph), (None, None) if nothing was found;
+                 optionally summaries(search_terms) -> list of those tuples, for batch lookups.
+                 'mediawiki' looks up many terms in a few requests, but its answers can differ from those of the
+                 'wikipedia' package: a search term that is an article title is taken as is instead of the first
+                 search hit, and a disambiguation page resolves to the best search hit instead of (None, None)
+    - fetcher:   get_text(url, encoding) -> str
+    - playlist:  snapshot_id(), items() -> item URIs, show_episodes() -> (uri, title) pairs,
+                 add(uris, position), remove(uris), reorder(range_start, insert_before, range_length), where
+                 the writes return the new snapshot id; attribute calls, a Counter of 'read' and 'write' calls
+
+Dependencies:
+    - Standard library only
+"""
+
+import configparser
+import importlib
+import threading
+from typing import Callable, Dict, Union
+
+LLM = "llm"
+GEOCODER = "geocoder"
+WIKIPEDIA = "wikipedia"
+FETCHER = "fetcher"
+PLAYLIST = "playlist"
+
+DEFAULT_PROVIDERS = {LLM: "gemini", GEOCODER: "google", WIKIPEDIA: "wikipedia", FETCHER: "http",
+                     PLAYLIST: "spotify"}
+
+# Factories are given as "module:attribute" and only imported when the provider is first used
+_factories: Dict[str, Dict[str, Union[str, Callable]]] = {
+    LLM: {"gemini": "llm_call:GeminiProvider", "fake": "fake_providers:FakeLLMProvider"},
+    GEOCODER: {"google": "location:GoogleGeocoder", "fake": "fake_providers:FakeGeocoder"},
+    WIKIPEDIA: {"mediawiki": "wikipedia_summary:MediaWikiProvider", "wikipedia": "wikipedia_summary:WikipediaProvider",
+                "fake": "fake_providers:FakeWikipediaProvider"},
+    FETCHER: {"http": "http_cache:HttpCache", "offline": "http_cache:offline_http_cache",
+              "fake": "fake_providers:FakeFetcher"},
+    PLAYLIST: {"spotify": "spotify_sync:SpotifyPlaylistAPI", "fake": "fake_providers:FakePlaylist"},
+}
+
+_lock = threading.RLock()
+_instances: Dict[str, object] = {}
+# Providers selected at runtime, they take precedence over the ones configured in config.ini
+_selected: Dict[str, str] = {}
+_configured: Dict[str, str] = {}
+_config_read = False
+
+
+def register_provider(kind: str, name: str, factory: Union[str, Callable]):
+    """
+    Registers a provider implementation.
+
+    Args:
+        kind (str): Provider kind (LLM, GEOCODER, WIKIPEDIA, FETCHER or PLAYLIST)
+        name (str): Name the provider is selected with in config.ini
+        factory (str or callable): Callable without arguments returning the provider, or its "module:attribute"
+    """
+    with _lock:
+        _factories.setdefault(kind, {})[name] = factory
+
+
+def set_provider(kind: str, provider: Union[str, object, None]):
+    """
+    Overrides the provider of a kind for the rest of the process.
+
+    Args:
+        kind (str): Provider kind
+        provider: Name of a registered provider, a provider instance, or None to return to the configured provider
+    """
+    with _lock:
+        _instances.pop(kind, None)
+        _selected.pop(kind, None)
+        if isinstance(provider, str):
+            if provider not in _factories[kind]:
+                raise KeyError(f"Unknown {kind} provider: {provider}")
+            _selected[kind] = provider
+        elif provider is not None:
+            _instances[kind] = provider
+            _selected[kind] = "custom"
+
+
+def use_fake_providers():
+    """
+    Switches every kind to its offline fake, so a run never touches a network backend.
+    """
+    for kind in DEFAULT_PROVIDERS:
+        set_provider(kind, "fake")
+
+
+def get_provider(kind: str):
+    """
+    Returns the provider of a kind, creating it on first use.
+    """
+    with _lock:
+        if kind not in _instances:
+            _instances[kind] = _load_factory(_factories[kind][provider_name(kind)])()
+        return _instances[kind]
+
+
+def provider_name(kind: str) -> str:
+    """
+    Returns the name of the selected provider of a kind ("custom" for instances set with set_provider).
+    """
+    with _lock:
+        if kind in _selected:
+            return _selected[kind]
+        _read_config()
+        return _configured.get(kind, DEFAULT_PROVIDERS[kind])
+
+
+def _read_config():
+    global _config_read
+    if _config_read:
+        return
+    config = configparser.ConfigParser(inline_comment_prefixes=(";", "#"))
+    config.read('config.ini')
+    if config.has_section('providers'):
+        for kind, name in config.items('providers'):
+            if kind in _factories and name in _factories[kind]:
+                _configured[kind] = name
+            else:
+                print(f"Ignoring unknown provider in config.ini: {kind} = {name}")
+    _config_read = True
+
+
+def _load_factory(factory: Union[str, Callable]) -> Callable:
+    if callable(factory):
+        return factory
+    module_name, attribute = factory.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
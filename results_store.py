@@ -0,0 +1,243 @@
+"""
+SQLite Results Store
+This module keeps the per-episode results of all crawl runs in a SQLite database in WAL mode. Results are keyed by
+episode URL, so reprocessing an episode updates its row instead of appending a duplicate. Rows are written in
+batched transactions and every thread uses its own connection (see sqlite_connections.py), so parallel workers can
+write safely.
+
+Exporting to the semicolon separated CSV format (or Parquet) is a final step over the whole store, see
+export_csv and export_parquet.
+
+Dependencies:
+    - Standard library only (sqlite3); pandas is imported by the export functions only
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlite_connections import ThreadLocalConnections
+from write_to_csv import write_rows_to_csv, write_rows_to_parquet
+
+
+# Episode number at the start of an episode title, e.g. "GAG271: ..." or "ZS12 ..."
+EPISODE_TITLE_PATTERN = re.compile(r'^\s*(?P<series>GAG|ZS)\s*(?P<num>\d+)', re.IGNORECASE)
+
+
+def episode_num_from_url(url: str) -> Optional[int]:
+    """
+    Extracts the episode number from an episode URL like https://www.geschichte.fm/archiv/gag271/.
+
+    Returns:
+        int: The episode number, None if the URL does not end in a number
+    """
+    match = re.search(r'(\d+)/?$', url)
+    return int(match.group(1)) if match else None
+
+
+def episode_num_from_url_or_title(url: Optional[str], title: Optional[str]) -> Optional[int]:
+    """
+    Extracts the episode number from the episode URL, or from the title if there is no URL. "Zeitsprung" (ZS) and
+    "Geschichten aus der Geschichte" (GAG) are the same podcast with one numbering, e.g. the page .../podcast/zs11/
+    is titled "GAG11: ...".
+
+    Returns:
+        int: The episode number, None if neither the URL nor the title contain one
+    """
+    episode_num = episode_num_from_url(url) if url else None
+    if episode_num is None and title:
+        match = EPISODE_TITLE_PATTERN.match(title)
+        episode_num = int(match.group("num")) if match else None
+    return episode_num
+
+
+class ResultsStore:
+    """
+    Persistent, upsert-based store of episode results.
+    """
+
+    def __init__(self, path: str = "output/episode_data.sqlite"):
+        """
+        Args:
+            path (str): Location of the SQLite database
+        """
+        self.path = path
+        self._connections = ThreadLocalConnections(path, setup=self._create_tables)
+        self._connect()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection):
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "url TEXT PRIMARY KEY, episode_num INTEGER, failed INTEGER NOT NULL DEFAULT 0, "
+            "data TEXT NOT NULL, updated_at REAL NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_episode_num ON results (episode_num)")
+
+    def upsert(self, url: str, result: dict, failed: bool = False):
+        """
+        Inserts or replaces the result of a single episode.
+
+        Args:
+            url (str): Episode URL
+            result (dict): Result row of the episode
+            failed (bool): Whether the episode could not be processed successfully
+        """
+        self.upsert_many([(url, result, failed)])
+
+    def upsert_many(self, rows: Iterable[Tuple[str, dict, bool]]):
+        """
+        Inserts or replaces the results of several episodes in a single transaction.
+
+        Args:
+            rows (Iterable[Tuple[str, dict, bool]]): (url, result, failed) tuples
+        """
+        now = time.time()
+        self.upsert_records((url, result, failed, now) for url, result, failed in rows)
+
+    def upsert_records(self, records: Iterable[Tuple[str, dict, bool, float]]):
+        """
+        Inserts or replaces results together with the time they were written, e.g. records of another store
+        (see iter_records) that have to keep their own timestamps.
+
+        Args:
+            records (Iterable[Tuple[str, dict, bool, float]]): (url, result, failed, updated_at) tuples
+        """
+        records = [(url, episode_num_from_url(url), int(failed), json.dumps(result, ensure_ascii=False, default=str),
+                    updated_at)
+                   for url, result, failed, updated_at in records]
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT INTO results (url, episode_num, failed, data, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET episode_num = excluded.episode_num, failed = excluded.failed, "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                records)
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the stored result of an episode, or None if there is none.
+        """
+        row = self._connect().execute("SELECT data FROM results WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_results(self, failed: Optional[bool] = None) -> List[dict]:
+        """
+        Returns all stored results ordered by episode number.
+
+        Args:
+            failed (bool, optional): Only return failed (True) or successful (False) episodes; None returns all
+
+        Returns:
+            List[dict]: Result rows
+        """
+        return [result for _, result in self.iter_items(failed)]
+
+    def iter_items(self, failed: Optional[bool] = None) -> List[Tuple[str, dict]]:
+        """
+        Returns all stored results together with their episode URL, ordered by episode number.
+
+        Args:
+            failed (bool, optional): Only return failed (True) or successful (False) episodes; None returns all
+
+        Returns:
+            List[Tuple[str, dict]]: (url, result row) pairs
+        """
+        query = "SELECT url, data FROM results"
+        parameters = ()
+        if failed is not None:
+            query += " WHERE failed = ?"
+            parameters = (int(failed),)
+        query += " ORDER BY episode_num IS NULL, episode_num, url"
+        return [(row[0], json.loads(row[1])) for row in self._connect().execute(query, parameters)]
+
+    def iter_records(self) -> List[Tuple[str, dict, bool, float]]:
+        """
+        Returns all stored results with their status and the time they were last written, ordered by URL.
+
+        Returns:
+            List[Tuple[str, dict, bool, float]]: (url, result row, failed, updated_at) tuples
+        """
+        query = "SELECT url, data, failed, updated_at FROM results ORDER BY url"
+        return [(row[0], json.loads(row[1]), bool(row[2]), row[3]) for row in self._connect().execute(query)]
+
+    def export_csv(self, filename: str = "output/episode_data.csv", failed: Optional[bool] = None,
+                   fieldnames: Optional[List[str]] = None) -> int:
+        """
+        Writes the whole store to a semicolon separated, utf-8-sig encoded CSV file, replacing the file.
+
+        Args:
+            filename (str): Target CSV file
+            failed (bool, optional): Only export failed (True) or successful (False) episodes; None exports all
+            fieldnames (List[str], optional): Columns to export; defaults to all columns in first-seen order
+
+        Returns:
+            int: Number of exported rows
+        """
+        rows = self.iter_results(failed)
+        write_rows_to_csv(rows, filename, fieldnames)
+        return len(rows)
+
+    def export_parquet(self, filename: str = "output/episode_data.parquet", failed: Optional[bool] = None) -> int:
+        """
+        Writes the whole store to a Parquet file, replacing the file.
+
+        Returns:
+            int: Number of exported rows
+        """
+        rows = self.iter_results(failed)
+        write_rows_to_parquet(rows, filename)
+        return len(rows)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+
+class BufferedResultsWriter:
+    """
+    Collects episode results and writes them to a ResultsStore in batched transactions.
+    """
+
+    def __init__(self, store: ResultsStore, batch_size: int = 25,
+                 on_flush: Optional[Callable[[List[str]], None]] = None):
+        """
+        Args:
+            store (ResultsStore): Store the results are written to
+            batch_size (int): Number of results written per transaction
+            on_flush (Callable, optional): Called with the URLs of every batch once it is committed
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def add(self, url: str, result: dict, failed: bool = False):
+        """
+        Buffers a result and flushes the buffer once it is full.
+        """
+        with self._lock:
+            self._buffer.append((url, result, failed))
+            if len(self._buffer) < self.batch_size:
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered results in one transaction.
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            self.store.upsert_many(rows)
+        if self.on_flush is not None:
+            self.on_flush([url for url, _, _ in rows])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
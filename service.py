@@ -0,0 +1,343 @@
+"""
+Episode Dating Service
+This module runs the crawler as a resident local HTTP service, so a single new episode can be dated and located
+right after it is published without paying the startup of a batch run: the LLM client, the geocoder, the Wikipedia
+source, the gazetteer and all caches are created once and stay warm.
+
+Concurrent requests are coalesced into micro-batches: the first request opens a short window (25 ms by default),
+and all requests arriving within it are processed together with the batched LLM and Wikipedia functions, so ten
+concurrent episodes cost about as many LLM calls as one. Identical requests within a batch are processed once.
+
+Endpoints:
+    POST /episode   {"url": "https://www.geschichte.fm/archiv/gag500/"}
+                    or {"description": "...", "title": "..."} (title optional)
+                    -> {"title", "location", "latitude", "longitude", "year_from", "year_until", "search_term",
+                        "wikipedia_title", "url"}
+    GET  /health    -> providers, processed requests and batches
+    GET  /metrics   -> the stage timing table of the metrics module
+
+Results of URL requests are also written to the results store, so the next CSV export includes them.
+
+Usage:
+    python service.py [--port 8765] [--window-ms 25] [--max-batch 16] [--dry-run]
+    curl -d '{"url": "https://www.geschichte.fm/archiv/gag500/"}' http://127.0.0.1:8765/episode
+
+Dependencies:
+    - llm_call, wikipedia_summary, location: The batched extraction, Wikipedia and geocoding functions
+    - website_crawler: Contains the extraction of title and summary from an episode page
+    - providers: Contains the registry of the backends kept warm by the service
+    - service_benchmark.py: Concurrent load generator reporting the latencies of the service
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from context_budget import add_wikipedia_context, episode_prompt_text
+from date_parser import DEFAULT_MIN_CONFIDENCE, parse_dates
+from llm_call import get_goelocation_from_episode_information_batch, get_year_from_episode_information_batch, \
+    get_wikipedia_search_term_from_episode_information_batch, configure_response_cache
+from location import configure_geocode_cache, get_coordinates_google
+from metrics import configure_metrics, get_recorder, increment, timed
+from providers import FETCHER, GEOCODER, LLM, WIKIPEDIA, get_provider, provider_name, use_fake_providers
+from results_store import ResultsStore
+from website_crawler import extract_relevant_episode_data
+from wikipedia_summary import get_wikipedia_summaries
+
+DEFAULT_PORT = 8765
+DEFAULT_WINDOW_SECONDS = 0.025
+DEFAULT_MAX_BATCH = 16
+DEFAULT_BATCH_WORKERS = 2
+
+# Processed once at startup, so the first real request finds every client, index and cache loaded
+_WARM_UP_DESCRIPTION = ("Im November 1532 nehmen spanische Konquistadoren unter dem Kommando von Francisco Pizarro "
+                        "den letzten König der Inka gefangen: Atahualpa.")
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads into batches and processes the batches on a small worker pool.
+
+    A batch is closed when the window after its first item has passed or max_batch items were collected, so a
+    lone request waits at most one window. While the workers are busy, the next batch is already being collected.
+    """
+
+    def __init__(self, process_batch: Callable[[List], List], window: float = DEFAULT_WINDOW_SECONDS,
+                 max_batch: int = DEFAULT_MAX_BATCH, workers: int = DEFAULT_BATCH_WORKERS):
+        """
+        Args:
+            process_batch (Callable): Receives a list of items and returns one result per item, in order; a
+                                      result that is an exception is raised for its item
+            window (float): Seconds to wait for further items after the first item of a batch
+            max_batch (int): Maximum number of items per batch
+            workers (int): Number of batches processed concurrently
+        """
+        self.process_batch = process_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.items = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service-batch")
+        self._thread = threading.Thread(target=self._collect, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queues an item.
+
+        Returns:
+            Future: Resolves to the item's result, or raises the exception its batch failed with
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.batches += 1
+            self.items += len(batch)
+            increment("service_batch_size", len(batch))
+            self._pool.submit(self._process, batch)
+
+    def _process(self, batch: List[Tuple[object, Future]]):
+        try:
+            with timed("service_batch"):
+                results = self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class EpisodeService:
+    """
+    Dates and locates episodes given by URL or description, in micro-batches.
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW_SECONDS, max_batch: int = DEFAULT_MAX_BATCH,
+                 results_path: Optional[str] = "output/episode_data.sqlite", fetch_workers: int = 8,
+                 batch_workers: int = DEFAULT_BATCH_WORKERS):
+        """
+        Args:
+            window (float): Micro-batching window in seconds
+            max_batch (int): Maximum number of episodes per batch
+            batch_workers (int): Number of batches processed concurrently
+            results_path (str, optional): Results store the results of URL requests are written to
+            fetch_workers (int): Number of episode pages fetched concurrently within a batch
+        """
+        self.max_batch = max_batch
+        self._store = ResultsStore(results_path) if results_path else None
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="service-fetch")
+        self._batcher = MicroBatcher(self._process_batch, window, max_batch, batch_workers)
+
+    def warm_up(self):
+        """
+        Creates every provider and processes one description, which loads the remaining clients and indexes.
+        """
+        with timed("service_warm_up"):
+            for kind in (LLM, GEOCODER, WIKIPEDIA, FETCHER):
+                get_provider(kind)
+            self._process_batch([{"description": _WARM_UP_DESCRIPTION}])
+
+    def process(self, request: dict, timeout: Optional[float] = None) -> dict:
+        """
+        Processes one request with the next micro-batch and waits for its result.
+
+        Args:
+            request (dict): 'url' of an episode page, or 'description' and optionally 'title' of an episode
+            timeout (float, optional): Seconds to wait for the result
+
+        Raises:
+            ValueError: If the request has neither a URL nor a description, or the episode page could not be read
+        """
+        if not request.get("url") and not request.get("description"):
+            raise ValueError("The request needs a 'url' or a 'description'")
+        return self._batcher.submit(request).result(timeout)
+
+    def stats(self) -> dict:
+        return {"providers": {kind: provider_name(kind) for kind in (LLM, GEOCODER, WIKIPEDIA, FETCHER)},
+                "requests": self._batcher.items, "batches": self._batcher.batches,
+                "window_ms": self._batcher.window * 1000, "max_batch": self._batcher.max_batch}
+
+    def _process_batch(self, requests: List[dict]) -> List:
+        # Identical requests within the batch are processed once
+        keys = [request.get("url") or (request.get("title"), request.get("description")) for request in requests]
+        unique: Dict = {}
+        for key, request in zip(keys, requests):
+            unique.setdefault(key, request)
+
+        states = list(self._fetch_pool.map(self._load_episode, unique.values()))
+        valid = [state for state in states if not isinstance(state, Exception)]
+        if valid:
+            self._extract(valid)
+
+        results = dict(zip(unique, states))
+        stored = [(state["url"], state["result"], False) for state in valid if state.get("url")]
+        if self._store is not None and stored:
+            self._store.upsert_many(stored)
+        return [results[key] if isinstance(results[key], Exception) else dict(results[key]["response"])
+                for key in keys]
+
+    @staticmethod
+    def _load_episode(request: dict):
+        url = request.get("url")
+        if not url:
+            return {"url": None, "episode": {"title": request.get("title") or "", "summary": request["description"]}}
+        episode = extract_relevant_episode_data(url=url)
+        if episode is None:
+            return ValueError(f"No episode information found at {url}")
+        return {"url": url, "episode": episode}
+
+    def _extract(self, states: List[dict]):
+        """
+        Runs the stages of main.py for a whole batch: search term, Wikipedia context, location, time period
+        and coordinates.
+        """
+        texts = [episode_prompt_text(state) for state in states]
+        with timed("search_term_llm"):
+            search_terms = get_wikipedia_search_term_from_episode_information_batch(texts, self.max_batch)
+        with timed("wikipedia"):
+            summaries = get_wikipedia_summaries(search_terms)
+        for state, search_term, summary in zip(states, search_terms, summaries):
+            state["search_term"] = search_term
+            add_wikipedia_context(state, summary)
+
+        texts = [episode_prompt_text(state) for state in states]
+        with timed("geolocation_llm"):
+            locations = get_goelocation_from_episode_information_batch(texts, self.max_batch)
+
+        # Like the combined stage of main.py, only dates stated in the episode itself are read without the LLM,
+        # never dates from the Wikipedia context
+        years = [parse_dates(f"{state['episode'].get('title', '')}. {state['episode'].get('summary', '')}")
+                 for state in states]
+        undated = [index for index, year in enumerate(years) if year["confidence"] < DEFAULT_MIN_CONFIDENCE]
+        increment("year_rule_hit", len(states) - len(undated))
+        if undated:
+            with timed("year_llm"):
+                llm_years = get_year_from_episode_information_batch([texts[index] for index in undated],
+                                                                    self.max_batch, min_confidence=1.1)
+            for index, year in zip(undated, llm_years):
+                years[index] = year
+
+        for state, location, year in zip(states, locations, years):
+            coordinates = None
+            if location != "Unknown":
+                with timed("geocode"):
+                    coordinates = get_coordinates_google(location)
+            latitude, longitude = coordinates if coordinates else (None, None)
+            state["result"] = {"title": state["episode"].get("title"), "location": location,
+                               "latitude": latitude, "longitude": longitude,
+                               "year_from": year["start_date"], "year_until": year["end_date"]}
+            state["response"] = dict(state["result"], url=state["url"], search_term=state["search_term"],
+                                     wikipedia_title=state["wikipedia_summary"][0])
+
+
+def make_server(service: EpisodeService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """
+    Creates the HTTP server of the service; every connection is handled on its own thread.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, dict(service.stats(), status="ok"))
+            elif self.path == "/metrics":
+                self._send(200, get_recorder().summary_table(), "text/plain")
+            else:
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/episode":
+                self._send(404, {"error": f"Unknown path: {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("The request has to be a JSON object")
+                with timed("service_request"):
+                    self._send(200, service.process(request))
+            except (ValueError, KeyError) as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                print(f"Request failed: {e}")
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def _send(self, status: int, body, content_type: str = "application/json"):
+            data = (json.dumps(body, ensure_ascii=False) if content_type == "application/json" else body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # The default backlog of 5 drops connections of bursts, which then wait a second for the retransmit
+        request_queue_size = 128
+        daemon_threads = True
+
+    return Server((host, port), Handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve on-demand episode dating over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_SECONDS * 1000,
+                        help="micro-batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="maximum episodes per batch")
+    parser.add_argument("--batch-workers", type=int, default=DEFAULT_BATCH_WORKERS,
+                        help="number of batches processed concurrently")
+    parser.add_argument("--results", default="output/episode_data.sqlite", help="location of the results store")
+    parser.add_argument("--metrics", default="output/service_metrics.jsonl",
+                        help="location of the JSON-lines metrics file")
+    parser.add_argument("--no-warm-up", action="store_true", help="do not process a warm-up request at startup")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="use offline fakes instead of every network backend, outputs go to output/dry_run/")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        use_fake_providers()
+        args.results = os.path.join("output", "dry_run", os.path.basename(args.results))
+        args.metrics = os.path.join("output", "dry_run", os.path.basename(args.metrics))
+        # Answers of the fakes must neither come from nor end up in the caches of real runs
+        configure_response_cache(os.path.join("output", "dry_run", "llm_cache.sqlite"))
+        configure_geocode_cache(os.path.join("output", "dry_run", "geocode_cache.sqlite"))
+    configure_metrics(args.metrics)
+    episode_service = EpisodeService(args.window_ms / 1000, args.max_batch, args.results,
+                                     batch_workers=args.batch_workers)
+    if not args.no_warm_up:
+        started = time.perf_counter()
+        episode_service.warm_up()
+        print(f"Warmed up in {time.perf_counter() - started:.2f} s")
+    http_server = make_server(episode_service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{http_server.server_address[1]}/episode")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        get_recorder().close()
@@ -0,0 +1,177 @@
+"""
+Episode Service Load Generator
+This script sends concurrent "date/locate this episode" requests to the episode service (service.py) and reports
+their latency percentiles and the throughput.
+
+Without --url it starts the service in-process with the offline fakes, once without micro-batching (every request
+is its own batch) and once with the given window, so the effect of the batching can be compared. The fake LLM of
+this script answers batched prompts as well, takes --llm-latency-ms per call plus a little per episode and allows
+--llm-rate calls per second, like the request quota of a real model.
+
+Usage:
+    python service_benchmark.py [--clients 16] [--requests 20] [--window-ms 25] [--llm-latency-ms 300] [--llm-rate 10]
+    python service_benchmark.py --url http://127.0.0.1:8765     # against a running service
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import providers
+from fake_providers import PLACES, SEARCH_TERMS, FakeLLMProvider, FakeResponse, stable_hash
+from http_transport import TokenBucket
+from metrics import _percentile, configure_metrics
+from service import EpisodeService, make_server
+
+_EPISODE_ID_PATTERN = re.compile(r'^\s*ID (\d+):\s*(.*)$', re.MULTILINE)
+
+
+class SlowFakeLLM(FakeLLMProvider):
+    """
+    Fake LLM with a per-call and per-episode latency and a request quota that also answers the batched prompts
+    of llm_call.py.
+    """
+
+    def __init__(self, latency: float, latency_per_episode: float, rate: float):
+        self.latency = latency
+        self.latency_per_episode = latency_per_episode
+        self.calls = 0
+        self._quota = TokenBucket(rate, max(1, int(rate)))
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, generation_config: dict, prefix: str = "") -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+        self._quota.acquire()
+        episodes = _EPISODE_ID_PATTERN.findall(prompt)
+        time.sleep(self.latency + self.latency_per_episode * max(1, len(episodes)))
+        if not episodes:
+            return super().generate(prompt, generation_config, prefix)
+
+        answers = []
+        for episode_id, text in episodes:
+            seed = stable_hash(text)
+            if '"location"' in prompt:
+                answer = PLACES[seed % len(PLACES)][0]
+            elif '"dates"' in prompt:
+                year = f"+{1000 + seed % 900:04d}"
+                answer = {"start_date": year, "end_date": year}
+            else:
+                answer = SEARCH_TERMS[seed % len(SEARCH_TERMS)]
+            field = "location" if '"location"' in prompt else "dates" if '"dates"' in prompt else "search_term"
+            answers.append({"id": int(episode_id), field: answer})
+        return FakeResponse(json.dumps(answers, ensure_ascii=False))
+
+
+def _requests(count: int, seed: int = 0) -> List[dict]:
+    # Mostly episode URLs (served by the fake fetcher), some free descriptions
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        episode_num = rng.randint(300, 999)
+        if rng.random() < 0.75:
+            requests.append({"url": f"https://www.geschichte.fm/archiv/gag{episode_num}/"})
+        else:
+            term = rng.choice(SEARCH_TERMS)
+            requests.append({"title": f"Episode über {term}",
+                             "description": f"Wir sprechen in Folge {episode_num} über {term}."})
+    return requests
+
+
+def _post(base_url: str, request: dict) -> Tuple[float, bool]:
+    data = json.dumps(request).encode("utf-8")
+    http_request = urllib.request.Request(f"{base_url}/episode", data=data,
+                                          headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(http_request, timeout=120) as response:
+            json.loads(response.read())
+        ok = True
+    except Exception as e:
+        print(f"Request failed: {e}")
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def generate_load(base_url: str, clients: int, requests_per_client: int) -> dict:
+    """
+    Lets every client send its requests one after another, all clients concurrently.
+
+    Returns:
+        dict: 'latencies' (sorted, in seconds), 'errors' and 'seconds' (wall time of the whole run)
+    """
+    requests = _requests(clients * requests_per_client)
+
+    def client(index: int) -> List[Tuple[float, bool]]:
+        return [_post(base_url, request) for request in requests[index::clients]]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        outcomes = [outcome for results in pool.map(client, range(clients)) for outcome in results]
+    seconds = time.perf_counter() - started
+    return {"latencies": sorted(latency for latency, ok in outcomes if ok),
+            "errors": sum(1 for _, ok in outcomes if not ok), "seconds": seconds}
+
+
+def _report(label: str, load: dict, llm_calls: Optional[int] = None, batches: Optional[int] = None):
+    latencies = load["latencies"]
+    throughput = len(latencies) / load["seconds"] if load["seconds"] else 0.0
+    line = (f"{label:<22}{len(latencies):>6}{load['errors']:>7}{_percentile(latencies, 0.5) * 1000:>10.0f}"
+            f"{_percentile(latencies, 0.9) * 1000:>10.0f}{_percentile(latencies, 0.99) * 1000:>10.0f}"
+            f"{throughput:>10.1f}")
+    if batches is not None:
+        line += f"{batches:>9}{llm_calls:>11}"
+    print(line)
+
+
+def run_in_process(clients: int, requests_per_client: int, window: float, max_batch: int, llm_latency: float,
+                   llm_rate: float):
+    """
+    Benchmarks an in-process service with the offline fakes, without and with micro-batching.
+    """
+    providers.use_fake_providers()
+    configure_metrics(None)
+    print(f"{'configuration':<22}{'ok':>6}{'errors':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+          f"{'batches':>9}{'LLM calls':>11}")
+    # Without batching, every client's request is processed on its own worker, like a plain threaded server
+    for label, batch_window, batch_size, workers in (("no batching", 0.0, 1, clients),
+                                                     (f"window {window * 1000:g} ms", window, max_batch, 2)):
+        llm = SlowFakeLLM(llm_latency, llm_latency / 50, llm_rate)
+        providers.set_provider(providers.LLM, llm)
+        service = EpisodeService(batch_window, batch_size, results_path=None, batch_workers=workers)
+        service.warm_up()
+        llm.calls = 0
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            load = generate_load(f"http://127.0.0.1:{server.server_address[1]}", clients, requests_per_client)
+        finally:
+            server.shutdown()
+            server.server_close()
+        _report(label, load, llm.calls, service.stats()["batches"])
+    providers.set_provider(providers.LLM, None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the latency of the episode service under concurrent load")
+    parser.add_argument("--url", help="base URL of a running service; by default an in-process one is started")
+    parser.add_argument("--clients", type=int, default=16, help="number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--window-ms", type=float, default=25, help="micro-batching window of the in-process service")
+    parser.add_argument("--max-batch", type=int, default=16, help="maximum batch size of the in-process service")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="latency per call of the fake LLM")
+    parser.add_argument("--llm-rate", type=float, default=10, help="calls per second the fake LLM allows")
+    args = parser.parse_args()
+
+    if args.url:
+        print(f"{'configuration':<22}{'ok':>6}{'errors':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        _report(args.url, generate_load(args.url.rstrip("/"), args.clients, args.requests))
+    else:
+        run_in_process(args.clients, args.requests, args.window_ms / 1000, args.max_batch, args.llm_latency_ms / 1000,
+                       args.llm_rate)
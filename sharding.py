@@ -0,0 +1,143 @@
+"""
+Sharded Crawling
+This module splits a crawl run across several processes or machines. Every episode belongs to exactly one of n
+shards, decided by its episode number alone (or a hash of its URL if it has none), so every machine computes the
+same partition without any coordination. A shard keeps its checkpoint manifest, results store, metrics, partial
+CSV export and its LLM and geocode caches in its own directory, output/shards/shard-<i>-of-<n>/. The caches start
+as copies of the main caches, so shards on one machine never write to the same SQLite database. The HTTP page
+cache stays shared, its files are written atomically.
+
+Once all shards are done (and their directories copied back to one machine), merge_shards combines their results
+stores into the main results store and exports the final episode_data.csv.
+
+Usage:
+    python main.py --start 1 --end 500 --shard 1/4     # on the first machine
+    python main.py --start 1 --end 500 --shard 2/4     # on the second machine, ...
+    python sharding.py merge                           # merges all directories in output/shards/
+
+Dependencies:
+    - results_store: Contains the SQLite results store and the CSV export
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from results_store import ResultsStore, episode_num_from_url
+
+SHARDS_DIR = os.path.join("output", "shards")
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parses a shard specification like "2/4" (the second of four shards).
+
+    Returns:
+        Tuple[int, int]: (shard index starting at 1, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or the index is out of range
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/n, e.g. 2/4")
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', the index has to be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def shard_of(url: str, shard_count: int) -> int:
+    """
+    Returns the shard (starting at 1) an episode belongs to.
+
+    Consecutive episode numbers go to consecutive shards, so every shard gets an equal share of any episode
+    range. URLs without an episode number are assigned by a hash, which unlike hash() is the same in every
+    process.
+    """
+    episode_num = episode_num_from_url(url)
+    if episode_num is None:
+        episode_num = int(hashlib.sha256(url.encode("utf-8")).hexdigest()[:12], 16) + 1
+    return (episode_num - 1) % shard_count + 1
+
+
+def select_shard(urls: Iterable[str], shard_index: int, shard_count: int) -> List[str]:
+    """
+    Keeps the URLs belonging to a shard, in their original order.
+    """
+    return [url for url in urls if shard_of(url, shard_count) == shard_index]
+
+
+def shard_dir(shard_index: int, shard_count: int, base_dir: str = "output") -> str:
+    """
+    Returns the directory a shard keeps all its outputs and caches in.
+    """
+    return os.path.join(base_dir, "shards", f"shard-{shard_index}-of-{shard_count}")
+
+
+def merge_shards(shard_dirs: Optional[List[str]] = None, results_path: str = "output/episode_data.sqlite",
+                 results_file: str = "episode_data.sqlite") -> int:
+    """
+    Merges the results stores of the shards into one results store.
+
+    Every episode ends up once: if it was processed by several shards (e.g. after re-sharding) or is already
+    in the target store, a successful result wins over a failed one and a newer result over an older one.
+    Merged results keep the time they were written in their shard, so the outcome depends neither on the order
+    of the shards nor on whether they are merged at once or one after another.
+
+    Args:
+        shard_dirs (List[str], optional): Shard directories; defaults to all directories in output/shards/
+        results_path (str): Location of the merged results store
+        results_file (str): File name of the results store within each shard directory
+
+    Returns:
+        int: Number of episodes taken from the shards
+    """
+    if shard_dirs is None:
+        shard_dirs = sorted(glob.glob(os.path.join(SHARDS_DIR, "shard-*")))
+    target = ResultsStore(results_path)
+
+    # url -> ((successful, updated_at, data), result, failed) of the best result seen so far
+    best = {}
+    for url, result, failed, updated_at in target.iter_records():
+        best[url] = ((not failed, updated_at, ""), None, failed)
+    for directory in shard_dirs:
+        path = os.path.join(directory, results_file)
+        if not os.path.isfile(path):
+            print(f"Skipping {directory}: no results store found")
+            continue
+        records = ResultsStore(path).iter_records()
+        print(f"Read {len(records)} episodes from {directory}")
+        for url, result, failed, updated_at in records:
+            rank = (not failed, updated_at, repr(result))
+            if url not in best or rank > best[url][0]:
+                best[url] = (rank, result, failed)
+
+    # The records keep the time they were written in their shard, so a later merge still compares them correctly
+    records = [(url, result, failed, rank[1]) for url, (rank, result, failed) in sorted(best.items())
+               if result is not None]
+    target.upsert_records(records)
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge the results of sharded crawl runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="merge the shard results and export episode_data.csv")
+    merge_parser.add_argument("shard_dirs", nargs="*", help="shard directories (default: all in output/shards/)")
+    merge_parser.add_argument("--results", default="output/episode_data.sqlite",
+                              help="location of the merged results store")
+    merge_parser.add_argument("--parquet", action="store_true", help="additionally export the results to Parquet")
+    args = parser.parse_args()
+
+    merged = merge_shards(args.shard_dirs or None, args.results)
+    print(f"Merged {merged} episodes into {args.results}")
+    results_dir = os.path.dirname(args.results) or "."
+    store = ResultsStore(args.results)
+    written = store.export_csv(os.path.join(results_dir, "episode_data.csv"))
+    failed_count = store.export_csv(os.path.join(results_dir, "errors_while_parsing.csv"), failed=True)
+    print(f"Exported {written} episodes to {os.path.join(results_dir, 'episode_data.csv')} ({failed_count} failed)")
+    if args.parquet:
+        store.export_parquet(os.path.join(results_dir, "episode_data.parquet"))
@@ -0,0 +1,411 @@
+"""
+Spotify Playlist Sync
+This module keeps a Spotify playlist of the podcast episodes in chronological order. Instead of rewriting the
+playlist on every run, it computes the smallest set of changes between the current remote order and the
+chronological order of the results: episodes missing from the playlist are inserted, episodes that should not be
+in it are removed, and only the episodes outside a longest increasing subsequence of the remote order are moved.
+Removals and insertions are sent in batches of up to 100 items, moves of adjacent episodes as one range.
+
+The order of the last sync is kept in a state file together with the playlist's snapshot id, so an unchanged
+playlist does not even have to be read again.
+
+Credentials and ids are read from config.ini:
+
+    [spotify]
+    client_id = ...
+    client_secret = ...
+    refresh_token = ...     ; of an account allowed to modify the playlist
+    playlist_id = ...
+    show_id = ...           ; the podcast on Spotify
+
+Usage:
+    python spotify_sync.py [--results output/episode_data.sqlite | --csv output/episode_data.csv] [--dry-run]
+
+Dependencies:
+    - catalog: Contains the chronological order of the results
+    - providers: The playlist API is the 'playlist' provider, a local stand-in is used for dry runs
+"""
+
+import argparse
+import configparser
+import json
+import math
+import os
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from catalog import EpisodeCatalog
+from http_transport import SPOTIFY_HOST, get_transport
+from metrics import increment
+from providers import PLAYLIST, get_provider, set_provider
+from results_store import episode_num_from_url_or_title
+
+SPOTIFY_API_URL = f"https://{SPOTIFY_HOST}/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+# Maximum number of items per add or remove call of the Spotify Web API
+MAX_ITEMS_PER_CALL = 100
+
+
+@dataclass
+class PlaylistOperation:
+    """
+    One write call to the playlist API.
+
+    'remove' removes all occurrences of uris, 'add' inserts uris before position, and 'move' moves the
+    length items starting at position so that they end up before insert_before (both positions refer to the
+    playlist before the move, like the Spotify reorder call).
+    """
+    kind: str
+    uris: List[str] = field(default_factory=list)
+    position: int = 0
+    insert_before: int = 0
+    length: int = 0
+
+
+def longest_increasing_subsequence(values: Sequence[int]) -> List[int]:
+    """
+    Finds a longest strictly increasing subsequence in O(n log n).
+
+    Returns:
+        List[int]: Positions of the subsequence's values in ascending order
+    """
+    tail_values: List[int] = []
+    tail_positions: List[int] = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        length = bisect_left(tail_values, value)
+        if length == len(tail_values):
+            tail_values.append(value)
+            tail_positions.append(position)
+        else:
+            tail_values[length] = value
+            tail_positions[length] = position
+        previous[position] = tail_positions[length - 1] if length else -1
+
+    subsequence = []
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        subsequence.append(position)
+        position = previous[position]
+    return subsequence[::-1]
+
+
+def apply_operations(items: List[Optional[str]], operations: Iterable[PlaylistOperation]) -> List[Optional[str]]:
+    """
+    Applies operations to a local copy of a playlist, with the semantics of the Spotify Web API.
+    """
+    items = list(items)
+    for operation in operations:
+        if operation.kind == "remove":
+            removed = set(operation.uris)
+            items = [uri for uri in items if uri not in removed]
+        elif operation.kind == "add":
+            items[operation.position:operation.position] = operation.uris
+        elif operation.kind == "move":
+            block = items[operation.position:operation.position + operation.length]
+            del items[operation.position:operation.position + operation.length]
+            target = operation.insert_before
+            if target >= operation.position + operation.length:
+                target -= operation.length
+            elif target > operation.position:
+                target = operation.position
+            items[target:target] = block
+        else:
+            raise ValueError(f"Unknown playlist operation: {operation.kind}")
+    return items
+
+
+def compute_diff(current: Sequence[Optional[str]], desired: Sequence[str]) -> List[PlaylistOperation]:
+    """
+    Computes the write calls that turn the current playlist order into the desired one.
+
+    1. Episodes that are not desired, or appear more than once, are removed (duplicates are inserted again
+       in step 3, the API can only remove all occurrences of an item). Unavailable items (None) cannot be
+       removed by URI; they stay in the playlist and keep the positions of the other items right.
+    2. The remaining episodes that belong to a longest increasing subsequence of their desired positions stay
+       where they are, all others are moved; episodes adjacent both now and in the desired order move together.
+    3. Missing episodes are inserted, consecutive ones in one call.
+
+    Args:
+        current (Sequence[Optional[str]]): Item URIs in their current remote order, None for unavailable items
+        desired (Sequence[str]): Item URIs in the desired order, without duplicates
+
+    Returns:
+        List[PlaylistOperation]: Operations to apply in order
+    """
+    desired = list(dict.fromkeys(desired))
+    desired_positions = {uri: position for position, uri in enumerate(desired)}
+    counts = Counter(current)
+    removed = [uri for uri in dict.fromkeys(current)
+               if uri is not None and (uri not in desired_positions or counts[uri] > 1)]
+    operations = [PlaylistOperation("remove", removed[start:start + MAX_ITEMS_PER_CALL])
+                  for start in range(0, len(removed), MAX_ITEMS_PER_CALL)]
+
+    removed_set = set(removed)
+    items = [uri for uri in current if uri not in removed_set]
+    episodes = [uri for uri in items if uri is not None]
+    kept = {episodes[position] for position in
+            longest_increasing_subsequence([desired_positions[uri] for uri in episodes])}
+    present = set(episodes)
+
+    placed = set(kept)
+    position = 0
+    while position < len(desired):
+        uri = desired[position]
+        if uri not in present or uri in placed:
+            position += 1
+            continue
+        range_start = items.index(uri)
+        length = 1
+        while (position + length < len(desired) and range_start + length < len(items)
+               and items[range_start + length] == desired[position + length]
+               and desired[position + length] not in placed):
+            length += 1
+
+        # Behind the closest preceding episode that is already in its final place
+        predecessor = position - 1
+        while predecessor >= 0 and desired[predecessor] not in placed:
+            predecessor -= 1
+        insert_before = items.index(desired[predecessor]) + 1 if predecessor >= 0 else 0
+
+        move = PlaylistOperation("move", desired[position:position + length], position=range_start,
+                                 insert_before=insert_before, length=length)
+        if not range_start <= insert_before <= range_start + length:
+            operations.append(move)
+            items = apply_operations(items, [move])
+        placed.update(move.uris)
+        position += length
+
+    # All episodes before a missing run are in place by now, so the run goes right behind its predecessor
+    position = 0
+    while position < len(desired):
+        if desired[position] in present:
+            position += 1
+            continue
+        run_end = position
+        while run_end < len(desired) and desired[run_end] not in present and run_end - position < MAX_ITEMS_PER_CALL:
+            run_end += 1
+        insert_at = items.index(desired[position - 1]) + 1 if position else 0
+        add = PlaylistOperation("add", desired[position:run_end], position=insert_at)
+        operations.append(add)
+        items = apply_operations(items, [add])
+        position = run_end
+    return operations
+
+
+def naive_rewrite_calls(item_count: int) -> int:
+    """
+    Returns the write calls of rewriting the whole playlist: one replace call for the first 100 items and one
+    add call for every further 100.
+    """
+    return max(1, math.ceil(item_count / MAX_ITEMS_PER_CALL))
+
+
+def chronological_uris(episodes: Iterable[dict], show_episodes: Iterable[Tuple[str, str]]) -> List[str]:
+    """
+    Maps the chronologically ordered episodes to the URIs of their Spotify episodes by episode number.
+
+    Args:
+        episodes (Iterable[dict]): Episodes in chronological order, with 'episode_num', 'url' and 'title'
+        show_episodes (Iterable[Tuple[str, str]]): (uri, title) of all episodes of the show on Spotify
+
+    Returns:
+        List[str]: URIs in chronological order; episodes missing on Spotify are left out
+    """
+    uris_by_num = {}
+    for uri, title in show_episodes:
+        episode_num = episode_num_from_url_or_title(None, title)
+        if episode_num is not None:
+            uris_by_num.setdefault(episode_num, uri)
+
+    uris = []
+    missing = []
+    for episode in episodes:
+        episode_num = episode.get("episode_num")
+        if episode_num is None:
+            episode_num = episode_num_from_url_or_title(episode.get("url"), episode.get("title"))
+        if episode_num in uris_by_num:
+            uris.append(uris_by_num[episode_num])
+        else:
+            missing.append(episode.get("title"))
+    if missing:
+        print(f"{len(missing)} episodes not found on Spotify, e.g. {missing[:3]}")
+    return list(dict.fromkeys(uris))
+
+
+def _load_state(path: Optional[str]) -> dict:
+    if not path or not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(path: Optional[str], snapshot_id: Optional[str], uris: List[Optional[str]]):
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"snapshot_id": snapshot_id, "uris": uris}, f)
+
+
+def sync_playlist(desired: List[str], api=None, state_path: Optional[str] = "output/spotify_playlist_state.json",
+                  dry_run: bool = False) -> dict:
+    """
+    Brings the remote playlist into the desired order with as few API calls as possible.
+
+    Args:
+        desired (List[str]): Item URIs in the desired order
+        api: Playlist API, defaults to the 'playlist' provider
+        state_path (str, optional): File the order and snapshot id of the last sync are kept in
+        dry_run (bool): Only compute and print the operations, do not change the playlist
+
+    Returns:
+        dict: 'operations' (the computed operations), 'read_calls', 'write_calls' and 'naive_write_calls'
+    """
+    api = api or get_provider(PLAYLIST)
+    reads_before = api.calls["read"]
+    writes_before = api.calls["write"]
+
+    state = _load_state(state_path)
+    snapshot_id = api.snapshot_id()
+    if state.get("snapshot_id") == snapshot_id and state.get("uris") is not None:
+        current = state["uris"]
+    else:
+        current = api.items()
+
+    operations = compute_diff(current, desired)
+    synced = apply_operations(current, operations)
+    if [uri for uri in synced if uri is not None] != list(dict.fromkeys(desired)):
+        raise RuntimeError("Playlist diff does not reproduce the desired order")
+
+    if not dry_run:
+        for operation in operations:
+            if operation.kind == "remove":
+                snapshot_id = api.remove(operation.uris)
+            elif operation.kind == "add":
+                snapshot_id = api.add(operation.uris, operation.position)
+            else:
+                snapshot_id = api.reorder(operation.position, operation.insert_before, operation.length)
+        _save_state(state_path, snapshot_id, synced)
+
+    counts = Counter(operation.kind for operation in operations)
+    report = {
+        "operations": operations,
+        "read_calls": api.calls["read"] - reads_before,
+        "write_calls": len(operations) if dry_run else api.calls["write"] - writes_before,
+        "naive_write_calls": naive_rewrite_calls(len(desired)),
+    }
+    print(f"Playlist: {len(current)} items now, {len(desired)} desired; "
+          f"{counts['remove']} remove, {counts['move']} move and {counts['add']} add calls")
+    print(f"API calls: {report['read_calls']} reads + {report['write_calls']} writes "
+          f"(naive full rewrite: {report['naive_write_calls']} writes)")
+    return report
+
+
+class SpotifyPlaylistAPI:
+    """
+    Playlist provider backed by the Spotify Web API, sending its requests through the shared HTTP transport.
+    """
+
+    def __init__(self):
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        section = config['spotify']
+        self.playlist_id = section['playlist_id']
+        self.show_id = section['show_id']
+        self._client_id = section['client_id']
+        self._client_secret = section['client_secret']
+        self._refresh_token = section['refresh_token']
+        self._access_token = None
+        self.calls: Counter = Counter()
+
+    def snapshot_id(self) -> str:
+        return self._request("read", "GET", f"/playlists/{self.playlist_id}", params={"fields": "snapshot_id"})[
+            "snapshot_id"]
+
+    def items(self) -> List[Optional[str]]:
+        # Unavailable episodes have no track; they are kept as None so the positions of all others stay right
+        uris = []
+        path = f"/playlists/{self.playlist_id}/tracks"
+        params = {"fields": "items(track(uri)),next", "limit": MAX_ITEMS_PER_CALL, "additional_types": "episode"}
+        while True:
+            page = self._request("read", "GET", path, params=dict(params, offset=len(uris)))
+            uris.extend((item.get("track") or {}).get("uri") for item in page["items"])
+            if not page.get("next") or not page["items"]:
+                return uris
+
+    def show_episodes(self) -> List[Tuple[str, str]]:
+        episodes = []
+        while True:
+            page = self._request("read", "GET", f"/shows/{self.show_id}/episodes",
+                                 params={"limit": 50, "offset": len(episodes), "market": "DE"})
+            episodes.extend((item["uri"], item["name"]) for item in page["items"] if item)
+            if not page.get("next") or not page["items"]:
+                return episodes
+
+    def add(self, uris: List[str], position: int) -> str:
+        return self._request("write", "POST", f"/playlists/{self.playlist_id}/tracks",
+                             json={"uris": uris, "position": position})["snapshot_id"]
+
+    def remove(self, uris: List[str]) -> str:
+        return self._request("write", "DELETE", f"/playlists/{self.playlist_id}/tracks",
+                             json={"tracks": [{"uri": uri} for uri in uris]})["snapshot_id"]
+
+    def reorder(self, range_start: int, insert_before: int, range_length: int) -> str:
+        return self._request("write", "PUT", f"/playlists/{self.playlist_id}/tracks",
+                             json={"range_start": range_start, "insert_before": insert_before,
+                                   "range_length": range_length})["snapshot_id"]
+
+    def _request(self, kind: str, method: str, path: str, **kwargs) -> dict:
+        self.calls[kind] += 1
+        increment(f"spotify_{kind}_call")
+        response = get_transport().session.request(method, SPOTIFY_API_URL + path,
+                                                   headers={"Authorization": f"Bearer {self._token()}"}, **kwargs)
+        if response.status_code == 401:
+            # The access token expired during a long sync
+            self._access_token = None
+            response = get_transport().session.request(method, SPOTIFY_API_URL + path,
+                                                       headers={"Authorization": f"Bearer {self._token()}"},
+                                                       **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def _token(self) -> str:
+        if self._access_token is None:
+            response = get_transport().session.post(TOKEN_URL, auth=(self._client_id, self._client_secret),
+                                                    data={"grant_type": "refresh_token",
+                                                          "refresh_token": self._refresh_token})
+            response.raise_for_status()
+            self._access_token = response.json()["access_token"]
+        return self._access_token
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sync the Spotify playlist with the chronological episode order")
+    parser.add_argument("--results", default="output/episode_data.sqlite", help="location of the results store")
+    parser.add_argument("--csv", help="read an exported episode_data.csv instead of the results store")
+    parser.add_argument("--state", default="output/spotify_playlist_state.json",
+                        help="file the order and snapshot id of the last sync are kept in")
+    parser.add_argument("--plan", action="store_true", help="only print the operations, do not change the playlist")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="sync a local stand-in playlist (output/dry_run/spotify_playlist.json) instead")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        from fake_providers import FakePlaylist
+
+        set_provider(PLAYLIST, FakePlaylist(os.path.join("output", "dry_run", "spotify_playlist.json")))
+        args.state = os.path.join("output", "dry_run", os.path.basename(args.state))
+
+    catalog = EpisodeCatalog.from_csv(args.csv) if args.csv else EpisodeCatalog.from_store(args.results)
+    playlist = get_provider(PLAYLIST)
+    order = chronological_uris(catalog.chronological(), playlist.show_episodes())
+    result = sync_playlist(order, playlist, args.state, dry_run=args.plan)
+    if args.plan:
+        for planned in result["operations"]:
+            print(planned)
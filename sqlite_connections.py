@@ -0,0 +1,91 @@
+"""
+SQLite Connections
+This module holds the connection handling shared by the SQLite databases of the crawler (results store, LLM and
+geocode caches, Wikipedia index). A sqlite3 connection must not be used by several threads at once, so every
+thread opens its own connection to a database; concurrent writers are serialized by SQLite itself, waiting up to
+the busy timeout. Writable databases use WAL mode, so readers never block the writer.
+
+Usage:
+    connections = ThreadLocalConnections("output/llm_cache.sqlite", setup=create_tables)
+    connections.get().execute(...)
+
+Dependencies:
+    - Standard library only (sqlite3)
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+BUSY_TIMEOUT_SECONDS = 30.0
+
+
+class ThreadLocalConnections:
+    """
+    Opens one connection per thread to a SQLite database, lazily and with the same settings for every thread.
+    """
+
+    def __init__(self, path: str, setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 read_only: bool = False, mmap_size: int = 0):
+        """
+        Args:
+            path (str): Location of the SQLite database
+            setup (Callable, optional): Creates the schema; called with the first connection only
+            read_only (bool): Open an immutable database read-only, e.g. a prebuilt index
+            mmap_size (int): Bytes of the database to memory-map, 0 to read it with regular I/O
+        """
+        self.path = path
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self._setup = setup
+        self._setup_lock = threading.Lock()
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the calling thread, opening it on first use.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open()
+            self._local.connection = connection
+        return connection
+
+    def _open(self) -> sqlite3.Connection:
+        if self.read_only:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True)
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS)
+            connection.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}")
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+        if self.mmap_size:
+            connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+
+        with self._setup_lock:
+            if self._setup is not None:
+                with connection:
+                    self._setup(connection)
+                self._setup = None
+        return connection
+
+
+def copy_database(source_path: str, target_path: str):
+    """
+    Copies a SQLite database consistently with the online backup API, including changes that are still in its
+    WAL file and while other processes may be writing to it.
+    """
+    directory = os.path.dirname(target_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    source = sqlite3.connect(source_path, timeout=BUSY_TIMEOUT_SECONDS)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
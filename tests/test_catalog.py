@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from catalog import EpisodeCatalog, IntervalTree, SpatialGrid, haversine_km, parse_signed_year
+
+
+def _brute_force_overlapping(intervals, start, end):
+    return sorted(interval_id for interval_start, interval_end, interval_id in intervals
+                  if interval_start <= end and start <= interval_end)
+
+
+def _brute_force_within(points, latitude, longitude, radius_km):
+    return sorted((haversine_km(latitude, longitude, point_latitude, point_longitude), point_id)
+                  for point_latitude, point_longitude, point_id in points
+                  if haversine_km(latitude, longitude, point_latitude, point_longitude) <= radius_km)
+
+
+def test_empty_tree():
+    assert IntervalTree([]).overlapping(-1000, 3000) == []
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (1914, 1914, [1]),          # query ends where an interval starts
+    (1918, 1918, [1, 2]),       # shared endpoint of two intervals
+    (1919, 1938, [2]),
+    (1939, 1939, [2, 3]),
+    (1946, 2000, []),
+    (-100, 1913, [4]),
+    (-53, -53, [4]),
+])
+def test_interval_boundaries_are_inclusive(start, end, expected):
+    tree = IntervalTree([(1914, 1918, 1), (1918, 1939, 2), (1939, 1945, 3), (-53, 14, 4)])
+    assert sorted(tree.overlapping(start, end)) == expected
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_interval_queries_match_a_brute_force_scan(seed):
+    rng = random.Random(seed)
+    intervals = []
+    for interval_id in range(rng.randint(1, 300)):
+        start = rng.randint(-3000, 2000)
+        intervals.append((start, start + rng.choice([0, 0, 1, 10, 100, 1000]), interval_id))
+    tree = IntervalTree(intervals)
+    for _ in range(50):
+        start = rng.randint(-3200, 2200)
+        end = start + rng.choice([0, 1, 5, 50, 500, 5000])
+        assert sorted(tree.overlapping(start, end)) == _brute_force_overlapping(intervals, start, end)
+
+
+def test_empty_grid():
+    assert SpatialGrid([]).within(48.2, 16.4, 20000) == []
+
+
+def test_point_exactly_on_the_radius_is_included():
+    grid = SpatialGrid([(0.0, 1.0, 1), (0.0, 2.0, 2)])
+    radius = haversine_km(0.0, 0.0, 0.0, 1.0)
+    assert [point_id for _, point_id in grid.within(0.0, 0.0, radius)] == [1]
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_km", [
+    (48.2, 16.4, 500),
+    (0.0, 179.9, 300),      # across the antimeridian
+    (0.0, -180.0, 300),
+    (89.5, 0.0, 200),       # around the pole
+    (-89.9, 120.0, 50),
+    (33.2, 43.7, 0),
+    (10.0, 10.0, 25000),    # the whole earth
+])
+@pytest.mark.parametrize("cell_degrees", [0.5, 1.0, 7.0])
+def test_radius_queries_match_a_brute_force_scan(latitude, longitude, radius_km, cell_degrees):
+    rng = random.Random(f"{latitude}/{longitude}/{radius_km}")
+    points = [(rng.uniform(-90, 90), rng.uniform(-180, 180), point_id) for point_id in range(400)]
+    # Points near the query, so small radii find something
+    points += [(max(-90.0, min(90.0, latitude + rng.uniform(-3, 3))), (longitude + rng.uniform(-6, 6) + 180) % 360 - 180,
+                400 + point_id) for point_id in range(100)]
+    points.append((latitude, longitude, 1000))
+    grid = SpatialGrid(points, cell_degrees)
+    assert grid.within(latitude, longitude, radius_km) == _brute_force_within(points, latitude, longitude, radius_km)
+
+
+@pytest.mark.parametrize("value, year", [("+1532", 1532), ("-0053", -53), (" +0014 ", 14), (1815, 1815),
+                                         ("Unknown", None), (None, None), ("", None), ("18. Jh.", None)])
+def test_parse_signed_year(value, year):
+    assert parse_signed_year(value) == year
+
+
+@pytest.fixture
+def catalog():
+    rows = [
+        ("https://www.geschichte.fm/archiv/gag300/", {"title": "GAG300: A", "year_from": "+1914", "year_until": "+1918",
+                                                       "latitude": "48.2", "longitude": "16.4", "location": "Vienna"}),
+        ("https://www.geschichte.fm/podcast/zs11/", {"title": "GAG11: B", "year_from": "-0053", "year_until": "-0053",
+                                                      "latitude": "33.2", "longitude": "43.7", "location": "Iraq"}),
+        (None, {"title": "GAG12: C", "year_from": "+1918", "year_until": None, "latitude": None, "longitude": None}),
+        (None, {"title": "Ohne Jahr", "year_from": "Unknown", "year_until": "Unknown"}),
+    ]
+    return EpisodeCatalog(rows)
+
+
+def test_catalog_orders_and_queries_episodes(catalog):
+    assert [episode["episode_num"] for episode in catalog.chronological()] == [11, 300, 12]
+    assert [episode["episode_num"] for episode in catalog.at_year(1918)] == [300, 12]
+    assert [episode["episode_num"] for episode in catalog.overlapping(1950, -100)] == [11, 300, 12]
+    assert [episode["episode_num"] for episode in catalog.next_chronological(11, 5)] == [300, 12]
+    assert [episode["episode_num"] for episode in catalog.previous_chronological(12, 1)] == [300]
+    assert [(episode["episode_num"], episode["distance_km"]) for episode in catalog.within_radius(48.2, 16.4, 10)] \
+        == [(300, 0.0)]
+    with pytest.raises(KeyError):
+        catalog.next_chronological(999)
@@ -0,0 +1,56 @@
+import pytest
+
+from date_parser import DEFAULT_MIN_CONFIDENCE, parse_dates
+
+CONFIDENT = [
+    ("Im November 1532 nehmen spanische Konquistadoren Atahualpa gefangen.", "+1532", "+1532"),
+    ("Im Sommer 1969 landen die ersten Menschen auf dem Mond.", "+1969", "+1969"),
+    ("Wir springen in dieser Folge ins Jahr 53 v.Chr.", "-0053", "-0053"),
+    ("Wir springen in dieser Folge ins Jahr 53 vdZw., nach Mesopotamien.", "-0053", "-0053"),
+    ("Kaiser Augustus regiert von 27 v. Chr. bis 14 n. Chr.", "-0027", "+0014"),
+    ("Wir springen diesmal in die 2. Hälfte des 18. Jahrhunderts.", "+1750", "+1799"),
+    ("Eine Geschichte aus dem 18. Jahrhundert.", "+1700", "+1799"),
+    ("Es geht um das 5. Jahrhundert v. Chr.", "-0500", "-0401"),
+    ("Wir sprechen über die 1920er Jahre in Berlin.", "+1920", "+1929"),
+    ("Eine Reise in den 1840ern.", "+1840", "+1849"),
+    ("Mitte der 1840er Jahre wandern viele aus.", "+1843", "+1846"),
+    ("Der Dreißigjährige Krieg dauert von 1618 bis 1648.", "+1618", "+1648"),
+    ("Zwischen 1618 und 1648 verwüstet ein Krieg Europa.", "+1618", "+1648"),
+    ("Der Erste Weltkrieg 1914-18 verändert alles.", "+1914", "+1918"),
+    ("Im Krieg von 1870/71 wird das Kaiserreich gegründet.", "+1870", "+1871"),
+    ("Im November 1532 nehmen sie Atahualpa gefangen, 1533 wird er hingerichtet.", "+1532", "+1533"),
+]
+
+UNDATED = [
+    "Vor 2000 Jahren lebten hier 1500 Soldaten.",
+    "Zum 1000. Mal sprechen wir über Geschichte.",
+    "Die 2000. Folge ist eine besondere.",
+    "Ruft uns an unter Telefon 0800 1234.",
+    "Das steht auf Seite 1200.",
+    "In Folge 1000 ging es um etwas anderes.",
+    "Über 10.000 Menschen kamen.",
+]
+
+
+@pytest.mark.parametrize("text, start_date, end_date", CONFIDENT)
+def test_explicit_dates_are_read_with_confidence(text, start_date, end_date):
+    dates = parse_dates(text)
+    assert (dates["start_date"], dates["end_date"]) == (start_date, end_date)
+    assert dates["confidence"] >= DEFAULT_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", UNDATED)
+def test_numbers_that_are_no_years_are_ignored(text):
+    assert parse_dates(text) == {"start_date": None, "end_date": None, "confidence": 0.0}
+
+
+def test_bare_year_is_read_but_does_not_skip_the_llm():
+    dates = parse_dates("1532 nehmen spanische Konquistadoren Atahualpa gefangen.")
+    assert (dates["start_date"], dates["end_date"]) == ("+1532", "+1532")
+    assert 0 < dates["confidence"] < DEFAULT_MIN_CONFIDENCE
+
+
+def test_mentions_far_apart_lower_the_confidence():
+    dates = parse_dates("Im Jahr 1066 landen die Normannen. Im Jahr 2020 besuchen wir das Schlachtfeld.")
+    assert (dates["start_date"], dates["end_date"]) == ("+1066", "+1066")
+    assert dates["confidence"] < DEFAULT_MIN_CONFIDENCE
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _written_files(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _, names in os.walk(directory) for name in names)
+
+
+def _outside_dry_run(directory):
+    return [path for path in _written_files(directory)
+            if not path.startswith(os.path.join("output", "dry_run") + os.sep)]
+
+
+def test_main_dry_run_writes_only_to_the_dry_run_directory(tmp_path):
+    completed = subprocess.run([sys.executable, os.path.join(REPO_DIR, "main.py"), "--dry-run", "--start", "1",
+                                "--end", "3"], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert _outside_dry_run(tmp_path) == []
+    assert os.path.isfile(tmp_path / "output" / "dry_run" / "episode_data.csv")
+
+
+def test_service_dry_run_writes_only_to_the_dry_run_directory(tmp_path):
+    process = subprocess.Popen([sys.executable, "-u", os.path.join(REPO_DIR, "service.py"), "--dry-run", "--port",
+                                "0"], cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith("Serving on "):
+                url = line.split()[-1]
+                break
+        else:
+            raise AssertionError("The service did not start")
+        request = urllib.request.Request(url, data=json.dumps({"url": "https://www.geschichte.fm/archiv/gag300/"})
+                                         .encode("utf-8"), headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            assert response.status == 200
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    assert _outside_dry_run(tmp_path) == []
@@ -0,0 +1,63 @@
+import pytest
+
+from gazetteer import Gazetteer
+
+# id, name, ascii name, alternate names, latitude, longitude, feature class, feature code, country code, ..., population
+_PLACES = [
+    ("2761369", "Vienna", "Vienna", "Wien,Vienne", "48.20849", "16.37208", "P", "PPLC", "AT", "2400000"),
+    ("2988507", "Paris", "Paris", "Parigi", "48.85341", "2.3488", "P", "PPLC", "FR", "2138551"),
+    ("4717560", "Paris", "Paris", "", "33.66094", "-95.55551", "P", "PPLA2", "US", "24782"),
+    ("3699088", "Cajamarca", "Cajamarca", "", "-7.16378", "-78.50027", "P", "PPLA", "PE", "135000"),
+    ("2950159", "Berlin", "Berlin", "", "52.52437", "13.41053", "P", "PPLC", "DE", "3426354"),
+    ("2950000", "Bern", "Bern", "Berne", "46.94809", "7.44744", "P", "PPLC", "CH", "121631"),
+]
+_COUNTRIES = [
+    ("AT", "AUT", "040", "AU", "Austria"),
+    ("FR", "FRA", "250", "FR", "France"),
+    ("US", "USA", "840", "US", "United States"),
+    ("PE", "PER", "604", "PE", "Peru"),
+    ("CA", "CAN", "124", "CA", "Canada"),
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    with open(tmp_path / "cities15000.txt", "w", encoding="utf-8") as f:
+        for row in _PLACES:
+            f.write("\t".join(row[:9] + ("",) * 5 + row[9:]) + "\n")
+    with open(tmp_path / "countryInfo.txt", "w", encoding="utf-8") as f:
+        f.write("#ISO\tISO3\tISO-Numeric\tfips\tCountry\n")
+        for row in _COUNTRIES:
+            f.write("\t".join(row) + "\n")
+    return Gazetteer(str(tmp_path / "cities15000.txt"))
+
+
+@pytest.mark.parametrize("address, coordinates", [
+    ("Vienna, Austria", (48.20849, 16.37208)),
+    ("Wien", (48.20849, 16.37208)),
+    ("Wien Innere Stadt", (48.20849, 16.37208)),
+    ("Paris", (48.85341, 2.3488)),
+    ("Paris, United States", (33.66094, -95.55551)),
+    ("Paris, USA", (33.66094, -95.55551)),
+    ("Paris, US", (33.66094, -95.55551)),
+    ("Paris, France", (48.85341, 2.3488)),
+    ("Cajamarca, Peru", (-7.16378, -78.50027)),
+    ("Berlin-Mitte", (52.52437, 13.41053)),
+])
+def test_lookup(gazetteer, address, coordinates):
+    assert gazetteer.lookup(address) == coordinates
+
+
+@pytest.mark.parametrize("address", ["Paris, Canada", "Wien, Peru", "Paris, CA"])
+def test_place_outside_the_named_country_is_not_found(gazetteer, address):
+    assert gazetteer.lookup(address) is None
+
+
+@pytest.mark.parametrize("address", ["Bernau", "Berliner Mauer", "Atlantis", ""])
+def test_prefix_must_end_at_a_word_boundary(gazetteer, address):
+    assert gazetteer.lookup(address) is None
+
+
+def test_iso_codes_work_without_country_file(tmp_path, gazetteer):
+    (tmp_path / "countryInfo.txt").unlink()
+    assert Gazetteer(str(tmp_path / "cities15000.txt")).lookup("Paris, US") == (33.66094, -95.55551)
@@ -0,0 +1,82 @@
+import pytest
+import requests
+
+import http_cache
+from http_cache import CacheMissError, HttpCache
+
+URL = "https://www.geschichte.fm/archiv/gag300/"
+
+
+class _Response:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class _Transport:
+    def __init__(self):
+        self.outcome = None
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers or {})
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    transport = _Transport()
+    monkeypatch.setattr(http_cache, "get_transport", lambda: transport)
+    return transport
+
+
+@pytest.fixture
+def cache(tmp_path, transport):
+    cache = HttpCache(str(tmp_path))
+    transport.outcome = _Response(200, b"<h1>Folge 300</h1>", {"ETag": '"v1"'})
+    assert cache.get_bytes(URL) == b"<h1>Folge 300</h1>"
+    return cache
+
+
+def test_unchanged_page_is_revalidated(cache, transport):
+    transport.outcome = _Response(304)
+    assert cache.get_bytes(URL) == b"<h1>Folge 300</h1>"
+    assert transport.requests[-1] == {"If-None-Match": '"v1"'}
+
+
+def test_changed_page_replaces_the_cached_copy(cache, transport):
+    transport.outcome = _Response(200, b"<h1>Neu</h1>")
+    assert cache.get_bytes(URL) == b"<h1>Neu</h1>"
+    assert HttpCache(cache.cache_dir, offline=True).get_bytes(URL) == b"<h1>Neu</h1>"
+
+
+@pytest.mark.parametrize("outcome", [_Response(500), _Response(503), requests.ConnectionError("reset")])
+def test_cached_copy_is_served_when_revalidation_fails(cache, transport, outcome):
+    transport.outcome = outcome
+    assert cache.get_bytes(URL) == b"<h1>Folge 300</h1>"
+
+
+@pytest.mark.parametrize("outcome, error", [(_Response(503), requests.HTTPError),
+                                            (requests.ConnectionError("reset"), requests.ConnectionError)])
+def test_failure_without_cached_copy_is_raised(tmp_path, transport, outcome, error):
+    transport.outcome = outcome
+    with pytest.raises(error):
+        HttpCache(str(tmp_path)).get_bytes(URL)
+
+
+def test_client_errors_are_not_hidden_by_the_cached_copy(cache, transport):
+    transport.outcome = _Response(404)
+    with pytest.raises(requests.HTTPError):
+        cache.get_bytes(URL)
+
+
+def test_offline_cache_miss(tmp_path):
+    with pytest.raises(CacheMissError):
+        HttpCache(str(tmp_path), offline=True).get_bytes(URL)
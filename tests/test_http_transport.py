@@ -0,0 +1,74 @@
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from http_transport import HttpTransport
+
+URL = "https://api.example.org/items"
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def _sender(*outcomes):
+    calls = []
+
+    def send(method, url, **kwargs):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(method)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return send, calls
+
+
+def _connect_error():
+    cause = MaxRetryError(None, URL, NewConnectionError(None, "Connection refused"))
+    return requests.ConnectionError(cause)
+
+
+@pytest.fixture
+def transport():
+    return HttpTransport(rate_limits={}, max_retries=3, backoff_base=0.0)
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+@pytest.mark.parametrize("outcome", [_Response(503), requests.ReadTimeout(), requests.ConnectionError("reset")])
+def test_reads_are_retried(transport, method, outcome):
+    send, calls = _sender(outcome, _Response(200))
+    assert transport._send(send, method, URL).status_code == 200
+    assert calls == [method, method]
+
+
+@pytest.mark.parametrize("method", ["POST", "PUT", "DELETE"])
+def test_writes_are_not_replayed_after_they_may_have_arrived(transport, method):
+    send, calls = _sender(_Response(502), _Response(200))
+    assert transport._send(send, method, URL).status_code == 502
+    assert calls == [method]
+
+    for error in (requests.ReadTimeout(), requests.ConnectionError("Connection aborted")):
+        send, calls = _sender(error, _Response(200))
+        with pytest.raises(type(error)):
+            transport._send(send, method, URL)
+        assert calls == [method]
+
+
+@pytest.mark.parametrize("outcome", [_connect_error(), requests.ConnectTimeout(),
+                                     _Response(429, {"Retry-After": "0"})])
+def test_writes_are_retried_when_the_server_did_not_take_them(transport, outcome):
+    send, calls = _sender(outcome, _Response(201))
+    assert transport._send(send, "POST", URL).status_code == 201
+    assert calls == ["POST", "POST"]
+
+
+def test_write_rejected_with_429_without_retry_after_is_returned(transport):
+    send, calls = _sender(_Response(429), _Response(201))
+    assert transport._send(send, "POST", URL).status_code == 429
+    assert calls == ["POST"]
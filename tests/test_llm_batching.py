@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import providers
+from llm_call import get_wikipedia_search_term_from_episode_information_batch
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _BatchLLM:
+    cacheable = False
+    model_name = "batch-stub"
+
+    def __init__(self, make_id):
+        self.make_id = make_id
+        self.prompts = []
+
+    def generate(self, prompt, generation_config, prefix=""):
+        self.prompts.append(prompt)
+        if "ID 1:" not in prompt:
+            return _Response("Einzeln")
+        answers = [{"id": self.make_id(num), "search_term": f"Begriff {num}"} for num in (3, 1, 2)]
+        return _Response(json.dumps(answers))
+
+
+@pytest.fixture
+def use_llm():
+    def use(llm):
+        providers.set_provider(providers.LLM, llm)
+        return llm
+    yield use
+    providers.set_provider(providers.LLM, None)
+
+
+@pytest.mark.parametrize("make_id", [int, str, float, lambda num: f" {num} "])
+def test_answers_are_matched_by_id_of_any_type(use_llm, make_id):
+    llm = use_llm(_BatchLLM(make_id))
+    episodes = [{"title": f"GAG{num}", "summary": "..."} for num in (1, 2, 3)]
+    assert get_wikipedia_search_term_from_episode_information_batch(episodes) == ["Begriff 1", "Begriff 2",
+                                                                                  "Begriff 3"]
+    assert len(llm.prompts) == 1
+
+
+def test_unusable_ids_fall_back_to_single_requests(use_llm):
+    llm = use_llm(_BatchLLM(lambda num: "eins"))
+    episodes = [{"title": f"GAG{num}", "summary": "..."} for num in (1, 2, 3)]
+    assert get_wikipedia_search_term_from_episode_information_batch(episodes) == ["Einzeln"] * 3
+    assert len(llm.prompts) == 4
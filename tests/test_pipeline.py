@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pipeline import Stage, run_pipeline
+
+
+def _jittered(func):
+    def stage(item):
+        time.sleep(random.random() / 1000)
+        return func(item)
+    return stage
+
+
+def test_results_arrive_in_input_order():
+    results = []
+    stages = [Stage("double", _jittered(lambda x: x * 2), workers=4), Stage("inc", _jittered(lambda x: x + 1))]
+    assert run_pipeline(range(100), stages, results.append) == 100
+    assert results == [x * 2 + 1 for x in range(100)]
+
+
+def test_failed_items_go_through_on_error():
+    def fail_on_odd(x):
+        if x % 2:
+            raise RuntimeError("odd")
+        return x
+
+    results = []
+    errors = []
+    delivered = run_pipeline(range(10), [Stage("check", fail_on_odd, workers=3), Stage("copy", lambda x: x)],
+                             results.append, on_error=lambda x, stage, e: errors.append((x, stage)))
+    assert delivered == 5 and results == [0, 2, 4, 6, 8]
+    assert errors == [(x, "check") for x in range(1, 10, 2)]
+
+
+def test_error_while_reading_items_is_raised_after_delivering_the_rest():
+    def items():
+        yield from range(5)
+        raise OSError("input went away")
+
+    results = []
+    done = threading.Event()
+
+    def run():
+        with pytest.raises(OSError, match="input went away"):
+            run_pipeline(items(), [Stage("copy", lambda x: x, workers=2)], results.append)
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    assert done.wait(5), "run_pipeline hangs when the items raise"
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_slow_item_bounds_the_items_in_flight():
+    release = threading.Event()
+    read = []
+
+    def items():
+        for index in range(50):
+            read.append(index)
+            yield index
+
+    def slow_first(x):
+        if x == 0:
+            release.wait(5)
+        return x
+
+    results = []
+    thread = threading.Thread(target=run_pipeline, args=(items(), [Stage("slow", slow_first, workers=4)],
+                                                         results.append), kwargs={"max_in_flight": 8}, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    assert len(read) <= 9
+    release.set()
+    thread.join(5)
+    assert results == list(range(50))
+
+
+@pytest.mark.parametrize("kwargs", [{"stages": []}, {"stages": [Stage("none", lambda x: x, workers=0)]},
+                                    {"stages": [Stage("copy", lambda x: x)], "max_in_flight": 0}])
+def test_invalid_configuration_is_rejected(kwargs):
+    with pytest.raises(ValueError):
+        run_pipeline(range(3), sink=lambda x: None, **kwargs)
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from results_store import ResultsStore
+from sharding import merge_shards
+
+URL = "https://www.geschichte.fm/archiv/gag300/"
+
+
+def _shard(tmp_path, name: str, records):
+    directory = os.path.join(tmp_path, name)
+    ResultsStore(os.path.join(directory, "episode_data.sqlite")).upsert_records(records)
+    return directory
+
+
+@pytest.fixture
+def shards(tmp_path):
+    old = _shard(tmp_path, "old", [(URL, {"title": "old"}, False, 100.0)])
+    new = _shard(tmp_path, "new", [(URL, {"title": "new"}, False, 200.0)])
+    failed = _shard(tmp_path, "failed", [(URL, {"title": "failed"}, True, 300.0)])
+    return {"old": old, "new": new, "failed": failed}
+
+
+@pytest.mark.parametrize("order", [
+    [["old", "new"]],
+    [["new", "old"]],
+    [["old"], ["new"]],
+    [["new"], ["old"]],
+    [["old"], ["failed"], ["new"]],
+    [["failed", "new"], ["old"]],
+])
+def test_merge_result_does_not_depend_on_order_or_increments(tmp_path, shards, order):
+    results_path = os.path.join(tmp_path, "merged.sqlite")
+    for step in order:
+        merge_shards([shards[name] for name in step], results_path)
+    records = ResultsStore(results_path).iter_records()
+    assert [(url, result, failed, updated_at) for url, result, failed, updated_at in records] == \
+        [(URL, {"title": "new"}, False, 200.0)]
+
+
+def test_merge_is_idempotent(tmp_path, shards):
+    results_path = os.path.join(tmp_path, "merged.sqlite")
+    merge_shards([shards["old"], shards["new"]], results_path)
+    first = ResultsStore(results_path).iter_records()
+    merge_shards([shards["old"], shards["new"]], results_path)
+    assert ResultsStore(results_path).iter_records() == first
+
+
+def test_failed_result_is_kept_without_a_successful_one(tmp_path, shards):
+    results_path = os.path.join(tmp_path, "merged.sqlite")
+    merge_shards([shards["failed"]], results_path)
+    assert ResultsStore(results_path).iter_records() == [(URL, {"title": "failed"}, True, 300.0)]
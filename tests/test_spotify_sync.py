@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from fake_providers import FakePlaylist
+from spotify_sync import MAX_ITEMS_PER_CALL, apply_operations, chronological_uris, compute_diff, sync_playlist
+
+
+def _check(current, desired):
+    operations = compute_diff(current, desired)
+    synced = apply_operations(current, operations)
+    assert [uri for uri in synced if uri is not None] == list(dict.fromkeys(desired))
+    assert synced.count(None) == current.count(None)
+    for operation in operations:
+        assert len(operation.uris) <= MAX_ITEMS_PER_CALL
+    return operations
+
+
+@pytest.mark.parametrize("current, desired", [
+    ([], []),
+    ([], list("abc")),
+    (list("abc"), []),
+    (list("abc"), list("abc")),
+    (list("cba"), list("abc")),
+    (list("abcdef"), list("defabc")),
+    (list("abcabc"), list("abc")),
+    (list("xaybz"), list("ab")),
+    (list("bca"), list("abcd")),
+    ([None, "b", None, "a"], list("abc")),
+    ([None, None], list("ab")),
+])
+def test_diff_reproduces_the_desired_order(current, desired):
+    _check(current, desired)
+
+
+def test_unchanged_playlist_needs_no_operations():
+    assert compute_diff(list("abc"), list("abc")) == []
+
+
+def test_single_moved_episode_is_one_move():
+    operations = _check(list("abcdefg"), list("abdefgc"))
+    assert [operation.kind for operation in operations] == ["move"]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_playlists(seed):
+    rng = random.Random(seed)
+    universe = [f"spotify:episode:{num}" for num in range(rng.randint(0, 250))]
+    desired = rng.sample(universe, rng.randint(0, len(universe)))
+    current = rng.sample(universe, rng.randint(0, len(universe)))
+    current += rng.sample(current, min(len(current), rng.randint(0, 3)))
+    for _ in range(rng.randint(0, 3)):
+        current.insert(rng.randint(0, len(current)), None)
+    rng.shuffle(current)
+    _check(current, desired)
+
+
+def test_chronological_uris_matches_zeitsprung_pages_by_number():
+    # Episodes up to 270 live under /podcast/zs../ but are titled "GAG..", like on Spotify
+    show = [("uri:gag11", "GAG11: Von Kindern und Kegeln"), ("uri:gag300", "GAG 300 - Jubiläum")]
+    episodes = [{"url": "https://www.geschichte.fm/archiv/gag300/", "title": "GAG300: Jubiläum"},
+                {"url": "https://www.geschichte.fm/podcast/zs11/", "title": "GAG11: Von Kindern und Kegeln"},
+                {"url": None, "title": "GAG11: Von Kindern und Kegeln"},
+                {"url": "https://www.geschichte.fm/archiv/gag999/", "title": "GAG999: Fehlt"}]
+    assert chronological_uris(episodes, show) == ["uri:gag300", "uri:gag11"]
+
+
+def test_sync_brings_the_fake_playlist_into_order(tmp_path):
+    playlist = FakePlaylist(episode_count=30)
+    uris = [uri for uri, _ in playlist.show_episodes()]
+    playlist.add(uris[10:25][::-1], 0)
+    desired = uris[5:20]
+    state_path = str(tmp_path / "state.json")
+    sync_playlist(desired, playlist, state_path)
+    assert playlist.items() == desired
+    assert sync_playlist(desired, playlist, state_path)["write_calls"] == 0
@@ -0,0 +1,32 @@
+import pytest
+
+import providers
+from metrics import configure_metrics
+from wikipedia_benchmark import StubCorpus, start_stub_server
+from wikipedia_summary import MediaWikiProvider, get_wikipedia_summaries
+
+
+def test_wikipedia_package_stays_the_default_provider(tmp_path, monkeypatch):
+    # MediaWikiProvider can answer differently (exact titles, resolved disambiguations), so it is opt-in
+    monkeypatch.chdir(tmp_path)
+    assert providers.DEFAULT_PROVIDERS[providers.WIKIPEDIA] == "wikipedia"
+    assert providers.provider_name(providers.WIKIPEDIA) == "wikipedia"
+
+
+@pytest.fixture
+def stub_api():
+    server, request_count = start_stub_server(StubCorpus(60))
+    provider = MediaWikiProvider(api_url=f"http://127.0.0.1:{server.server_address[1]}/w/api.php")
+    providers.set_provider(providers.WIKIPEDIA, provider)
+    yield request_count
+    server.shutdown()
+    providers.set_provider(providers.WIKIPEDIA, None)
+
+
+def test_api_request_counter_counts_requests_not_terms(stub_api):
+    recorder = configure_metrics(None)
+    terms = StubCorpus(60).terms
+    results = get_wikipedia_summaries(terms)
+    assert all(title is not None for title, _ in results)
+    assert recorder.counters["wikipedia_api_request"] == stub_api[0]
+    assert stub_api[0] < len(terms)
@@ -0,0 +1,57 @@
+import json
+import threading
+
+import pytest
+
+import main
+import providers
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _YearLLM:
+    cacheable = False
+    model_name = "year-stub"
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, generation_config, prefix=""):
+        with self._lock:
+            self.calls += 1
+        return _Response(json.dumps({"start_date": "+0568", "end_date": "+0572"}))
+
+
+@pytest.fixture
+def llm():
+    llm = _YearLLM()
+    providers.set_provider(providers.LLM, llm)
+    yield llm
+    providers.set_provider(providers.LLM, None)
+
+
+@pytest.mark.parametrize("mode, calls", [("sequential", 1), ("hedged", 1), ("vote", 4)])
+def test_year_modes_reach_the_llm(llm, mode, calls):
+    # No date in the description, so the rule-based parser cannot answer
+    state = {"url": "https://www.geschichte.fm/archiv/gag1/",
+             "episode": {"title": "GAG01 Vier Langobarden-Könige", "summary": "Alboin, Langobardenkönig."}}
+    state = main._year_stage(state, mode)
+    assert state["years"] == {"start_date": "+0568", "end_date": "+0572"}
+    assert llm.calls == calls
+
+
+def test_year_stage_only_runs_when_asked():
+    assert "years" not in [name for name, _ in main._get_stages()]
+    assert "years" in [name for name, _ in main._get_stages(year_mode="vote")]
+    assert "years" not in [name for name, _ in main._get_stages(combined_extraction=True, year_mode="vote")]
+
+
+def test_years_and_combined_exclude_each_other():
+    assert main._parse_args(["--years", "hedged"]).year_mode == "hedged"
+    with pytest.raises(SystemExit):
+        main._parse_args(["--combined", "--years", "vote"])
@@ -3,18 +3,44 @@ Web Scraping Module for Geschichte.fm Podcast Episodes
 This module provides functionality to extract episode titles and summaries from
 Geschichte.fm podcast website pages using BeautifulSoup4.
 
+By default pages are parsed with the streaming extractor from fast_html_extraction.py, which only reads the page
+up to the second summary paragraph; engine='bs4' selects the full BeautifulSoup parse.
+
+Pages are fetched by the fetcher provider (see providers.py). The default one keeps fetched pages in a persistent
+HTTP cache (see http_cache.py), so reruns only revalidate pages with conditional requests. With
+set_offline_mode(True) pages are parsed straight from the cache. BeautifulSoup is only imported for engine='bs4'.
+
 Dependencies:
     - requests: For making HTTP requests
     - BeautifulSoup4: For parsing HTML content
+    - http_cache: For the persistent response cache
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import Optional, Dict
+from __future__ import annotations
+
+from typing import Optional, Dict, TYPE_CHECKING
+
+from fast_html_extraction import clean_summary, extract_episode_data_fast
+from metrics import timed
+from providers import FETCHER, get_provider, set_provider
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+
+def set_offline_mode(offline: bool = True):
+    """
+    Enables or disables offline mode, in which episode pages are only read from the HTTP cache.
+
+    Args:
+        offline (bool): True to never fetch pages from the network
+    """
+    set_provider(FETCHER, "offline" if offline else None)
 
 
 def extract_relevant_episode_data(html_content: Optional[str] = None,
-                                  url: Optional[str] = None) -> Optional[Dict[str, str]]:
+                                  url: Optional[str] = None,
+                                  engine: str = "fast") -> Optional[Dict[str, str]]:
     """
     Extracts episode title and summary from Geschichte.fm podcast pages.
 
@@ -24,6 +50,7 @@ def extract_relevant_episode_data(html_content: Optional[str] = None,
     Args:
         html_content (str, optional): Raw HTML content to parse
         url (str, optional): URL to fetch content from
+        engine (str, optional): 'fast' for the streaming extractor, 'bs4' for the full BeautifulSoup parse
 
     Returns:
         dict: Dictionary containing:
@@ -35,14 +62,25 @@ def extract_relevant_episode_data(html_content: Optional[str] = None,
         ValueError: If neither html_content nor url is provided
     """
     try:
-        # Initialize BeautifulSoup object from either source
-        soup = _initialize_soup(html_content, url)
+        fetched_text = None
+        if not html_content:
+            if not url:
+                raise ValueError("Either html_content or url must be provided")
+            with timed("fetch", url=url):
+                fetched_text = get_provider(FETCHER).get_text(url, encoding='utf-8')
+
+        with timed("parse", url=url):
+            if engine == "fast":
+                return extract_episode_data_fast(html_content or fetched_text)
 
-        # Extract and clean title
-        title = _extract_title(soup)
+            # Initialize BeautifulSoup object from either source
+            soup = _initialize_soup(html_content, fetched_text)
 
-        # Extract and process summary
-        summary = _extract_summary(soup)
+            # Extract and clean title
+            title = _extract_title(soup)
+
+            # Extract and process summary
+            summary = _extract_summary(soup)
 
         if not summary:
             return None
@@ -52,7 +90,8 @@ def extract_relevant_episode_data(html_content: Optional[str] = None,
             "summary": summary
         }
 
-    except requests.RequestException as e:
+    # requests.RequestException derives from OSError, so requests does not have to be imported here
+    except OSError as e:
         print(f"Error fetching webpage: {e}")
         return None
     except Exception as e:
@@ -60,13 +99,13 @@ def extract_relevant_episode_data(html_content: Optional[str] = None,
         return None
 
 
-def _initialize_soup(html_content: Optional[str], url: Optional[str]) -> BeautifulSoup:
+def _initialize_soup(html_content: Optional[str], fetched_text: Optional[str]) -> BeautifulSoup:
     """
-    Creates a BeautifulSoup object from either HTML content or URL.
+    Creates a BeautifulSoup object from either HTML content or a fetched page.
 
     Args:
         html_content (str, optional): Raw HTML content
-        url (str, optional): URL to fetch content from
+        fetched_text (str, optional): Text of the page fetched from the episode URL
 
     Returns:
         BeautifulSoup: Initialized BeautifulSoup object
@@ -74,12 +113,12 @@ def _initialize_soup(html_content: Optional[str], url: Optional[str]) -> Beautif
     Raises:
         ValueError: If neither input is provided
     """
+    from bs4 import BeautifulSoup
+
     if html_content:
         return BeautifulSoup(html_content, 'html.parser', from_encoding='utf-8')
-    elif url:
-        response = requests.get(url)
-        response.encoding = 'utf-8'
-        return BeautifulSoup(response.text, 'html.parser')
+    elif fetched_text is not None:
+        return BeautifulSoup(fetched_text, 'html.parser')
     else:
         raise ValueError("Either html_content or url must be provided")
 
@@ -121,9 +160,5 @@ def _extract_summary(soup: BeautifulSoup) -> Optional[str]:
     summary = " ".join(p.get_text() for p in paragraphs if p)
 
     # Clean up unwanted text patterns
-    unwanted_phrases = ['Vielen Dank', 'AUS UNSERER WERBUNG', 'Weiterlesen']
-    for phrase in unwanted_phrases:
-        summary = summary.split(phrase)[0].strip()
-
-    return summary
+    return clean_summary(summary)
 
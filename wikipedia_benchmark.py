@@ -0,0 +1,187 @@
+"""
+Wikipedia Lookup Benchmark
+This script counts the requests the Wikipedia lookups of a block of episodes need, against a local stub of the
+MediaWiki action API. The stub serves a synthetic German corpus with the cases the real API has: search terms
+that are exact article titles, titles that need normalization ("schlacht bei ..."), redirects, disambiguation
+pages, and terms that are no title at all and have to be searched.
+
+It compares one-by-one lookups with the batched get_wikipedia_summaries and checks that both return the same
+(title, summary) tuples. For reference, the wikipedia package needs three requests per term (search, page info
+and summary), about 300 per 100 episodes.
+
+Usage:
+    python wikipedia_benchmark.py [--episodes 100]
+"""
+
+import argparse
+import json
+import random
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import providers
+from wikipedia_summary import MediaWikiProvider, get_wikipedia_summaries
+
+# Intro extracts the real API returns per request
+_EXTRACT_LIMIT = 20
+
+
+class StubCorpus:
+    """
+    Synthetic articles, redirects and disambiguation pages of the stub API.
+    """
+
+    def __init__(self, size: int, seed: int = 0):
+        rng = random.Random(seed)
+        places = ["Waterloo", "Carrhae", "Cajamarca", "Hastings", "Lepanto", "Tannenberg", "Trafalgar", "Austerlitz"]
+        self.articles: Dict[str, str] = {}
+        self.redirects: Dict[str, str] = {}
+        self.disambiguations: Dict[str, List[str]] = {}
+        self.terms: List[str] = []
+        for index in range(size):
+            place = f"{rng.choice(places)} {index}"
+            title = f"Schlacht bei {place}"
+            self.articles[title] = (f"Die Schlacht bei {place} war eine Schlacht im Jahr {1000 + index}. "
+                                    f"Sie entschied den Krieg um {place}.")
+            kind = index % 20
+            if kind < 14:
+                self.terms.append(title)
+            elif kind < 16:
+                self.terms.append(title[0].lower() + title[1:])
+            elif kind < 18:
+                alias = f"{place}-Schlacht"
+                self.redirects[alias] = title
+                self.terms.append(alias)
+            elif kind < 19:
+                # The term is a disambiguation page, the article is one of its options
+                self.disambiguations[place] = [title, f"{place} (Stadt)"]
+                self.articles[f"{place} (Stadt)"] = f"{place} ist eine Stadt."
+                self.terms.append(place)
+            else:
+                self.terms.append(f"Krieg um {place} im Jahr {1000 + index}")
+
+    def page(self, title: str) -> dict:
+        if title in self.articles:
+            return {"pageid": zlib.crc32(title.encode("utf-8")), "ns": 0, "title": title,
+                    "extract": self.articles[title]}
+        if title in self.disambiguations:
+            options = ", ".join(self.disambiguations[title])
+            return {"pageid": zlib.crc32(title.encode("utf-8")), "ns": 0, "title": title,
+                    "extract": f"{title} steht für: {options}", "pageprops": {"disambiguation": ""}}
+        return {"ns": 0, "title": title, "missing": True}
+
+    def search(self, term: str, limit: int) -> List[str]:
+        words = set(term.lower().split())
+        candidates = list(self.articles) + list(self.disambiguations)
+        scored = [(len(words & set(f"{title} {self.page(title)['extract']}".lower().split())), title)
+                  for title in candidates]
+        scored = [(score, title) for score, title in scored if score > 0]
+        return [title for _, title in sorted(scored, key=lambda item: (-item[0], item[1]))[:limit]]
+
+
+def _answer(corpus: StubCorpus, parameters: Dict[str, str]) -> dict:
+    query: dict = {}
+    if parameters.get("generator") == "search":
+        titles = corpus.search(parameters["gsrsearch"], int(parameters.get("gsrlimit", 10)))
+        pages = [dict(corpus.page(title), index=rank + 1) for rank, title in enumerate(titles)]
+    else:
+        pages = []
+        normalized, redirects = [], []
+        for title in parameters.get("titles", "").split("|"):
+            target = title[0].upper() + title[1:].replace("_", " ") if title else title
+            if target != title:
+                normalized.append({"from": title, "to": target})
+            if parameters.get("redirects") and target in corpus.redirects:
+                redirects.append({"from": target, "to": corpus.redirects[target]})
+                target = corpus.redirects[target]
+            pages.append(corpus.page(target))
+        if normalized:
+            query["normalized"] = normalized
+        if redirects:
+            query["redirects"] = redirects
+
+    # Like the real API, only the first 20 pages get their extract, the rest follow with a continuation
+    offset = int(parameters.get("excontinue", 0))
+    for position, page in enumerate(pages):
+        if "extract" in page and not offset <= position < offset + _EXTRACT_LIMIT:
+            del page["extract"]
+    query["pages"] = pages
+    answer = {"batchcomplete": True, "query": query}
+    if sum(1 for page in pages if not page.get("missing")) > offset + _EXTRACT_LIMIT:
+        answer = {"continue": {"excontinue": offset + _EXTRACT_LIMIT, "continue": "||"}, "query": query}
+    return answer
+
+
+def start_stub_server(corpus: StubCorpus) -> Tuple[ThreadingHTTPServer, List[int]]:
+    """
+    Starts the stub API on a free local port.
+
+    Returns:
+        Tuple[ThreadingHTTPServer, List[int]]: The server and a one-element list holding its request count
+    """
+    request_count = [0]
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                request_count[0] += 1
+            parameters = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+            body = json.dumps(_answer(corpus, parameters)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, request_count
+
+
+def run_benchmark(episodes: int) -> bool:
+    """
+    Looks up the search terms of the episodes one by one and batched, and prints the request counts.
+
+    Returns:
+        bool: True if both returned the same results and every term was resolved
+    """
+    corpus = StubCorpus(episodes)
+    server, request_count = start_stub_server(corpus)
+    provider = MediaWikiProvider(api_url=f"http://127.0.0.1:{server.server_address[1]}/w/api.php")
+    providers.set_provider(providers.WIKIPEDIA, provider)
+    try:
+        single_results = [provider.summary(term) for term in corpus.terms]
+        single_requests, request_count[0] = request_count[0], 0
+        batch_results = get_wikipedia_summaries(corpus.terms)
+        batch_requests = request_count[0]
+    finally:
+        server.shutdown()
+        providers.set_provider(providers.WIKIPEDIA, None)
+
+    unresolved = sum(1 for title, _ in batch_results if title is None)
+    print(f"Episodes:               {episodes}")
+    print(f"wikipedia package:      ~{3 * episodes} requests (search, page info and summary per term)")
+    print(f"One by one (MediaWiki): {single_requests} requests")
+    print(f"Batched:                {batch_requests} requests")
+    print(f"Unresolved terms:       {unresolved}")
+    identical = single_results == batch_results
+    if not identical:
+        for term, single, batch in zip(corpus.terms, single_results, batch_results):
+            if single != batch:
+                print(f"Mismatch for '{term}':\n  single: {single!r}\n  batch:  {batch!r}")
+    return identical and unresolved == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count the requests of one-by-one and batched Wikipedia lookups")
+    parser.add_argument("--episodes", type=int, default=100, help="number of episodes (search terms)")
+    args = parser.parse_args()
+    raise SystemExit(0 if run_benchmark(args.episodes) else 1)
@@ -0,0 +1,192 @@
+"""
+Offline Wikipedia Summary Index
+This module builds and queries a local index of German Wikipedia lead-section summaries, created from a Wikipedia
+abstracts dump (e.g. dewiki-latest-abstract.xml.gz). The index is a SQLite database with an exact title lookup
+table and an FTS5 full-text index over the titles; it is opened read-only and memory-mapped, so lookups need no
+network access and start up instantly.
+
+get_wikipedia_summary checks this index first and only falls back to the live Wikipedia API on a miss.
+
+Usage:
+    python wikipedia_index.py build dewiki-latest-abstract.xml.gz [--index output/wikipedia_index.sqlite]
+    python wikipedia_index.py lookup "Schlacht bei Waterloo"
+
+Dependencies:
+    - Standard library only (sqlite3 with FTS5, xml.etree)
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from typing import Iterator, Optional, Tuple
+
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_INDEX_PATH = "output/wikipedia_index.sqlite"
+
+_MMAP_SIZE = 1024 * 1024 * 1024
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizes an article title or search term for exact lookups (case and whitespace insensitive).
+    """
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+
+def iter_abstracts(dump_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Streams (title, abstract) pairs from a Wikipedia abstracts dump, plain or gzip-compressed.
+
+    Args:
+        dump_path (str): Path of the abstracts XML dump
+
+    Yields:
+        Tuple[str, str]: Article title and its lead-section abstract
+    """
+    opener = gzip.open if dump_path.endswith(".gz") else open
+    with opener(dump_path, "rb") as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag != "doc":
+                continue
+            title = element.findtext("title") or ""
+            abstract = element.findtext("abstract") or ""
+            element.clear()
+
+            # Titles in the dump are prefixed with "Wikipedia: "
+            title = re.sub(r'^Wikipedia:\s*', '', title).strip()
+            abstract = abstract.strip()
+            if title and abstract:
+                yield title, abstract
+
+
+def build_index(dump_path: str, index_path: str = DEFAULT_INDEX_PATH, batch_size: int = 10000) -> int:
+    """
+    Builds the summary index from an abstracts dump, replacing an existing index.
+
+    Args:
+        dump_path (str): Path of the abstracts XML dump
+        index_path (str): Location of the SQLite index
+        batch_size (int): Number of articles inserted per transaction
+
+    Returns:
+        int: Number of indexed articles
+    """
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, title TEXT NOT NULL, "
+                       "normalized_title TEXT NOT NULL, summary TEXT NOT NULL)")
+    connection.execute("CREATE VIRTUAL TABLE titles USING fts5(title, content='articles', content_rowid='id')")
+
+    count = 0
+    batch = []
+    for title, summary in iter_abstracts(dump_path):
+        batch.append((title, normalize_title(title), summary))
+        if len(batch) >= batch_size:
+            connection.executemany("INSERT INTO articles (title, normalized_title, summary) VALUES (?, ?, ?)", batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        connection.executemany("INSERT INTO articles (title, normalized_title, summary) VALUES (?, ?, ?)", batch)
+        count += len(batch)
+
+    # Building the indexes once after the bulk insert is much faster than maintaining them row by row
+    connection.execute("INSERT INTO titles (rowid, title) SELECT id, title FROM articles")
+    connection.execute("CREATE INDEX idx_normalized_title ON articles (normalized_title)")
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+    os.replace(tmp_path, index_path)
+    print(f"Indexed {count} Wikipedia articles into {index_path}")
+    return count
+
+
+class WikipediaIndex:
+    """
+    Read-only, memory-mapped lookup of Wikipedia summaries.
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH):
+        """
+        Args:
+            index_path (str): Location of the SQLite index built with build_index
+        """
+        self.index_path = index_path
+        self._connections = ThreadLocalConnections(index_path, read_only=True, mmap_size=_MMAP_SIZE)
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether the index file exists.
+        """
+        return os.path.isfile(self.index_path)
+
+    def lookup(self, search_term: str) -> Optional[Tuple[str, str]]:
+        """
+        Finds the best matching article for a search term.
+
+        An exact (normalized) title match is preferred; otherwise the best full-text match over the titles is used.
+
+        Args:
+            search_term (str): The search term to look up
+
+        Returns:
+            Tuple[str, str]: (article_title, summary), None if the index has no match
+        """
+        if not search_term or not self.available:
+            return None
+        try:
+            return self._lookup(search_term)
+        except sqlite3.Error as e:
+            print(f"Error reading the Wikipedia index: {e}")
+            return None
+
+    def _lookup(self, search_term: str) -> Optional[Tuple[str, str]]:
+        connection = self._connect()
+
+        row = connection.execute("SELECT title, summary FROM articles WHERE normalized_title = ? LIMIT 1",
+                                 (normalize_title(search_term),)).fetchone()
+        if row:
+            return row[0], row[1]
+
+        # Quote every word, so characters like '-' or ':' in search terms are not read as FTS5 operators
+        words = re.findall(r'\w+', search_term)
+        if not words:
+            return None
+        query = " ".join('"' + word + '"' for word in words)
+        row = connection.execute(
+            "SELECT articles.title, articles.summary FROM titles JOIN articles ON articles.id = titles.rowid "
+            "WHERE titles MATCH ? ORDER BY bm25(titles), length(articles.title) LIMIT 1",
+            (query,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the offline Wikipedia summary index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="build the index from an abstracts dump")
+    build_parser.add_argument("dump", help="path of the abstracts dump, e.g. dewiki-latest-abstract.xml.gz")
+    build_parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="location of the index")
+    lookup_parser = subparsers.add_parser("lookup", help="look up a search term")
+    lookup_parser.add_argument("search_term")
+    lookup_parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="location of the index")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.dump, args.index)
+    else:
+        print(WikipediaIndex(args.index).lookup(args.search_term))
@@ -1,48 +1,256 @@
-import wikipedia
-from typing import Optional, Tuple
+import importlib
+from typing import Dict, List, Optional, Tuple
 
+from http_transport import WIKIPEDIA_HOST, get_transport
+from metrics import increment
+from providers import WIKIPEDIA, get_provider
+from wikipedia_index import WikipediaIndex
 
-def get_wikipedia_summary(search_term: str) -> Tuple[Optional[str], Optional[str]]:
+MEDIAWIKI_API_URL = f"https://{WIKIPEDIA_HOST}/w/api.php"
+# Wikimedia asks API clients to identify themselves instead of sending the default requests user agent
+_USER_AGENT = "gag-chronology-crawler/1.0 (German history podcast timeline; python-requests)"
+
+_local_index = WikipediaIndex()
+
+
+class MediaWikiProvider:
     """
-    Searches Wikipedia for a term and returns the title and first paragraph of the best matching article.
+    Wikipedia source that talks to the MediaWiki action API directly. Intro extracts of up to 20 titles are
+    fetched in one query, following redirects and skipping disambiguation pages; only terms that are no article
+    title are searched, one query each, which returns the extract of the best search hit right away.
 
-    Args:
-        search_term (str): The search term to look up on Wikipedia
+    Opt-in ([providers] wikipedia = mediawiki): unlike WikipediaProvider, an exact article title wins over the
+    first search hit and a disambiguation page resolves to a search hit instead of (None, None).
+    """
 
-    Returns:
-        Tuple[Optional[str], Optional[str]]: (article_title, first_paragraph)
-            Returns (None, None) if no article is found or an error occurs
+    def __init__(self, api_url: str = MEDIAWIKI_API_URL, titles_per_query: int = 20, search_limit: int = 5):
+        """
+        Args:
+            api_url (str): URL of the api.php endpoint
+            titles_per_query (int): Titles per query; the API returns intro extracts for at most 20 pages at once
+            search_limit (int): Search hits considered when a term is no article title
+        """
+        self.api_url = api_url
+        self.titles_per_query = titles_per_query
+        self.search_limit = search_limit
+
+    def summary(self, search_term: str) -> Tuple[Optional[str], Optional[str]]:
+        return self.summaries([search_term])[0]
+
+    def summaries(self, search_terms: List[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Looks up several search terms with as few requests as possible.
+
+        Returns:
+            List[Tuple[Optional[str], Optional[str]]]: (article_title, first_paragraph) per search term,
+                                                       (None, None) if no article was found
+        """
+        terms = list(dict.fromkeys(term.strip() for term in search_terms if term and term.strip()))
+        results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        for chunk_start in range(0, len(terms), self.titles_per_query):
+            chunk = terms[chunk_start:chunk_start + self.titles_per_query]
+            try:
+                results.update(self._lookup_titles(chunk))
+            except (OSError, ValueError) as e:
+                print(f"An error occurred: {e}")
+                results.update((term, (None, None)) for term in chunk)
+
+        for term in terms:
+            if term in results:
+                continue
+            try:
+                results[term] = self._search(term)
+            except (OSError, ValueError) as e:
+                print(f"An error occurred: {e}")
+                results[term] = (None, None)
+            if results[term] == (None, None):
+                print(f"No Wikipedia article found for: {term}")
+
+        return [results[term.strip()] if term and term.strip() else (None, None) for term in search_terms]
+
+    def _lookup_titles(self, titles: List[str]) -> Dict[str, Tuple[str, str]]:
+        # Search terms that are article titles (or redirects to one), mapped to the article title and extract
+        query = self._query({"titles": "|".join(titles), "redirects": 1})
+        renamed = {entry["from"]: entry["to"] for entry in query.get("normalized", []) + query.get("redirects", [])}
+        pages = {page["title"]: page for page in query.get("pages", [])}
+
+        found = {}
+        for term in titles:
+            title = term
+            # Normalization ("schlacht bei Waterloo" -> "Schlacht bei Waterloo") may be followed by a redirect
+            for _ in range(3):
+                if title not in renamed:
+                    break
+                title = renamed[title]
+            page = pages.get(title)
+            if page is not None and self._is_article(page):
+                found[term] = (page["title"], page["extract"])
+        return found
+
+    def _search(self, search_term: str) -> Tuple[Optional[str], Optional[str]]:
+        query = self._query({"generator": "search", "gsrsearch": search_term, "gsrlimit": self.search_limit,
+                             "gsrnamespace": 0})
+        hits = sorted(query.get("pages", []), key=lambda page: page.get("index", 0))
+        for page in hits:
+            if self._is_article(page):
+                return page["title"], page["extract"]
+        if hits:
+            print(f"Multiple matches found for '{search_term}'. Try being more specific.")
+        return None, None
+
+    @staticmethod
+    def _is_article(page: dict) -> bool:
+        return (not page.get("missing") and not page.get("invalid") and bool(page.get("extract"))
+                and "disambiguation" not in page.get("pageprops", {}))
+
+    def _query(self, parameters: dict) -> dict:
+        """
+        Sends a query for intro extracts and follows its continuations.
+
+        Returns:
+            dict: The 'query' part of the response, with the pages of all continuations merged
+        """
+        parameters = dict(parameters, action="query", format="json", formatversion=2, prop="extracts|pageprops",
+                          ppprop="disambiguation", exintro=1, explaintext=1, exlimit="max")
+        merged: dict = {}
+        pages: Dict[int, dict] = {}
+        continuation: dict = {}
+        while True:
+            increment("wikipedia_api_request")
+            response = get_transport().get(self.api_url, params=dict(parameters, **continuation),
+                                           headers={"User-Agent": _USER_AGENT})
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                raise ValueError(f"MediaWiki API error: {data['error'].get('info', data['error'])}")
+            query = data.get("query", {})
+            for key in ("normalized", "redirects"):
+                merged.setdefault(key, []).extend(query.get(key, []))
+            for page in query.get("pages", []):
+                # Continuations repeat the pages and add the extracts that did not fit into the earlier responses
+                merged_page = pages.setdefault(page.get("pageid", page.get("title")), {})
+                for name, value in page.items():
+                    if value or name not in merged_page:
+                        merged_page[name] = value
+            if "continue" not in data:
+                break
+            continuation = data["continue"]
+        merged["pages"] = list(pages.values())
+        return merged
+
+
+class WikipediaProvider:
+    """
+    Wikipedia source backed by the live German Wikipedia API. The wikipedia package is only imported when the
+    provider is created.
     """
-    try:
-        # Search for the page
+
+    def __init__(self):
+        import wikipedia
+
+        # The language is a process-wide setting of the wikipedia package, so it only needs to be set once
         wikipedia.set_lang("de")
-        search_results = wikipedia.search(search_term)
+        # The package calls requests.get directly; send its requests through the shared transport instead
+        importlib.import_module("wikipedia.wikipedia").requests = get_transport()
+        self._wikipedia = wikipedia
+
+    def summary(self, search_term: str) -> Tuple[Optional[str], Optional[str]]:
+        wikipedia = self._wikipedia
+        try:
+            # Search for the page
+            search_results = wikipedia.search(search_term)
 
-        if not search_results:
+            if not search_results:
+                print(f"No Wikipedia article found for: {search_term}")
+                return None, None
+
+            # Get the first (best matching) result
+            page_title = search_results[0]
+
+            # Get the page content
+            page = wikipedia.page(page_title, auto_suggest=False)
+
+            # Get the summary (first paragraph)
+            summary = page.summary #.split('\n')[0]
+
+            return page.title, summary
+
+        except wikipedia.DisambiguationError as e:
+            # Handle disambiguation pages
+            print(f"Multiple matches found for '{search_term}'. Try being more specific.")
+            print("Possible matches:", e.options[:5])  # Show first 5 options
+            return None, None
+
+        except wikipedia.PageError:
             print(f"No Wikipedia article found for: {search_term}")
             return None, None
 
-        # Get the first (best matching) result
-        page_title = search_results[0]
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return None, None
 
-        # Get the page content
-        page = wikipedia.page(page_title, auto_suggest=False)
 
-        # Get the summary (first paragraph)
-        summary = page.summary #.split('\n')[0]
+def get_wikipedia_summaries(search_terms: List[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Batched variant of get_wikipedia_summary for the search terms of a block of episodes.
 
-        return page.title, summary
+    Terms found in the local summary index are answered from it; the remaining ones are passed to the Wikipedia
+    provider in one call if it supports batch lookups (MediaWikiProvider resolves 100 terms in about five
+    requests), one by one otherwise. The wikipedia_api_request counter counts the API requests actually sent.
 
-    except wikipedia.DisambiguationError as e:
-        # Handle disambiguation pages
-        print(f"Multiple matches found for '{search_term}'. Try being more specific.")
-        print("Possible matches:", e.options[:5])  # Show first 5 options
-        return None, None
+    Args:
+        search_terms (List[str]): Search terms, may contain None and duplicates
 
-    except wikipedia.PageError:
-        print(f"No Wikipedia article found for: {search_term}")
-        return None, None
+    Returns:
+        List[Tuple[Optional[str], Optional[str]]]: (article_title, first_paragraph) per search term
+    """
+    results: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(search_terms)
+    remaining = []
+    for position, search_term in enumerate(search_terms):
+        if not search_term:
+            continue
+        local_result = _local_index.lookup(search_term)
+        if local_result is not None:
+            increment("wikipedia_index_hit")
+            results[position] = local_result
+        else:
+            remaining.append(position)
+
+    if remaining:
+        provider = get_provider(WIKIPEDIA)
+        terms = [search_terms[position] for position in remaining]
+        if not isinstance(provider, MediaWikiProvider):
+            # MediaWikiProvider counts the requests it sends itself, other providers send about one per term
+            increment("wikipedia_api_request", len(terms))
+        if hasattr(provider, "summaries"):
+            summaries = provider.summaries(terms)
+        else:
+            summaries = [provider.summary(term) for term in terms]
+        for position, summary in zip(remaining, summaries):
+            results[position] = summary
+    return results
+
+
+def get_wikipedia_summary(search_term: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Searches Wikipedia for a term and returns the title and first paragraph of the best matching article.
+
+    The local summary index (see wikipedia_index.py) is checked first; the Wikipedia provider (the live Wikipedia
+    API by default) is only queried if the index does not exist or has no match.
+
+    Args:
+        search_term (str): The search term to look up on Wikipedia
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: (article_title, first_paragraph)
+            Returns (None, None) if no article is found or an error occurs
+    """
+    local_result = _local_index.lookup(search_term)
+    if local_result is not None:
+        increment("wikipedia_index_hit")
+        return local_result
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None, None
\ No newline at end of file
+    provider = get_provider(WIKIPEDIA)
+    if not isinstance(provider, MediaWikiProvider):
+        increment("wikipedia_api_request")
+    return provider.summary(search_term)
@@ -1,32 +1,48 @@
-import pandas as pd
-import os
 import csv
 
-def write_to_csv(episode_dict, filename = "output/episode_data.csv", fieldnames=None):
+
+def _collect_fieldnames(rows):
+    # All columns in first-seen order, since successful and failed episodes have different fields
+    fieldnames = []
+    for row in rows:
+        for key in row:
+            if key not in fieldnames:
+                fieldnames.append(key)
+    return fieldnames
+
+
+def write_rows_to_csv(rows, filename = "output/episode_data.csv", fieldnames=None):
+    """
+    Writes all rows to a semicolon separated, utf-8-sig encoded CSV file, replacing the file.
+
+    Args:
+        rows (list): Result dicts
+        filename (str): Target CSV file
+        fieldnames (list, optional): Columns to write; defaults to all columns in first-seen order
+    """
+    import pandas as pd
+
     if fieldnames is None:
-        fieldnames = ['title', 'summary', 'year_from', 'year_until', 'url']
-    try:
-        # Convert single dictionary to DataFrame
-        df = pd.DataFrame([episode_dict])
-
-        # If file exists, append without header
-        if os.path.isfile(filename):
-            df.to_csv(filename,
-                      mode='a',
-                      encoding='utf-8-sig',
-                      index=False,
-                      header=False,
-                      sep=';',
-                      quoting=csv.QUOTE_MINIMAL)
-        else:
-            # If file doesn't exist, write with header
-            df.to_csv(filename,
-                      mode='w',
-                      encoding='utf-8-sig',
-                      index=False,
-                      header=fieldnames,
-                      sep=';',
-                      quoting=csv.QUOTE_MINIMAL)
-
-    except Exception as e:
-        print(f"Error writing to CSV: {str(e)}")
\ No newline at end of file
+        fieldnames = _collect_fieldnames(rows)
+    df = pd.DataFrame(rows, columns=fieldnames)
+    df.to_csv(filename,
+              mode='w',
+              encoding='utf-8-sig',
+              index=False,
+              header=True,
+              sep=';',
+              quoting=csv.QUOTE_MINIMAL)
+
+
+def write_rows_to_parquet(rows, filename = "output/episode_data.parquet"):
+    """
+    Writes all rows to a Parquet file, replacing the file. Requires pyarrow or fastparquet.
+
+    Args:
+        rows (list): Result dicts
+        filename (str): Target Parquet file
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(rows, columns=_collect_fieldnames(rows))
+    df.to_parquet(filename, index=False)